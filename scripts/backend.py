@@ -0,0 +1,250 @@
+"""
+Backend de almacenamiento para el pipeline de exportación y entrenamiento.
+
+Permite elegir entre el servidor MySQL (por defecto) y un motor SQLite embebido
+cargado desde data/clean/csv/*.csv (o, si no existen, desde Dataset.xlsx), de
+modo que el pipeline pueda ejecutarse en CI o en un portátil sin servidor.
+
+Variables de entorno:
+    COFFEE_DB_BACKEND   mysql | sqlite (por defecto mysql)
+    COFFEE_SQLITE_PATH  archivo SQLite (por defecto data/clean/coffee.sqlite);
+                        se reconstruye cuando los CSV son más recientes
+    MYSQL_HOST, MYSQL_DB, MYSQL_USER, MYSQL_PASSWORD
+
+Con el motor embebido, el paso a formato largo y la unión con `countries` se
+ejecutan dentro del motor (UNION ALL por columna de año) en lugar de en pandas.
+"""
+
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+import pandas as pd
+
+from instrument import span
+from reshape import WIDE_TABLES, parse_year_columns, wide_to_long
+
+BACKENDS = ['mysql', 'sqlite']
+TABLES = ['countries'] + WIDE_TABLES
+
+MYSQL_CONFIG = {
+    'host': os.environ.get('MYSQL_HOST', 'localhost'),
+    'database': os.environ.get('MYSQL_DB', 'coffee'),
+    'user': os.environ.get('MYSQL_USER', 'analitica'),
+    'password': os.environ.get('MYSQL_PASSWORD', 'Operador1704')
+}
+
+CSV_DIR = Path('data/clean/csv')
+XLSX_PATH = Path('data/clean/Dataset.xlsx')
+SQLITE_PATH = Path('data/clean/coffee.sqlite')
+
+
+def get_backend() -> str:
+    backend = os.environ.get('COFFEE_DB_BACKEND', 'mysql').lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"COFFEE_DB_BACKEND debe ser uno de {BACKENDS}, no '{backend}'")
+    return backend
+
+
+def is_embedded(backend=None) -> bool:
+    return (backend or get_backend()) != 'mysql'
+
+
+class SQLiteConnection(sqlite3.Connection):
+    """Conexión SQLite que acepta `cursor(buffered=...)` como mysql.connector."""
+
+    def cursor(self, *args, buffered=None, **kwargs):
+        return super().cursor(*args, **kwargs)
+
+
+def _source_mtime():
+    files = [CSV_DIR / f'{table}.csv' for table in TABLES]
+    if all(f.exists() for f in files):
+        return max(f.stat().st_mtime for f in files)
+    return XLSX_PATH.stat().st_mtime
+
+
+def _read_source_tables():
+    """Lee las tablas desde los CSV limpios o, si faltan, desde Dataset.xlsx."""
+    if all((CSV_DIR / f'{table}.csv').exists() for table in TABLES):
+        return {table: pd.read_csv(CSV_DIR / f'{table}.csv') for table in TABLES}
+    sheets = pd.read_excel(XLSX_PATH, sheet_name=None)
+    return {table: sheets[table] for table in TABLES}
+
+
+def build_sqlite(path: Path):
+    """Crea (o reemplaza) la base SQLite con todas las tablas del esquema."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Archivo temporal propio: dos procesos que reconstruyen a la vez no se pisan
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f'{path.stem}.', suffix='.tmp')
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+
+    try:
+        conn = sqlite3.connect(tmp_path)
+        try:
+            for table, df in _read_source_tables().items():
+                df.to_sql(table, conn, index=False)
+                if 'country_id' in df.columns:
+                    conn.execute(f'CREATE INDEX `idx_{table}_country` ON `{table}` (`country_id`)')
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def sqlite_path() -> Path:
+    """Archivo de la base embebida: COFFEE_SQLITE_PATH o SQLITE_PATH."""
+    return Path(os.environ.get('COFFEE_SQLITE_PATH', SQLITE_PATH))
+
+
+def connect_sqlite(path=None):
+    path = Path(path or sqlite_path())
+    if not path.exists() or path.stat().st_mtime < _source_mtime():
+        print(f"Construyendo base SQLite embebida en {path}...")
+        build_sqlite(path)
+    return sqlite3.connect(path, factory=SQLiteConnection, check_same_thread=False)
+
+
+def get_connection(backend=None):
+    """Abre una conexión al backend configurado."""
+    backend = backend or get_backend()
+    if backend == 'sqlite':
+        return connect_sqlite()
+    import mysql.connector
+    return mysql.connector.connect(**MYSQL_CONFIG)
+
+
+class SQLitePool:
+    """Equivalente mínimo de MySQLConnectionPool para el motor embebido."""
+
+    def get_connection(self):
+        return connect_sqlite()
+
+
+def get_pool(size: int, name: str, backend=None):
+    backend = backend or get_backend()
+    if backend == 'sqlite':
+        return SQLitePool()
+    from mysql.connector import pooling
+    return pooling.MySQLConnectionPool(pool_name=name, pool_size=size, **MYSQL_CONFIG)
+
+
+def table_columns(conn, table: str):
+    cursor = conn.cursor(buffered=True)
+    try:
+        cursor.execute(f'SELECT * FROM `{table}` LIMIT 0')
+        cursor.fetchall()
+        return [desc[0] for desc in cursor.description]
+    finally:
+        cursor.close()
+
+
+def iter_table_chunks(conn, table: str, chunk_size: int = 10000):
+    """
+    Lee una tabla por bloques con un cursor sin buffer (server-side).
+
+    Las filas se ordenan por country_id para que las de un mismo país lleguen
+    juntas. Solo un bloque de `chunk_size` filas está en memoria a la vez.
+
+    Yields:
+        pd.DataFrame: Bloque de la tabla ancha
+    """
+    cursor = conn.cursor(buffered=False)
+    try:
+        cursor.execute(f"SELECT * FROM `{table}` ORDER BY `country_id`, `id`")
+        columns = [desc[0] for desc in cursor.description]
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield pd.DataFrame.from_records(rows, columns=columns)
+    finally:
+        cursor.close()
+
+
+def unpivot_query(table: str, columns, value_name: str) -> str:
+    """SQL que despliega las columnas de año y une el nombre del país."""
+    year_cols, years = parse_year_columns(columns)
+    if not year_cols:
+        raise RuntimeError(f'No se encontraron columnas de años en la tabla {table}')
+    selects = [
+        f"SELECT t.`country_id` AS country_id, {year} AS year, t.`{col}` AS value "
+        f"FROM `{table}` t WHERE t.`{col}` IS NOT NULL"
+        for col, year in zip(year_cols, years)
+    ]
+    return (
+        f"SELECT u.country_id, u.year, u.value AS `{value_name}`, c.`name` AS country_name "
+        f"FROM ({' UNION ALL '.join(selects)}) u "
+        f"LEFT JOIN `countries` c ON c.`id` = u.country_id "
+        f"ORDER BY u.country_id, u.year"
+    )
+
+
+def load_long_table(conn, table: str, value_name=None, backend=None) -> pd.DataFrame:
+    """
+    Carga una tabla ancha en formato largo [country_id, year, <value>, country_name].
+
+    Con el motor embebido el despliegue y la unión se ejecutan en SQL; con
+    MySQL se lee la tabla y se despliega con `reshape.wide_to_long`.
+    """
+    value_name = value_name or table
+    if is_embedded(backend):
+        # La consulta de despliegue es la etapa reshape, ejecutada por el motor
+        with span('reshape', table=table, engine='sqlite'):
+            df_long = pd.read_sql(unpivot_query(table, table_columns(conn, table), value_name), con=conn)
+            return _numeric_values(df_long, value_name)
+
+    df_wide = pd.read_sql(f'SELECT * FROM `{table}`', con=conn)
+    df_countries = pd.read_sql('SELECT id, name FROM countries', con=conn)
+    with span('reshape', table=table, rows=len(df_wide)):
+        return wide_to_long(df_wide, df_countries, value_name=value_name)
+
+
+def iter_long_chunks(conn, table: str, chunk_size: int = 10000, value_name=None, backend=None,
+                     df_countries=None):
+    """
+    Lee una tabla ancha en formato largo por bloques, como `load_long_table`.
+
+    Con el motor embebido los bloques salen de la consulta de despliegue
+    (`chunk_size` filas largas); con MySQL, de `iter_table_chunks`
+    (`chunk_size` filas anchas) desplegadas con `reshape.wide_to_long` y los
+    nombres de `df_countries` (si no se pasa, se lee la tabla countries).
+
+    Yields:
+        pd.DataFrame: Bloque [country_id, year, <value>, country_name] ordenado por país y año
+    """
+    value_name = value_name or table
+    if not is_embedded(backend):
+        if df_countries is None:
+            df_countries = pd.read_sql('SELECT id, name FROM countries', con=conn)
+        for chunk in iter_table_chunks(conn, table, chunk_size):
+            with span('reshape', table=table, rows=len(chunk)):
+                df_long = wide_to_long(chunk, df_countries, value_name=value_name)
+            yield df_long
+        return
+
+    cursor = conn.cursor(buffered=False)
+    try:
+        cursor.execute(unpivot_query(table, table_columns(conn, table), value_name))
+        columns = [desc[0] for desc in cursor.description]
+        while True:
+            # SQLite despliega las filas a medida que se piden: cada bloque es una etapa reshape
+            with span('reshape', table=table, engine='sqlite'):
+                rows = cursor.fetchmany(chunk_size)
+                df_long = _numeric_values(pd.DataFrame.from_records(rows, columns=columns), value_name) if rows else None
+            if df_long is None:
+                break
+            yield df_long
+    finally:
+        cursor.close()
+
+
+def _numeric_values(df_long: pd.DataFrame, value_name: str) -> pd.DataFrame:
+    # Mismo criterio que wide_to_long: valores vacíos o no numéricos son nulos
+    df_long[value_name] = pd.to_numeric(df_long[value_name], errors='coerce')
+    return df_long.dropna(subset=[value_name]).reset_index(drop=True)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Backtesting walk-forward del pronóstico recursivo.
+
+Para cada año de origen o, el modelo se reentrena solo con las filas hasta o y
+se pronostican recursivamente los horizontes 1..H (los mismos `years_ahead` que
+muestra la app) para todos los países a la vez, como un lote NumPy. Los orígenes
+se evalúan en paralelo en un pool de procesos.
+
+Outputs (en --out-dir):
+ - backtest_detail.csv              : una fila por (origen, país, horizonte)
+ - backtest_by_country_horizon.csv  : MAE / RMSE / MAPE por país y horizonte
+ - backtest_by_horizon.csv          : MAE / RMSE / MAPE por horizonte
+
+Usage:
+    python scripts/backtest.py --horizon 10 --min-train-years 10
+"""
+
+import argparse
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import joblib
+from sklearn.base import clone
+
+from features import add_features, feature_names, history_length, model_spec
+from forecast import forecast_recursive
+from panel import ProductionPanel, last_observed
+
+MODEL_PATH = Path('models/linear_regression_advanced.joblib')
+OUT_DIR = Path('models/backtest')
+
+# Contexto compartido por los procesos del pool (se envía una sola vez)
+_CONTEXT = None
+
+
+def _init_worker(context):
+    global _CONTEXT
+    warnings.filterwarnings('ignore')
+    _CONTEXT = context
+
+
+def run_origin(origin):
+    """
+    Reentrena con los años <= origin y pronostica todos los horizontes.
+
+    Returns:
+        pd.DataFrame: Filas [origin, country_id, horizon, year, actual, forecast]
+    """
+    ctx = _CONTEXT
+    df_features, matrix, years = ctx['features'], ctx['matrix'], ctx['years']
+    window, lags, horizon = ctx['window'], ctx['lags'], ctx['horizon']
+    cols = feature_names(window, lags)
+
+    train = df_features[df_features['year'] <= origin]
+    model = clone(ctx['estimator'])
+    model.fit(train[cols], train['production'])
+
+    # Países con dato en el año de origen
+    origin_idx = int(np.searchsorted(years, origin))
+    active = ~np.isnan(matrix[:, origin_idx])
+    state = last_observed(matrix[active, :origin_idx + 1], history_length(window, lags))
+    predictions = forecast_recursive(model, state, horizon, window, lags)
+
+    # Valores reales de cada horizonte (NaN fuera del rango de datos)
+    target_idx = origin_idx + np.arange(1, horizon + 1)
+    in_range = target_idx < len(years)
+    actual = np.full((active.sum(), horizon), np.nan)
+    actual[:, in_range] = matrix[active][:, target_idx[in_range]]
+
+    n_countries = int(active.sum())
+    return pd.DataFrame({
+        'origin': origin,
+        'country_id': np.repeat(ctx['country_ids'][active], horizon),
+        'horizon': np.tile(np.arange(1, horizon + 1), n_countries),
+        'year': origin + np.tile(np.arange(1, horizon + 1), n_countries),
+        'actual': actual.ravel(),
+        'forecast': predictions.ravel(),
+    }).dropna(subset=['actual'])
+
+
+def make_context(panel: ProductionPanel, estimator, horizon, window, lags):
+    """Contexto de `run_origin`: matriz densa países × años y features (solo con historia pasada), una vez."""
+    df_features = add_features(panel, window, lags)
+    return {
+        'features': df_features[['country_id', 'year', 'production'] + feature_names(window, lags)],
+        'matrix': panel.values,
+        'years': panel.years,
+        'country_ids': panel.country_ids,
+        'estimator': estimator,
+        'window': window,
+        'lags': lags,
+        'horizon': horizon,
+    }
+
+
+def walk_forward(df_long, estimator, horizon=10, min_train_years=10, window=None, lags=None, workers=None):
+    """
+    Ejecuta el backtest walk-forward.
+
+    Args:
+        df_long: DataFrame largo [country_id, year, production, country_name]
+        estimator: Modelo (sin ajustar o ajustado; se clona por origen)
+        horizon: Horizonte máximo en años
+        min_train_years: Años de datos previos al primer origen
+        window, lags: Configuración de features (por defecto la del estimador)
+        workers: Procesos del pool
+
+    Returns:
+        pd.DataFrame: Detalle por (origen, país, horizonte) con errores
+    """
+    if window is None or lags is None:
+        window, lags = model_spec(estimator)
+
+    panel = ProductionPanel.from_long(df_long)
+    context = make_context(panel, estimator, horizon, window, lags)
+    years = panel.years
+    origins = list(range(int(years.min()) + min_train_years, int(years.max())))
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(context,)) as executor:
+        detail = pd.concat(executor.map(run_origin, origins), ignore_index=True)
+
+    # Las filas del panel están ordenadas por country_id
+    detail['country_name'] = panel.country_names[np.searchsorted(panel.country_ids, detail['country_id'].to_numpy())]
+    detail['error'] = detail['forecast'] - detail['actual']
+    detail['abs_error'] = detail['error'].abs()
+    detail['ape'] = np.where(detail['actual'] != 0, detail['abs_error'] / detail['actual'].abs(), np.nan)
+    return detail
+
+
+def summarize(detail, by):
+    """MAE, RMSE y MAPE (%) agrupados por las columnas `by`."""
+    grouped = detail.assign(sq_error=detail['error'] ** 2).groupby(by)
+    summary = pd.DataFrame({
+        'n': grouped.size(),
+        'MAE': grouped['abs_error'].mean(),
+        'RMSE': np.sqrt(grouped['sq_error'].mean()),
+        'MAPE': grouped['ape'].mean() * 100,
+    })
+    return summary.reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtest walk-forward del pronóstico recursivo')
+    parser.add_argument('--model', type=Path, default=MODEL_PATH,
+                        help='Modelo de referencia (se reentrena por origen con los mismos hiperparámetros)')
+    parser.add_argument('--data', type=Path, default=Path('data/prediction_data/production_long.csv'))
+    parser.add_argument('--horizon', type=int, default=10)
+    parser.add_argument('--min-train-years', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--out-dir', type=Path, default=OUT_DIR)
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    estimator = joblib.load(args.model)
+    df_long = pd.read_csv(args.data)
+
+    print(f"🔁 Backtest walk-forward: horizonte {args.horizon} años, {args.workers} procesos...")
+    start = time.perf_counter()
+    detail = walk_forward(df_long, estimator, args.horizon, args.min_train_years, workers=args.workers)
+    print(f"✅ {detail['origin'].nunique()} orígenes evaluados en {time.perf_counter() - start:.1f}s")
+
+    by_country = summarize(detail, ['country_id', 'country_name', 'horizon'])
+    by_horizon = summarize(detail, ['horizon'])
+
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    detail.to_csv(args.out_dir / 'backtest_detail.csv', index=False)
+    by_country.to_csv(args.out_dir / 'backtest_by_country_horizon.csv', index=False)
+    by_horizon.to_csv(args.out_dir / 'backtest_by_horizon.csv', index=False)
+
+    print("\n📉 Error por horizonte:")
+    print(by_horizon.to_string(index=False, float_format=lambda v: f'{v:,.2f}'))
+    print(f"\nGuardado en: {args.out_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Pronóstico por lotes de todos los países, repartido entre procesos.
+
+El panel se agrupa una sola vez (`forecast.build_state`) y la matriz de estado
+se divide en fragmentos contiguos de países; cada proceso del pool ejecuta el
+pronóstico recursivo vectorizado sobre su fragmento. El resultado completo se
+guarda como columnas NumPy en un .npz junto con los metadatos de la ejecución.
+
+Arrays en el archivo:
+ - country_id, country_name, year, predicted_production : formato largo, `years_ahead` filas por país
+ - p05, p50, p95 : con --paths N, cuantiles de N trayectorias Monte Carlo por país
+ - metadata : JSON con tabla, horizonte, ventana, rezagos, trayectorias, hashes
+              del modelo y de los datos, fecha, procesos usados (y pedidos) y duración
+
+Con --table se pronostica otra tabla exportada con --all-tables
+(<data-dir>/<table>_long.csv, columna de valores <table>). El modelo de --model
+se entrenó con la producción, así que para otra tabla se ajusta una regresión
+lineal con las mismas features sobre la historia de esa tabla, y sus
+coeficientes quedan en los metadatos.
+
+Usage:
+    python scripts/batch_forecast.py --years-ahead 10 --workers 4
+    python scripts/batch_forecast.py --years-ahead 10 --paths 2000
+    python scripts/batch_forecast.py --table exports --out data/prediction_data/exports_forecast.npz
+"""
+
+import argparse
+import json
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import joblib
+
+from features import add_features, feature_names, history_length, model_spec
+from forecast import QUANTILES, build_state, forecast_recursive, quantile_columns, residual_pools, simulate_paths
+from hashing import file_hash
+from instrument import span
+from reshape import WIDE_TABLES
+
+MODEL_PATH = Path('models/linear_regression_advanced.joblib')
+DATA_DIR = Path('data/prediction_data')
+
+# Modelo compartido por los procesos del pool (se envía una sola vez)
+_MODEL = None
+
+
+def _init_worker(model):
+    global _MODEL
+    warnings.filterwarnings('ignore')
+    _MODEL = model
+
+
+def forecast_shard(task):
+    """
+    Pronóstico recursivo de un fragmento de países y, si se piden trayectorias,
+    sus cuantiles. Se ejecuta en un proceso del pool.
+    """
+    country_ids, state, years_ahead, window, lags, residuals, n_paths, seed = task
+    predictions = forecast_recursive(_MODEL, state, years_ahead, window, lags)
+    if not n_paths:
+        return predictions, None
+    # Generador por país: las bandas no dependen de cómo se reparten los países
+    paths = simulate_paths(_MODEL, state, years_ahead, residuals, n_paths, window, lags, seed, keys=country_ids)
+    return predictions, np.quantile(paths, QUANTILES, axis=0)
+
+
+def table_path(data_dir: Path, table: str) -> Path:
+    return data_dir / f'{table}_long.csv'
+
+
+def load_table(path: Path, table: str) -> pd.DataFrame:
+    """Formato largo de una tabla, con la columna de valores renombrada a `production`."""
+    df_long = pd.read_csv(path)
+    if table != 'production':
+        df_long = df_long.rename(columns={table: 'production'})
+    return df_long
+
+
+def fit_table_model(df_long, window, lags):
+    """Regresión lineal con las features de (window, lags) ajustada sobre la historia de una tabla."""
+    from sklearn.linear_model import LinearRegression
+    cols = feature_names(window, lags)
+    df_features = add_features(df_long, window, lags)
+    return LinearRegression().fit(df_features[cols], df_features['production'])
+
+
+def effective_workers(workers, n_countries):
+    """Procesos que se usan de verdad: no más que países, y al menos uno."""
+    return max(1, min(workers or os.cpu_count() or 1, n_countries))
+
+
+def batch_forecast(model, df_long, years_ahead=10, workers=None, n_paths=0, seed=0):
+    """
+    Pronostica todos los países repartiéndolos en `workers` procesos.
+
+    Returns:
+        tuple: (country_ids, country_names, years, predictions, bands) con
+               `years` y `predictions` de forma (n_países × years_ahead) y
+               `bands` (len(QUANTILES) × n_países × years_ahead), o None sin trayectorias
+    """
+    window, lags = model_spec(model)
+    country_ids, country_names, last_years, state = build_state(df_long, history_length(window, lags))
+    pools = (residual_pools(model, add_features(df_long, window, lags), country_ids, window, lags)
+             if n_paths else np.empty((len(state), 0)))
+
+    workers = effective_workers(workers, len(state))
+    shards = np.array_split(np.arange(len(state)), workers)
+    tasks = [(country_ids[rows], state[rows], years_ahead, window, lags, pools[rows], n_paths, seed)
+             for rows in shards]
+
+    if workers == 1:
+        _init_worker(model)
+        results = [forecast_shard(tasks[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model,)) as executor:
+            results = list(executor.map(forecast_shard, tasks))
+
+    predictions = np.vstack([pred for pred, _ in results])
+    bands = np.concatenate([band for _, band in results], axis=1) if n_paths else None
+    years = last_years[:, None] + np.arange(1, years_ahead + 1)[None, :]
+    return country_ids, country_names, years, predictions, bands
+
+
+def write_forecast_npz(path: Path, country_ids, country_names, years, predictions, metadata: dict, bands=None):
+    years_ahead = years.shape[1]
+    band_columns = {} if bands is None else {
+        col: band.ravel() for col, band in zip(quantile_columns(), bands)
+    }
+    np.savez(
+        path,
+        country_id=np.repeat(country_ids.astype(np.int64), years_ahead),
+        country_name=np.repeat(country_names.astype(str), years_ahead),
+        year=years.ravel().astype(np.int64),
+        predicted_production=predictions.ravel(),
+        **band_columns,
+        metadata=np.array(json.dumps(metadata, ensure_ascii=False)),
+    )
+
+
+def read_forecast_npz(path: Path):
+    """
+    Lee un archivo escrito por este script.
+
+    Returns:
+        tuple: (DataFrame [country_id, country_name, year, predicted_production]
+               más las columnas de cuantiles si se guardaron, metadatos)
+    """
+    with np.load(path, allow_pickle=False) as data:
+        columns = [col for col in data.files if col != 'metadata']
+        df = pd.DataFrame({col: data[col] for col in columns})
+        metadata = json.loads(str(data['metadata']))
+    return df, metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pronóstico por lotes de todos los países')
+    parser.add_argument('--table', choices=WIDE_TABLES, default='production')
+    parser.add_argument('--data-dir', type=Path, default=DATA_DIR)
+    parser.add_argument('--model', type=Path, default=MODEL_PATH)
+    parser.add_argument('--years-ahead', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--paths', type=int, default=0,
+                        help='Trayectorias Monte Carlo por país para las bandas p05 / p50 / p95 (0 = sin bandas)')
+    parser.add_argument('--out', type=Path, default=None,
+                        help='Archivo .npz de salida (por defecto <data-dir>/<table>_forecast.npz)')
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    data_path = table_path(args.data_dir, args.table)
+    out_path = args.out or args.data_dir / f'{args.table}_forecast.npz'
+    if not data_path.exists():
+        print(f"❌ No se encontró {data_path}. Exporta las tablas con export_production_data.py --all-tables")
+        raise SystemExit(1)
+
+    model = joblib.load(args.model)
+    window, lags = model_spec(model)
+    df_long = load_table(data_path, args.table)
+    if args.table != 'production':
+        # El modelo global aprendió niveles de producción: se ajusta uno con la historia de esta tabla
+        model = fit_table_model(df_long, window, lags)
+
+    workers = effective_workers(args.workers, df_long['country_id'].nunique())
+    print(f"🔮 Pronosticando '{args.table}' ({df_long['country_id'].nunique()} países, "
+          f"{args.years_ahead} años) con {workers} procesos...")
+    start = time.perf_counter()
+    with span('predict', table=args.table, years_ahead=args.years_ahead):
+        country_ids, country_names, years, predictions, bands = batch_forecast(
+            model, df_long, args.years_ahead, workers, args.paths)
+    seconds = time.perf_counter() - start
+
+    metadata = {
+        'table': args.table,
+        'years_ahead': args.years_ahead,
+        'window': window,
+        'lags': lags,
+        'countries': len(country_ids),
+        'paths': args.paths,
+        'quantiles': list(QUANTILES) if args.paths else [],
+        'model_path': str(args.model),
+        'model_hash': file_hash(args.model),
+        'data_path': str(data_path),
+        'data_hash': file_hash(data_path),
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'workers': workers,
+        'workers_requested': args.workers,
+        'seconds': seconds,
+    }
+    if args.table != 'production':
+        # --model solo aportó el conjunto de features; estos son los coeficientes usados
+        metadata['table_model'] = {
+            'features': feature_names(window, lags),
+            'coef': model.coef_.tolist(),
+            'intercept': float(model.intercept_),
+        }
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with span('export', table=args.table):
+        write_forecast_npz(out_path, country_ids, country_names, years, predictions, metadata, bands)
+
+    print(f"✅ {predictions.size} predicciones en {seconds:.2f}s")
+    print(f"Guardado: {out_path}")
+
+
+if __name__ == '__main__':
+    main()
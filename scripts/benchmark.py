@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Benchmarks de cada etapa del pipeline sobre datos sintéticos.
+
+Mide, para cada tamaño (países × años), las rutas críticas del proyecto:
+ - reshape          : reshape.wide_to_long (export_production_data / modelo.load_production_data)
+ - features         : features.add_features (modelo.create_features)
+ - train            : ajuste de LinearRegression con las 6 features
+ - forecast         : forecast.forecast_all, 10 años (modelo.predict_future_production / app)
+ - forecast_loop    : referencia: el bucle original por país (filtro del DataFrame) y por año
+ - forecast_country : pronóstico de un solo país, como en cada rerun de la app (fila del panel)
+ - panel            : construcción de ProductionPanel desde el formato largo
+ - columnar         : columnar.write_npz + carga de ColumnarProduction
+ - insert_executemany: referencia: filas de crearDb.insert_data para executemany (sin servidor)
+ - insert_chunked   : construcción de sentencias de crearDb.insert_data_chunked (sin servidor)
+
+Las etapas de referencia miden la implementación original de la misma tarea,
+para comparar cada optimización con lo que reemplazó en la misma ejecución.
+
+Los resultados se guardan en JSON y se pueden comparar con una ejecución anterior.
+
+Usage:
+    python scripts/benchmark.py --sizes 55x30 1000x100 5000x300 --out bench.json
+    python scripts/benchmark.py --sizes 55x30 1000x100 --compare bench.json
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from columnar import ColumnarProduction, write_npz
+from features import FEATURE_COLS, add_features, history_length
+from forecast import forecast_all, forecast_recursive
+from panel import ProductionPanel
+from reshape import wide_to_long
+from synthetic_data import make_countries, make_wide_table
+
+DEFAULT_SIZES = ['55x30', '500x100', '2000x300']
+
+
+class NullCursor:
+    """Cursor que descarta las sentencias: mide solo el trabajo del cliente."""
+
+    def execute(self, sql, params=None):
+        pass
+
+    def executemany(self, sql, params):
+        pass
+
+
+def forecast_loop(model, history, years_ahead):
+    """Pronóstico de un país como en la app original: una llamada a predict por año."""
+    history = list(history)
+    predictions = []
+    for _ in range(years_ahead):
+        recent = history[-3:]
+        rolling_mean = float(np.mean(recent))
+        rolling_std = float(np.std(recent))
+        if len(recent) >= 2 and recent[-2] != 0:
+            pct_change = (recent[-1] - recent[-2]) / recent[-2]
+        else:
+            pct_change = 0.0
+        volatility_norm = rolling_std / (rolling_mean + 1) if rolling_mean > 0 else 0.0
+        X = np.array([[rolling_mean, rolling_std, history[-1], pct_change,
+                       rolling_mean * pct_change, volatility_norm]])
+        pred = float(model.predict(X)[0])
+        if pred < 0:
+            pred = rolling_mean
+        predictions.append(pred)
+        history.append(pred)
+    return predictions
+
+
+def forecast_per_country(model, df_long, years_ahead=10):
+    """Todos los países uno a uno, filtrando el DataFrame largo por nombre en cada uno."""
+    return {
+        name: forecast_loop(model, df_long.loc[df_long['country_name'] == name, 'production'], years_ahead)
+        for name in df_long['country_name'].unique()
+    }
+
+
+def parse_size(text):
+    countries, years = text.lower().split('x')
+    return int(countries), int(years)
+
+
+def time_stage(func, repeat):
+    """Ejecuta `func` `repeat` veces y devuelve los tiempos en segundos."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run_size(n_countries, n_years, repeat=3, stages=None):
+    """Mide todas las etapas para un tamaño y devuelve una fila por etapa."""
+    from sklearn.linear_model import LinearRegression
+    from crearDb import insert_data, insert_data_chunked
+
+    df_wide = make_wide_table(n_countries, n_years)
+    df_countries = make_countries(n_countries)
+    df_long = wide_to_long(df_wide, df_countries)
+    df_features = add_features(df_long)
+    model = LinearRegression().fit(df_features[FEATURE_COLS].to_numpy(), df_features['production'])
+    panel = ProductionPanel.from_long(df_long)
+    country = panel.country_names[0]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        npz_path = Path(tmp) / 'production_long.npz'
+
+        def columnar():
+            write_npz(df_long, df_countries, npz_path)
+            ColumnarProduction(npz_path).history(df_countries['name'].iloc[0])
+
+        def forecast_country():
+            panel.history(country)
+            forecast_recursive(model, panel.state(history_length(), [country]), 10)
+
+        all_stages = {
+            'reshape': lambda: wide_to_long(df_wide, df_countries),
+            'features': lambda: add_features(df_long),
+            'train': lambda: LinearRegression().fit(df_features[FEATURE_COLS].to_numpy(), df_features['production']),
+            'forecast': lambda: forecast_all(model, df_long, 10),
+            'forecast_loop': lambda: forecast_per_country(model, df_long, 10),
+            'forecast_country': forecast_country,
+            'panel': lambda: ProductionPanel.from_long(df_long),
+            'columnar': columnar,
+            'insert_executemany': lambda: insert_data(NullCursor(), 'production', df_wide),
+            'insert_chunked': lambda: insert_data_chunked(NullCursor(), 'production', df_wide, 1000),
+        }
+
+        results = []
+        for name, func in all_stages.items():
+            if stages and name not in stages:
+                continue
+            times = time_stage(func, repeat)
+            results.append({
+                'stage': name,
+                'countries': n_countries,
+                'years': n_years,
+                'rows': len(df_long),
+                'seconds_min': min(times),
+                'seconds_median': statistics.median(times),
+            })
+            print(f"   {name:<18} {n_countries:>6}×{n_years:<4} min {min(times) * 1000:>10.2f} ms  "
+                  f"mediana {statistics.median(times) * 1000:>10.2f} ms")
+    return results
+
+
+def run_benchmarks(sizes, repeat=3, stages=None):
+    results = []
+    for n_countries, n_years in sizes:
+        print(f"\n⏱️  {n_countries} países × {n_years} años")
+        results.extend(run_size(n_countries, n_years, repeat, stages))
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold=1.2):
+    """
+    Compara dos ejecuciones por (etapa, países, años) usando el tiempo mínimo.
+
+    Returns:
+        tuple: (DataFrame de comparación, lista de regresiones)
+    """
+    key = ['stage', 'countries', 'years']
+    cur = pd.DataFrame(current['results']).set_index(key)['seconds_min']
+    base = pd.DataFrame(baseline['results']).set_index(key)['seconds_min']
+    table = pd.DataFrame({'baseline_s': base, 'current_s': cur}).dropna()
+    table['ratio'] = table['current_s'] / table['baseline_s']
+    regressions = table[table['ratio'] > threshold].reset_index().to_dict('records')
+    return table.reset_index(), regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks del pipeline sobre datos sintéticos')
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES, help='Tamaños países×años, p. ej. 1000x100')
+    parser.add_argument('--stages', nargs='+', default=None, help='Subconjunto de etapas a medir')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--out', type=Path, default=None, help='Archivo JSON de resultados')
+    parser.add_argument('--compare', type=Path, default=None, help='JSON de una ejecución anterior')
+    parser.add_argument('--threshold', type=float, default=1.2, help='Ratio a partir del cual se reporta regresión')
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    current = run_benchmarks([parse_size(s) for s in args.sizes], args.repeat, args.stages)
+
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+        print(f"\nGuardado: {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        table, regressions = compare(current, baseline, args.threshold)
+        print(f"\n📊 Comparación con {args.compare}:")
+        print(table.to_string(index=False, float_format=lambda v: f'{v:.4f}'))
+        if regressions:
+            print(f"\n⚠️ {len(regressions)} etapas más lentas que {args.threshold}× la referencia")
+            sys.exit(1)
+        print("\n✅ Sin regresiones")
+
+
+if __name__ == '__main__':
+    main()
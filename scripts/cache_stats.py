@@ -0,0 +1,63 @@
+"""
+Contadores de aciertos y fallos de las cachés de Streamlit.
+
+`st.cache_data` / `st.cache_resource` no exponen cuántas llamadas se sirven
+desde la caché. `tracked` envuelve la función cacheada: cuenta cada llamada y
+cada ejecución real del cuerpo (un fallo), de modo que aciertos = llamadas - fallos.
+Los contadores son globales al proceso, igual que las cachés.
+
+Usage (en streamlit_app.py):
+    @tracked(st.cache_data)
+    def load_model(path): ...
+"""
+
+import functools
+import threading
+from collections import Counter
+
+_calls = Counter()
+_misses = Counter()
+_lock = threading.Lock()
+
+
+def tracked(cache_decorator):
+    """Aplica `cache_decorator` (st.cache_data o st.cache_resource) contando aciertos y fallos."""
+    def decorate(func):
+        name = func.__name__
+
+        @functools.wraps(func)
+        def body(*args, **kwargs):
+            with _lock:
+                _misses[name] += 1
+            return func(*args, **kwargs)
+
+        cached = cache_decorator(body)
+
+        @functools.wraps(func)
+        def call(*args, **kwargs):
+            with _lock:
+                _calls[name] += 1
+            return cached(*args, **kwargs)
+
+        call.clear = cached.clear
+        return call
+    return decorate
+
+
+def snapshot():
+    """Llamadas, fallos y tasa de aciertos por función cacheada."""
+    with _lock:
+        return {
+            name: {
+                'calls': calls,
+                'misses': _misses[name],
+                'hit_rate': (calls - _misses[name]) / calls if calls else None,
+            }
+            for name, calls in sorted(_calls.items())
+        }
+
+
+def reset():
+    with _lock:
+        _calls.clear()
+        _misses.clear()
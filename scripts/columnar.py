@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Columnar storage for the exported production data.
+
+production_long.csv is stored as plain NumPy columns in an uncompressed .npz
+sorted by country, together with a per-country offset index, so a process can
+load it once and slice the series of one country in O(1) without re-parsing
+CSV or scanning the whole frame with a boolean mask.
+
+Arrays in the file:
+ - country_id, year, production : long-format columns sorted by [country_id, year]
+ - index_ids, index_names       : one entry per country with data
+ - offsets                      : rows of country i are offsets[i]:offsets[i + 1]
+ - countries_id, countries_name : full country id / name mapping (countries.csv)
+ - source_hash                  : SHA-256 of the production_long.csv the file was built from
+
+A copy whose source_hash does not match the current CSV is stale (the CSV was
+re-exported by another path) and `load_long` falls back to the CSV.
+
+Usage (build from the already exported CSVs):
+    python scripts/columnar.py --data-dir data/prediction_data
+
+"""
+
+import argparse
+import os
+import tempfile
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from hashing import file_hash
+
+
+def write_npz(df_long: pd.DataFrame, df_countries: pd.DataFrame, path: Path, source_hash: str = ''):
+    """
+    Guarda el formato largo como columnas NumPy con índice de offsets por país.
+
+    Args:
+        df_long: DataFrame [country_id, year, production, country_name]
+        df_countries: DataFrame [id, name]
+        path: Ruta del archivo .npz
+        source_hash: `file_hash` del CSV con el mismo contenido
+    """
+    df = df_long.sort_values(['country_id', 'year'], kind='stable')
+    country_id = df['country_id'].to_numpy(dtype=np.int64)
+
+    index_ids, starts = np.unique(country_id, return_index=True)
+    offsets = np.append(starts, len(df)).astype(np.int64)
+    index_names = df['country_name'].to_numpy(dtype=str)[starts] if len(df) else np.array([], dtype=str)
+
+    np.savez(
+        path,
+        country_id=country_id,
+        year=df['year'].to_numpy(dtype=np.int64),
+        production=df['production'].to_numpy(dtype=np.float64),
+        index_ids=index_ids,
+        index_names=index_names,
+        offsets=offsets,
+        countries_id=df_countries['id'].to_numpy(dtype=np.int64),
+        countries_name=df_countries['name'].to_numpy(dtype=str),
+        source_hash=np.array(source_hash),
+    )
+
+
+def npz_source_hash(path: Path) -> str:
+    """Hash del CSV de origen guardado en el .npz ('' si no lo tiene)."""
+    with np.load(path, allow_pickle=False) as data:
+        return str(data['source_hash']) if 'source_hash' in data.files else ''
+
+
+def is_current(npz_path: Path, csv_path: Path, csv_hash: str = None) -> bool:
+    """
+    True si el .npz existe y se generó desde el CSV actual. Sin CSV, la copia
+    columnar es la única fuente y se considera vigente.
+    """
+    if not Path(npz_path).exists():
+        return False
+    if not Path(csv_path).exists():
+        return True
+    return npz_source_hash(npz_path) == (csv_hash or file_hash(csv_path))
+
+
+def load_long(csv_path: Path, npz_path: Path = None, csv_hash: str = None, rebuild: bool = False) -> pd.DataFrame:
+    """
+    Formato largo desde la copia columnar si corresponde al CSV actual (por
+    defecto el .npz junto al CSV); si no, desde el CSV.
+
+    Con `rebuild`, una copia ausente o desactualizada se regenera desde el CSV
+    recién leído (con countries.csv si está junto al CSV), de modo que la
+    siguiente carga vuelva a evitar el CSV.
+    """
+    npz_path = Path(csv_path).with_suffix('.npz') if npz_path is None else Path(npz_path)
+    if is_current(npz_path, csv_path, csv_hash):
+        return ColumnarProduction(npz_path).to_long()
+    df_long = pd.read_csv(csv_path)
+    if rebuild:
+        countries_path = Path(csv_path).parent / 'countries.csv'
+        if countries_path.exists():
+            df_countries = pd.read_csv(countries_path)
+        else:
+            df_countries = (df_long.drop_duplicates('country_id')[['country_id', 'country_name']]
+                            .rename(columns={'country_id': 'id', 'country_name': 'name'}))
+        # Archivo temporal + reemplazo: otro proceso nunca lee una copia a medias
+        # Archivo temporal propio: dos procesos que regeneran a la vez no se pisan
+        fd, tmp_name = tempfile.mkstemp(dir=npz_path.parent, prefix=f'{npz_path.stem}.', suffix='.npz')
+        os.close(fd)
+        try:
+            write_npz(df_long, df_countries, Path(tmp_name), csv_hash or file_hash(csv_path))
+            os.replace(tmp_name, npz_path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+    return df_long
+
+
+class ColumnarProduction:
+    """Datos de producción cargados desde .npz con acceso O(1) por país."""
+
+    def __init__(self, path: Path):
+        with np.load(path, allow_pickle=False) as data:
+            self.country_id = data['country_id']
+            self.year = data['year']
+            self.production = data['production']
+            self.index_ids = data['index_ids']
+            self.index_names = data['index_names']
+            self.offsets = data['offsets']
+            self.countries_id = data['countries_id']
+            self.countries_name = data['countries_name']
+            self.source_hash = str(data['source_hash']) if 'source_hash' in data.files else ''
+
+        self._row_by_name = {name: i for i, name in enumerate(self.index_names.tolist())}
+        self._row_by_id = {cid: i for i, cid in enumerate(self.index_ids.tolist())}
+
+    def country_names(self):
+        """Nombres de todos los países (countries.csv)."""
+        return self.countries_name.tolist()
+
+    def _slice(self, row):
+        start, end = self.offsets[row], self.offsets[row + 1]
+        return pd.DataFrame({
+            'country_id': self.country_id[start:end],
+            'year': self.year[start:end],
+            'production': self.production[start:end],
+            'country_name': self.index_names[row],
+        })
+
+    def _slice_empty(self):
+        return pd.DataFrame({'country_id': [], 'year': [], 'production': [], 'country_name': []})
+
+    def history(self, country_name: str) -> pd.DataFrame:
+        """Serie histórica de un país por nombre (vacía si no tiene datos)."""
+        row = self._row_by_name.get(country_name)
+        if row is None:
+            return self._slice_empty()
+        return self._slice(row)
+
+    def history_by_id(self, country_id: int) -> pd.DataFrame:
+        """Serie histórica de un país por id (vacía si no tiene datos)."""
+        row = self._row_by_id.get(int(country_id))
+        if row is None:
+            return self._slice_empty()
+        return self._slice(row)
+
+    def to_long(self) -> pd.DataFrame:
+        """Reconstruye el DataFrame largo completo."""
+        rows = np.repeat(np.arange(len(self.index_ids)), np.diff(self.offsets))
+        return pd.DataFrame({
+            'country_id': self.country_id,
+            'year': self.year,
+            'production': self.production,
+            'country_name': self.index_names[rows],
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Genera production_long.npz a partir de los CSV exportados')
+    parser.add_argument('--data-dir', type=Path, default=Path('data/prediction_data'))
+    args = parser.parse_args()
+
+    df_long = pd.read_csv(args.data_dir / 'production_long.csv')
+    df_countries = pd.read_csv(args.data_dir / 'countries.csv')
+
+    npz_path = args.data_dir / 'production_long.npz'
+    write_npz(df_long, df_countries, npz_path, file_hash(args.data_dir / 'production_long.csv'))
+    print(f"Guardado: {npz_path} ({df_long.shape[0]} filas, {df_long['country_id'].nunique()} países)")
+
+
+if __name__ == '__main__':
+    main()
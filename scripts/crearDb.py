@@ -1,62 +1,149 @@
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
-import mysql.connector
-from mysql.connector import errorcode
+from mysql.connector import pooling
+
+import backend
+from schema import compact_dtypes, sql_rows, sql_type
+
+# Credenciales (se pueden sobreescribir con MYSQL_HOST, MYSQL_DB, MYSQL_USER, MYSQL_PASSWORD)
+DB_CONFIG = backend.MYSQL_CONFIG
+
+# executemany: una sentencia por hoja (comportamiento original)
+# chunked: INSERT multi-fila en lotes de --batch-size filas
+# infile: LOAD DATA LOCAL INFILE desde un CSV temporal
+LOAD_MODES = ["executemany", "chunked", "infile"]
+# Hojas cargadas a la vez: una conexión del pool por hoja
+DEFAULT_WORKERS = 4
 
 def create_table(cursor, table_name, df):
-    columns = []
-    for col, dtype in zip(df.columns, df.dtypes):
-        if "int" in str(dtype):
-            max_val = df[col].max(skipna=True)
-            if pd.notna(max_val) and abs(max_val) > 2000000000:
-                sql_type = "BIGINT"
-            else:
-                sql_type = "INT"
-        elif "float" in str(dtype):
-            sql_type = "DOUBLE"
-        else:
-            sql_type = "VARCHAR(255)"
-        col_name = col.replace(" ", "_").replace("-", "_")
-        columns.append(f"`{col_name}` {sql_type}")
+    # Tipos compactos inferidos por schema.compact_dtypes; los nulos se mantienen
+    columns = [f"`{col_name}` {sql_type(df[col])}" for col, col_name in zip(df.columns, column_names(df))]
     sql = f"CREATE TABLE IF NOT EXISTS `{table_name}` ({', '.join(columns)});"
     cursor.execute(sql)
     print(f"Tabla {table_name} creada")
 
+def column_names(df):
+    return [col.replace(" ", "_").replace("-", "_") for col in df.columns]
+
 def insert_data(cursor, table_name, df):
-    cols = [col.replace(" ", "_").replace("-", "_") for col in df.columns]
+    cols = column_names(df)
     placeholders = ", ".join(["%s"] * len(cols))
 
-    insert_sql = f"INSERT INTO {table_name} ({", ".join('`'+c+'`' for c in cols)}) VALUES ({placeholders})"
+    insert_sql = f"INSERT INTO {table_name} ({', '.join('`'+c+'`' for c in cols)}) VALUES ({placeholders})"
 
-    data = [tuple(row) for row in df.itertuples(index=False, name=None)]
-    cursor.executemany(insert_sql, data)
+    cursor.executemany(insert_sql, sql_rows(df))
 
-def main():
-    DB_HOST = "localhost"
-    DB_DATABASE = "coffee"
-    DB_USER = "analitica"
-    DB_PASSWORD = "Operador1704"
-    conn = mysql.connector.connect(
-            host=DB_HOST,
-            database=DB_DATABASE,
-            user=DB_USER,
-            password=DB_PASSWORD
+def insert_data_chunked(cursor, table_name, df, batch_size=1000):
+    cols = column_names(df)
+    col_list = ", ".join(f"`{c}`" for c in cols)
+    row_placeholders = "(" + ", ".join(["%s"] * len(cols)) + ")"
+
+    rows = sql_rows(df)
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        values = ", ".join([row_placeholders] * len(batch))
+        insert_sql = f"INSERT INTO `{table_name}` ({col_list}) VALUES {values}"
+        cursor.execute(insert_sql, [value for row in batch for value in row])
+
+def load_data_infile(cursor, table_name, df):
+    cols = column_names(df)
+    col_list = ", ".join(f"`{c}`" for c in cols)
+
+    # CSV temporal con NULL como \N, el formato nativo de LOAD DATA
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, newline="", encoding="utf-8") as tmp:
+        df.to_csv(tmp, index=False, header=False, na_rep="\\N", lineterminator="\n")
+        path = tmp.name
+    try:
+        cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE `{table_name}` CHARACTER SET utf8mb4 "
+            "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+            "LINES TERMINATED BY '\\n' "
+            f"({col_list})",
+            (path,)
         )
-    print("✅ Conectado a DB")
-    
-    cursor = conn.cursor()
+    finally:
+        os.remove(path)
 
-    xls = pd.ExcelFile("./data/clean/Dataset.xlsx")
-    for sheet_name in xls.sheet_names:
-        df = pd.read_excel(xls, sheet_name=sheet_name)
-        df = df.fillna("")
+def disable_checks(cursor):
+    # Solo afecta a la sesión actual. Con InnoDB no se usa ALTER TABLE ... DISABLE KEYS
+    # (solo aplica a MyISAM); las tablas recién creadas no tienen índices secundarios
+    cursor.execute("SET unique_checks = 0")
+    cursor.execute("SET foreign_key_checks = 0")
+
+def enable_checks(cursor):
+    cursor.execute("SET foreign_key_checks = 1")
+    cursor.execute("SET unique_checks = 1")
+
+def load_sheet(pool, sheet_name, df, mode="executemany", batch_size=1000):
+    start = time.perf_counter()
+    conn = pool.get_connection()
+    try:
+        cursor = conn.cursor()
         create_table(cursor, sheet_name, df)
-        insert_data(cursor, sheet_name, df)
+        disable_checks(cursor)
+        try:
+            if mode == "infile":
+                load_data_infile(cursor, sheet_name, df)
+            elif mode == "chunked":
+                insert_data_chunked(cursor, sheet_name, df, batch_size)
+            else:
+                insert_data(cursor, sheet_name, df)
+        finally:
+            enable_checks(cursor)
         conn.commit()
-        print(f"✅ {len(df)} insertados en tabla '{sheet_name}'")
+        cursor.close()
+    finally:
+        conn.close()
+    return len(df), time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga las hojas de Dataset.xlsx en MySQL")
+    parser.add_argument("--dataset", default="./data/clean/Dataset.xlsx")
+    parser.add_argument("--mode", choices=LOAD_MODES, default="executemany")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Filas por INSERT en modo chunked")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Hojas cargadas en paralelo (conexiones del pool)")
+    args = parser.parse_args()
+
+    if backend.is_embedded():
+        # COFFEE_DB_BACKEND=sqlite: no hay servidor, se construye la base embebida
+        path = backend.sqlite_path()
+        backend.build_sqlite(path)
+        print(f"✅ Base SQLite creada en {path}")
+        return
+
+    xls = pd.ExcelFile(args.dataset)
+    sheets = {}
+    for sheet_name in xls.sheet_names:
+        df = pd.read_excel(xls, sheet_name=sheet_name)
+        sheets[sheet_name] = compact_dtypes(df)
+        before, after = df.memory_usage(deep=True).sum(), sheets[sheet_name].memory_usage(deep=True).sum()
+        print(f"Hoja {sheet_name}: {before / 1024:.0f} KB -> {after / 1024:.0f} KB con tipos compactos")
+
+    # El pool abre todas sus conexiones al crearse: no más que hojas
+    workers = max(1, min(args.workers, len(sheets)))
+    pool = pooling.MySQLConnectionPool(
+            pool_name="crear_db",
+            pool_size=workers,
+            allow_local_infile=(args.mode == "infile"),
+            **DB_CONFIG
+        )
+    print(f"✅ Conectado a DB ({workers} conexiones)")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(load_sheet, pool, sheet_name, df, args.mode, args.batch_size): sheet_name
+            for sheet_name, df in sheets.items()
+        }
+        for future in as_completed(futures):
+            rows, seconds = future.result()
+            print(f"✅ {rows} insertados en tabla '{futures[future]}' ({seconds:.2f}s)")
 
-    cursor.close()
-    conn.close()
-    print("Fin")
+    print(f"Fin ({time.perf_counter() - start:.2f}s)")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
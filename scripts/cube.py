@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Cubo país × año × medida con producción, comercio y consumo.
+
+Todas las tablas anchas del esquema (ver pk_fk_sql.sql) se cargan en un único
+arreglo NumPy (n_países × n_años × n_medidas): cada tabla se escribe en su
+plano con una sola asignación indexada, sin uniones por país. Sobre el cubo se
+calculan las balanzas derivadas y los agregados por `coffee_type` y mundial,
+y todo se guarda en un .npz sin compresión que la app carga en memoria.
+
+Medidas:
+    production, domestic_consumption, exports, imports, importer_consumption,
+    re_exports (tablas del esquema) y las balanzas derivadas:
+    exportable_production = production - domestic_consumption
+    net_imports           = imports - re_exports
+    stock_change          = production - domestic_consumption - exports
+
+Las tablas de países productores usan años de cosecha ("1990/91") y las de
+comercio años calendario ("1990"); ambos se alinean por el año inicial. Un
+valor NaN indica que el país no reporta esa medida ese año (los valores
+negativos de las tablas, imposibles en kg, también se tratan como faltantes);
+las balanzas solo se calculan cuando todas sus medidas están reportadas.
+
+Arrays en el archivo:
+ - values                         : cubo (país × año × medida)
+ - country_id, country_name       : una entrada por país (countries)
+ - coffee_type                    : tipo de café del país ('' si no es productor)
+ - year, measure                  : ejes del cubo
+ - type_names, type_values        : agregado por coffee_type (tipo × año × medida)
+ - world_values                   : agregado mundial (año × medida)
+
+Usage:
+    python scripts/cube.py --out data/prediction_data/cube.npz
+"""
+
+import argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+import backend
+from reshape import WIDE_TABLES, parse_year_columns
+
+CUBE_PATH = Path('data/prediction_data/cube.npz')
+
+# Balanzas derivadas: nombre -> (medidas sumadas, medidas restadas)
+DERIVED = {
+    'exportable_production': (['production'], ['domestic_consumption']),
+    'net_imports': (['imports'], ['re_exports']),
+    'stock_change': (['production'], ['domestic_consumption', 'exports']),
+}
+MEASURES = WIDE_TABLES + list(DERIVED)
+
+
+def load_wide_tables(conn):
+    """Tablas anchas y países desde el backend configurado."""
+    tables = {table: pd.read_sql(f'SELECT * FROM `{table}`', con=conn) for table in WIDE_TABLES}
+    df_countries = pd.read_sql('SELECT id, name FROM countries', con=conn)
+    return tables, df_countries
+
+
+def _rollup(values, groups, n_groups):
+    """Suma por grupo a lo largo del eje de países; NaN si ningún país reporta."""
+    observed = ~np.isnan(values)
+    onehot = np.zeros((n_groups, len(groups)))
+    valid = groups >= 0
+    onehot[groups[valid], np.nonzero(valid)[0]] = 1
+    totals = np.einsum('gn,nym->gym', onehot, np.where(observed, values, 0.0))
+    counts = np.einsum('gn,nym->gym', onehot, observed.astype(float))
+    return np.where(counts > 0, totals, np.nan)
+
+
+def build_cube(tables: dict, df_countries: pd.DataFrame):
+    """
+    Construye el cubo y sus agregados.
+
+    Args:
+        tables: Tabla ancha de cada medida de WIDE_TABLES
+        df_countries: DataFrame [id, name]
+
+    Returns:
+        dict: Arrays listos para `np.savez` (ver docstring del módulo)
+    """
+    country_ids = df_countries['id'].to_numpy(dtype=np.int64)
+    row_of = pd.Series(np.arange(len(country_ids)), index=country_ids)
+
+    parsed = {table: parse_year_columns(df.columns) for table, df in tables.items()}
+    all_years = np.concatenate([years for _, years in parsed.values()])
+    years = np.arange(all_years.min(), all_years.max() + 1)
+
+    values = np.full((len(country_ids), len(years), len(MEASURES)), np.nan)
+    for m, table in enumerate(WIDE_TABLES):
+        df = tables[table]
+        year_cols, table_years = parsed[table]
+        rows = row_of.reindex(df['country_id'].to_numpy()).to_numpy()
+        known = ~np.isnan(rows)
+        block = df[year_cols].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)[known]
+        # Cantidades en kg: un valor negativo es un error de carga (p. ej. desborde de INT)
+        block[block < 0] = np.nan
+        values[rows[known].astype(int)[:, None], (table_years - years[0])[None, :], m] = block
+
+    for name, (plus, minus) in DERIVED.items():
+        idx = MEASURES.index
+        values[:, :, idx(name)] = (values[:, :, [idx(p) for p in plus]].sum(axis=2)
+                                   - values[:, :, [idx(m) for m in minus]].sum(axis=2))
+
+    # Tipo de café de cada país productor (tabla production; la primera fila si se repite el país)
+    types = tables['production'].drop_duplicates('country_id').set_index('country_id')['coffee_type']
+    coffee_type = pd.Series(country_ids).map(types).fillna('').to_numpy(dtype=str)
+    type_names = np.array(sorted(t for t in set(coffee_type) if t))
+    groups = np.searchsorted(type_names, coffee_type)
+    groups[coffee_type == ''] = -1
+
+    return {
+        'values': values,
+        'country_id': country_ids,
+        'country_name': df_countries['name'].to_numpy(dtype=str),
+        'coffee_type': coffee_type,
+        'year': years,
+        'measure': np.array(MEASURES),
+        'type_names': type_names,
+        'type_values': _rollup(values, groups, len(type_names)),
+        'world_values': _rollup(values, np.zeros(len(country_ids), dtype=int), 1)[0],
+    }
+
+
+def write_cube(cube: dict, path: Path):
+    np.savez(path, **cube)
+
+
+class Cube:
+    """Cubo cargado en memoria con consultas por país, agregado, medida y año."""
+
+    def __init__(self, path: Path = CUBE_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            self.values = data['values']
+            self.country_id = data['country_id']
+            self.country_name = data['country_name']
+            self.coffee_type = data['coffee_type']
+            self.year = data['year']
+            self.measure = data['measure']
+            self.type_names = data['type_names']
+            self.type_values = data['type_values']
+            self.world_values = data['world_values']
+
+        self._row_by_name = {name: i for i, name in enumerate(self.country_name.tolist())}
+        self._row_by_type = {name: i for i, name in enumerate(self.type_names.tolist())}
+        self._measure_idx = {name: i for i, name in enumerate(self.measure.tolist())}
+
+    def __contains__(self, country):
+        return country in self._row_by_name
+
+    def measures(self):
+        return self.measure.tolist()
+
+    def country_type(self, country: str) -> str:
+        """Tipo de café del país ('' si no es productor)."""
+        return str(self.coffee_type[self._row_by_name[country]])
+
+    def _frame(self, block, measures, years):
+        """DataFrame [year, *measures] a partir de un bloque (año × medida)."""
+        cols = [self._measure_idx[m] for m in measures]
+        keep = np.ones(len(self.year), dtype=bool) if years is None else np.isin(self.year, years)
+        df = pd.DataFrame(block[keep][:, cols], columns=list(measures))
+        df.insert(0, 'year', self.year[keep])
+        return df
+
+    def country(self, country: str, measures=None, years=None) -> pd.DataFrame:
+        """Serie de un país: columnas [year, *measures]."""
+        block = self.values[self._row_by_name[country]]
+        return self._frame(block, measures or self.measures(), years)
+
+    def coffee_type_rollup(self, coffee_type: str, measures=None, years=None) -> pd.DataFrame:
+        """Suma de los países de un tipo de café: columnas [year, *measures]."""
+        block = self.type_values[self._row_by_type[coffee_type]]
+        return self._frame(block, measures or self.measures(), years)
+
+    def world(self, measures=None, years=None) -> pd.DataFrame:
+        """Total mundial: columnas [year, *measures]."""
+        return self._frame(self.world_values, measures or self.measures(), years)
+
+    def slice(self, measure: str, countries=None, years=None) -> pd.DataFrame:
+        """Una medida para varios países: países en filas, años en columnas."""
+        rows = (np.arange(len(self.country_name)) if countries is None
+                else np.array([self._row_by_name[c] for c in countries]))
+        keep = np.ones(len(self.year), dtype=bool) if years is None else np.isin(self.year, years)
+        block = self.values[rows][:, keep, self._measure_idx[measure]]
+        return pd.DataFrame(block, index=self.country_name[rows], columns=self.year[keep])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Construye el cubo país × año × medida')
+    parser.add_argument('--out', type=Path, default=CUBE_PATH)
+    args = parser.parse_args()
+
+    print(f"Leyendo {len(WIDE_TABLES)} tablas anchas ({backend.get_backend()})...")
+    conn = backend.get_connection()
+    try:
+        tables, df_countries = load_wide_tables(conn)
+    finally:
+        conn.close()
+
+    cube = build_cube(tables, df_countries)
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    write_cube(cube, args.out)
+
+    n_countries, n_years, n_measures = cube['values'].shape
+    print(f"Guardado: {args.out} ({n_countries} países × {n_years} años × {n_measures} medidas, "
+          f"{cube['values'].nbytes / 1024:.0f} KB)")
+
+
+if __name__ == '__main__':
+    main()
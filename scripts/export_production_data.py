@@ -5,35 +5,205 @@ Export production historic data from MySQL into CSV files consumable by Streamli
 Outputs:
  - <out_dir>/production_long.csv  : long format with columns [country_id, country_name, year, production]
  - <out_dir>/countries.csv       : country id / name mapping
+ - <out_dir>/production_long.npz : columnar copy with a per-country offset index (see columnar.py)
+ - <out_dir>/export_manifest.json : per-country checksums of the last export (used by --incremental)
 
 Usage:
-    python scripts/export_production_data.py --out-dir data/clean/csv
+    python scripts/export_production_data.py --out-dir data/prediction_data
+    python scripts/export_production_data.py --out-dir data/prediction_data --incremental
+    python scripts/export_production_data.py --out-dir data/prediction_data --stream --chunk-size 5000
+    python scripts/export_production_data.py --out-dir data/prediction_data --all-tables --workers 4
+
+Every mode reads production in long format through backend.py: with the
+embedded engine the unpivot and the join with countries run in SQL, with MySQL
+the wide table is reshaped by reshape.wide_to_long.
+
+With --incremental only the countries whose year values changed since the last
+export are rewritten; when nothing changed the output files are left untouched,
+so caches keyed on them stay valid. The manifest keeps a checksum of each
+country's (year, value) pairs, normalized to int64 / float64 so it does not
+depend on the compact dtypes or the backend, and the byte range of each
+country in the CSV: the rows of unchanged countries are copied byte for byte
+and only the changed countries are formatted again.
+
+With --stream the production table is read through an unbuffered (server-side)
+cursor in fixed-size chunks; each long-format chunk is appended to the CSV, so
+peak memory does not grow with the table size. The .npz copy and the manifest
+are not rewritten in this mode: both record the hash of the CSV they were built
+from, so the app rebuilds a stale .npz (see columnar.py) and --incremental falls
+back to a full export when the manifest does not describe the current CSV.
+
+With --all-tables every wide table of the schema (production, domestic_consumption,
+exports, imports, importer_consumption, re_exports) is exported concurrently over
+a thread pool and a MySQL connection pool, to <out_dir>/<table>_long.csv with
+columns [country_id, year, <table>, country_name], plus countries.csv. The time
+spent on each table is reported.
 
 Environment variables to override DB credentials (optional):
     MYSQL_HOST, MYSQL_DB, MYSQL_USER, MYSQL_PASSWORD
 
+Set COFFEE_DB_BACKEND=sqlite to run against the embedded SQLite engine built
+from data/clean/csv instead of a MySQL server (see backend.py).
+
+In memory the long tables use the compact dtypes of schema.py (int32 ids and
+years, int32 / int64 values, categorical country names).
+
+Set COFFEE_TRACE to a .jsonl or .prom path to record per-stage timings
+(see instrument.py).
+
 """
 
 import os
 import argparse
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
 from pathlib import Path
+import numpy as np
 import pandas as pd
-import mysql.connector
 
-# Defaults (local DB only)
-DEFAULT_DB = {
-    'host': 'localhost',
-    'database': 'coffee',
-    'user': 'analitica',
-    'password': 'Operador1704'
-}
+import backend
+from columnar import write_npz
+from hashing import file_hash
+from instrument import span
+from reshape import WIDE_TABLES
+from schema import compact_dtypes
+
+
+MANIFEST_NAME = 'export_manifest.json'
+# Bump when the checksums or the offsets change meaning
+MANIFEST_VERSION = 2
+LONG_COLUMNS = ['country_id', 'year', 'production', 'country_name']
 
 
 def get_connection():
-    return mysql.connector.connect(**DEFAULT_DB)
+    return backend.get_connection()
+
+
+def frame_checksum(df: pd.DataFrame) -> str:
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.sha1(row_hashes.tobytes()).hexdigest()
+
+
+def country_blocks(country_ids):
+    """(country_id, inicio, fin) de las filas consecutivas de cada país."""
+    country_ids = np.asarray(country_ids, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, country_ids[1:] != country_ids[:-1]]) if len(country_ids) else []
+    ends = np.r_[starts[1:], len(country_ids)] if len(starts) else []
+    return [(int(country_ids[start]), int(start), int(end)) for start, end in zip(starts, ends)]
+
+
+def country_checksums(df_long: pd.DataFrame) -> dict:
+    """
+    Checksum de los pares (año, valor) de cada país, por country_id.
+
+    Los años se normalizan a int64 y los valores a float64 antes de calcularlo,
+    así que no depende de los tipos compactos ni del backend que leyó la tabla.
+    """
+    df_long = df_long.sort_values(['country_id', 'year'], kind='stable')
+    years = df_long['year'].to_numpy(dtype=np.int64)
+    values = df_long['production'].to_numpy(dtype=np.float64)
+    return {
+        str(country_id): hashlib.sha1(years[start:end].tobytes() + values[start:end].tobytes()).hexdigest()
+        for country_id, start, end in country_blocks(df_long['country_id'])
+    }
+
 
+def country_offsets(path: Path, country_ids) -> dict:
+    """
+    Rango de bytes [inicio, fin) de las filas de cada país en el CSV, por country_id.
 
-def export(out_dir: Path):
+    `country_ids` es el país de cada fila en el orden del archivo; sin una
+    línea por fila (p. ej. un salto de línea dentro de un campo) devuelve None.
+    """
+    data = np.frombuffer(Path(path).read_bytes(), dtype=np.uint8)
+    newlines = np.flatnonzero(data == ord('\n'))
+    if len(newlines) != len(country_ids) + 1:
+        return None
+    return {str(country_id): [int(newlines[start]) + 1, int(newlines[end]) + 1]
+            for country_id, start, end in country_blocks(country_ids)}
+
+
+def load_manifest(out_dir: Path) -> dict:
+    path = out_dir / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    # Checksums of an older format cannot be compared
+    return manifest if manifest.get('version') == MANIFEST_VERSION else {}
+
+
+def save_manifest(out_dir: Path, checksums: dict, countries_checksum: str, offsets: dict):
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'exported_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        # The CSV these checksums describe; another export may have replaced it since
+        'source_hash': file_hash(out_dir / 'production_long.csv'),
+        'countries_checksum': countries_checksum,
+        'countries': checksums,
+        'offsets': offsets,
+    }
+    with open(out_dir / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def splice_countries(prod_path: Path, df_long: pd.DataFrame, changed, offsets: dict) -> dict:
+    """
+    Reescribe el CSV copiando tal cual los bytes de los países sin cambios y
+    formateando solo las filas de los países en `changed`.
+
+    Returns:
+        dict: Rango de bytes de cada país en el nuevo archivo
+    """
+    previous = prod_path.read_bytes()
+    tmp_path = prod_path.with_name(prod_path.name + '.tmp')
+    changed = set(changed)
+    new_offsets = {}
+    with open(tmp_path, 'wb') as f:
+        f.write(previous[:previous.index(b'\n') + 1])
+        for country_id, start, end in country_blocks(df_long['country_id']):
+            key, position = str(country_id), f.tell()
+            if key in changed:
+                f.write(df_long.iloc[start:end].to_csv(index=False, header=False, lineterminator='\n').encode())
+            else:
+                first, last = offsets[key]
+                f.write(previous[first:last])
+            new_offsets[key] = [position, f.tell()]
+    os.replace(tmp_path, prod_path)
+    return new_offsets
+
+
+def write_outputs(df_long: pd.DataFrame, df_countries: pd.DataFrame, out_dir: Path, changed=None, offsets=None):
+    """
+    Writes the CSV, countries.csv and the .npz. With `changed` and the byte
+    `offsets` of the previous export, only the changed countries are formatted
+    and the rest of the CSV is copied from the previous file.
+
+    Returns:
+        dict | None: Byte range of each country in the CSV
+    """
+    prod_path = out_dir / 'production_long.csv'
+    countries_path = out_dir / 'countries.csv'
+    npz_path = out_dir / 'production_long.npz'
+
+    if changed is None:
+        df_long.to_csv(prod_path, index=False, lineterminator='\n')
+        offsets = country_offsets(prod_path, df_long['country_id'])
+    else:
+        offsets = splice_countries(prod_path, df_long, changed, offsets)
+    df_countries.to_csv(countries_path, index=False)
+    write_npz(df_long, df_countries, npz_path, file_hash(prod_path))
+
+    print(f"Guardado: {prod_path} ({df_long.shape[0]} filas)")
+    print(f"Guardado: {countries_path} ({df_countries.shape[0]} filas)")
+    print(f"Guardado: {npz_path} (columnar, índice por país)")
+    return offsets
+
+
+def export(out_dir: Path, incremental: bool = False):
     out_dir.mkdir(parents=True, exist_ok=True)
 
     print("Conectando a la base de datos...")
@@ -41,61 +211,165 @@ def export(out_dir: Path):
 
     try:
         print("Leyendo tablas 'production' y 'countries'...")
-        df_production = pd.read_sql('SELECT * FROM production', con=conn)
-        df_countries = pd.read_sql('SELECT id, name FROM countries', con=conn)
+        with span('load'):
+            # Formato largo desde el backend: con el motor embebido el despliegue es SQL
+            df_long = compact_dtypes(backend.load_long_table(conn, 'production'))
+            df_countries = pd.read_sql('SELECT id, name FROM countries', con=conn)
+    finally:
+        conn.close()
+
+    print(f"Production (formato largo): {df_long.shape}")
+    print(f"Countries shape: {df_countries.shape}")
+    if len(df_long):
+        print(f"Años: {df_long['year'].min()} - {df_long['year'].max()}")
+
+    checksums = country_checksums(df_long)
+    countries_checksum = frame_checksum(df_countries)
+
+    prod_path = out_dir / 'production_long.csv'
+    manifest = load_manifest(out_dir) if incremental else {}
+    previous = manifest.get('countries')
+
+    # Full export: first run, no manifest, the country names changed, or the CSV
+    # was written by another export (e.g. --stream) after the manifest
+    if (previous is None or not manifest.get('offsets') or not prod_path.exists()
+            or manifest.get('countries_checksum') != countries_checksum
+            or manifest.get('source_hash') != file_hash(prod_path)):
+        if incremental:
+            print("Sin manifiesto válido o con países modificados: exportación completa")
+        with span('export', rows=len(df_long)):
+            offsets = write_outputs(df_long, df_countries, out_dir)
+            save_manifest(out_dir, checksums, countries_checksum, offsets)
+        return
+
+    changed = [cid for cid, checksum in checksums.items() if previous.get(cid) != checksum]
+    removed = [cid for cid in previous if cid not in checksums]
+    skipped = len(checksums) - len(changed)
+
+    print(f"Países sin cambios (omitidos): {skipped}")
+    print(f"Países modificados o nuevos: {len(changed)}  Eliminados: {len(removed)}")
+
+    if not changed and not removed:
+        print("Sin cambios: no se reescribe ningún archivo")
+        return
+
+    # Only the changed countries are formatted; the other rows are copied byte for byte
+    rows = int(df_long['country_id'].astype(str).isin(changed).sum())
+    with span('export', rows=rows):
+        offsets = write_outputs(df_long, df_countries, out_dir, changed, manifest['offsets'])
+        save_manifest(out_dir, checksums, countries_checksum, offsets)
+
+
+def export_streaming(out_dir: Path, chunk_size: int = 10000):
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    prod_path = out_dir / 'production_long.csv'
+    countries_path = out_dir / 'countries.csv'
+    tmp_path = out_dir / 'production_long.csv.tmp'
+
+    print("Conectando a la base de datos...")
+    conn = get_connection()
 
-        print(f"Production shape: {df_production.shape}")
-        print(f"Countries shape: {df_countries.shape}")
+    try:
+        df_countries = pd.read_sql('SELECT id, name FROM countries', con=conn)
 
-        # Identify year columns
-        ignore_cols = {'id', 'country_id', 'coffee_type', 'total'}
-        year_cols = [col for col in df_production.columns if col not in ignore_cols]
+        print(f"Leyendo tabla 'production' en bloques de {chunk_size} filas...")
+        rows_out = 0
+        # Lectura, despliegue y escritura intercalados por bloque: un solo span.
+        # Con el motor embebido los bloques ya salen en formato largo del SQL
+        with span('export', mode='stream', chunk_size=chunk_size), \
+                open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            f.write(','.join(LONG_COLUMNS) + '\n')
+            for chunk in backend.iter_long_chunks(conn, 'production', chunk_size, df_countries=df_countries):
+                df_chunk = compact_dtypes(chunk)
+                df_chunk[LONG_COLUMNS].to_csv(f, index=False, header=False)
+                rows_out += len(df_chunk)
+    finally:
+        conn.close()
 
-        if not year_cols:
-            raise RuntimeError('No se encontraron columnas de años en la tabla production')
+    os.replace(tmp_path, prod_path)
+    df_countries.to_csv(countries_path, index=False)
 
-        print(f"Columnas de año detectadas: {len(year_cols)} ({year_cols[0]} - {year_cols[-1]})")
+    print(f"Guardado: {prod_path} ({rows_out} filas)")
+    print(f"Guardado: {countries_path} ({df_countries.shape[0]} filas)")
 
-        # Transform to long format
-        data_long = []
-        for _, row in df_production.iterrows():
-            country_id = row['country_id']
-            for year_col in year_cols:
-                try:
-                    year = int(str(year_col).split('/')[0])
-                except Exception:
-                    # if column name is already a year number
-                    try:
-                        year = int(year_col)
-                    except Exception:
-                        # fallback: keep original column name
-                        year = year_col
 
-                production = row[year_col]
-                if pd.notna(production):
-                    data_long.append({'country_id': country_id, 'year': year, 'production': production})
+def export_table(pool, table: str, df_countries: pd.DataFrame, out_dir: Path):
+    """Exporta una tabla ancha a <table>_long.csv usando una conexión del pool.
 
-        df_long = pd.DataFrame(data_long)
+    El despliegue a formato largo se ejecuta en el motor cuando es embebido.
+    """
+    start = time.perf_counter()
+    conn = pool.get_connection()
+    try:
+        with span('load', table=table):
+            df_long = compact_dtypes(backend.load_long_table(conn, table))
+    finally:
+        conn.close()
+    read_seconds = time.perf_counter() - start
 
-        # Merge country names
-        df_long = df_long.merge(df_countries.rename(columns={'id': 'country_id', 'name': 'country_name'}), on='country_id', how='left')
+    path = out_dir / f'{table}_long.csv'
+    with span('export', table=table, rows=len(df_long)):
+        df_long.to_csv(path, index=False)
+        if table == 'production':
+            write_npz(df_long, df_countries, out_dir / 'production_long.npz', file_hash(path))
 
-        # Sort
-        df_long = df_long.sort_values(['country_id', 'year']).reset_index(drop=True)
+    return len(df_long), read_seconds, time.perf_counter() - start
 
-        # Save outputs
-        prod_path = out_dir / 'production_long.csv'
-        countries_path = out_dir / 'countries.csv'
 
-        df_long.to_csv(prod_path, index=False)
-        df_countries.to_csv(countries_path, index=False)
+def export_all(out_dir: Path, workers: int = 4):
+    out_dir.mkdir(parents=True, exist_ok=True)
 
-        print(f"Guardado: {prod_path} ({df_long.shape[0]} filas)")
-        print(f"Guardado: {countries_path} ({df_countries.shape[0]} filas)")
+    print("Conectando a la base de datos...")
+    pool = backend.get_pool(workers, 'export_all')
 
+    start = time.perf_counter()
+    conn = pool.get_connection()
+    try:
+        df_countries = pd.read_sql('SELECT id, name FROM countries', con=conn)
     finally:
         conn.close()
+    countries_path = out_dir / 'countries.csv'
+    df_countries.to_csv(countries_path, index=False)
+    print(f"Guardado: {countries_path} ({df_countries.shape[0]} filas)")
+
+    print(f"Exportando {len(WIDE_TABLES)} tablas con {workers} hilos ({backend.get_backend()})...")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(export_table, pool, table, df_countries, out_dir): table
+            for table in WIDE_TABLES
+        }
+        for future in as_completed(futures):
+            table = futures[future]
+            rows, read_seconds, seconds = future.result()
+            print(f"Guardado: {out_dir / f'{table}_long.csv'} ({rows} filas) "
+                  f"en {seconds:.2f}s (lectura y despliegue {read_seconds:.2f}s)")
+
+    print(f"Exportación completa en {time.perf_counter() - start:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exporta la producción histórica desde MySQL')
+    parser.add_argument('--out-dir', type=Path, default=Path('data/prediction_data'))
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--incremental', action='store_true',
+                      help='Reescribe solo los países cuyos valores cambiaron desde la última exportación')
+    mode.add_argument('--stream', action='store_true',
+                      help='Lee y escribe por bloques con memoria acotada')
+    mode.add_argument('--all-tables', action='store_true',
+                      help='Exporta en paralelo todas las tablas anchas del esquema')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='Filas por bloque en modo --stream')
+    parser.add_argument('--workers', type=int, default=4, help='Hilos y conexiones en modo --all-tables')
+    args = parser.parse_args()
+
+    with span('export_production_data'):
+        if args.all_tables:
+            export_all(args.out_dir, workers=args.workers)
+        elif args.stream:
+            export_streaming(args.out_dir, chunk_size=args.chunk_size)
+        else:
+            export(args.out_dir, incremental=args.incremental)
 
 
 if __name__ == '__main__':
-    export(Path("./data/predictionData"))
+    main()
@@ -0,0 +1,156 @@
+"""
+Features del modelo de producción de café, compartidas por entrenamiento,
+backtesting y la aplicación.
+
+Las features de un año t se calculan solo con la historia hasta t-1, igual que
+al pronosticar. Para cada fila se construye la matriz de estado (los últimos
+valores observados del país, último año en la columna final) y todas las
+features salen de la misma función `step_features`, tanto en el pase agrupado
+sobre todo el panel (`add_features`) como en la actualización incremental de
+un paso del pronóstico recursivo (`advance_state`).
+
+Features (ventana = 3, lags = 1):
+    rolling_mean_3y   Promedio de los últimos 3 años
+    rolling_std_3y    Desviación estándar (poblacional) de los últimos 3 años
+    production_lag1   Producción del año anterior
+    pct_change_1y     Cambio porcentual del último año (0 si no es calculable)
+    mean_x_pct        rolling_mean × pct_change (interacción)
+    volatility_norm   rolling_std / (rolling_mean + 1) (interacción)
+"""
+
+import numpy as np
+
+from panel import ProductionPanel
+
+WINDOW = 3
+LAGS = 1
+
+
+def feature_names(window=WINDOW, lags=LAGS):
+    """Nombres de las features en el orden que espera el modelo."""
+    return ([f'rolling_mean_{window}y', f'rolling_std_{window}y']
+            + [f'production_lag{k}' for k in range(1, lags + 1)]
+            + ['pct_change_1y', 'mean_x_pct', 'volatility_norm'])
+
+
+FEATURE_COLS = feature_names()
+
+
+def spec_from_names(names):
+    """
+    Recupera (window, lags) a partir de los nombres de las features.
+
+    Permite servir cualquier modelo entrenado con `feature_names`, p. ej.
+    usando `model.feature_names_in_` de scikit-learn.
+    """
+    names = list(names)
+    window = int(names[0][len('rolling_mean_'):-1])
+    lags = sum(1 for name in names if name.startswith('production_lag'))
+    if names != feature_names(window, lags):
+        raise ValueError(f'Features no reconocidas: {names}')
+    return window, lags
+
+
+def model_spec(model):
+    """(window, lags) del modelo; la configuración por defecto si no guarda nombres."""
+    names = getattr(model, 'feature_names_in_', None)
+    if names is None:
+        return WINDOW, LAGS
+    return spec_from_names(names)
+
+
+def history_length(window=WINDOW, lags=LAGS):
+    """Años de historia que debe conservar el estado para calcular las features."""
+    return max(window, lags + 1, 2)
+
+
+def step_features(state, window=WINDOW, lags=LAGS):
+    """
+    Calcula las features a partir de la historia reciente de cada fila.
+
+    Args:
+        state: Matriz (n × history_length) con la historia más reciente,
+               último año en la columna final (NaN = sin dato)
+        window: Años de la ventana móvil
+        lags: Número de features de rezago (production_lag1..lagN)
+
+    Returns:
+        np.ndarray: Matriz (n × n_features) en el orden de `feature_names`
+    """
+    state = np.asarray(state, dtype=float)
+    recent = state[:, -window:]
+    counts = np.sum(~np.isnan(recent), axis=1)
+
+    rolling_mean = np.zeros(len(state))
+    rolling_std = np.zeros(len(state))
+    observed = counts > 0
+    rolling_mean[observed] = np.nanmean(recent[observed], axis=1)
+    rolling_std[observed] = np.nanstd(recent[observed], axis=1)
+
+    lag_values = [state[:, -k] for k in range(1, lags + 1)]
+    last, prev = state[:, -1], state[:, -2]
+
+    # Cambio porcentual evitando división por cero (0 si no hay año previo)
+    valid = ~np.isnan(last) & ~np.isnan(prev) & (prev != 0)
+    pct_change = np.zeros(len(state))
+    pct_change[valid] = (last[valid] - prev[valid]) / prev[valid]
+
+    mean_x_pct = rolling_mean * pct_change
+    volatility_norm = np.zeros(len(state))
+    positive = rolling_mean > 0
+    volatility_norm[positive] = rolling_std[positive] / (rolling_mean[positive] + 1)
+
+    return np.column_stack([rolling_mean, rolling_std, *lag_values,
+                            pct_change, mean_x_pct, volatility_norm])
+
+
+def advance_state(state, values):
+    """
+    Actualización incremental de un paso: desplaza el estado y agrega el
+    nuevo valor (observado o predicho) de cada fila en la última columna.
+    """
+    return np.concatenate([state[:, 1:], np.asarray(values, dtype=float)[:, None]], axis=1)
+
+
+def lagged_state(df, width, value_col='production', group_col='country_id'):
+    """
+    Matriz de estado de cada fila del panel: los `width` valores previos del
+    mismo país (columna final = t-1). El DataFrame debe estar ordenado por
+    país y año.
+    """
+    grouped = df.groupby(group_col, sort=False)[value_col]
+    return np.column_stack([grouped.shift(k).to_numpy(dtype=float)
+                            for k in range(width, 0, -1)])
+
+
+def add_features(df, window=WINDOW, lags=LAGS, min_history=None):
+    """
+    Agrega las features a todas las filas del panel en un pase agrupado.
+
+    Args:
+        df: DataFrame largo con columnas [country_id, year, production], o
+            un `ProductionPanel` (la historia previa sale de su matriz)
+        window: Años de la ventana móvil
+        lags: Número de features de rezago
+        min_history: Años previos observados exigidos para conservar una fila
+                     (por defecto la ventana completa)
+
+    Returns:
+        pd.DataFrame: Copia ordenada por país y año con las columnas de
+        `feature_names(window, lags)`; se descartan las filas sin historia
+        suficiente
+    """
+    min_history = window if min_history is None else min_history
+    if isinstance(df, ProductionPanel):
+        df, state = df.lagged(history_length(window, lags))
+    else:
+        df = df.sort_values(['country_id', 'year'], kind='stable').reset_index(drop=True)
+        state = lagged_state(df, history_length(window, lags))
+
+    X = step_features(state, window, lags)
+    df[feature_names(window, lags)] = X
+
+    enough = np.sum(~np.isnan(state[:, -window:]), axis=1) >= min_history
+    for k in range(1, lags + 1):
+        enough &= ~np.isnan(state[:, -k])
+    return df[enough].reset_index(drop=True)
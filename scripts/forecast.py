@@ -0,0 +1,254 @@
+"""
+Motor de pronóstico recursivo por lotes para la producción de café.
+
+En lugar de avanzar un país a la vez (una llamada a ``model.predict`` por país
+y por año), el motor mantiene el estado de todos los países en una matriz
+(n_países × ventana) y avanza todos juntos: cada paso del horizonte construye
+la matriz de features (n_países × n_features) con `features.step_features` y
+hace una única llamada a ``model.predict``.
+
+Los intervalos de predicción se obtienen por Monte Carlo (`simulate_paths`):
+todas las trayectorias de todos los países avanzan como un único lote de
+(trayectorias × países) filas, sumando a cada predicción un residuo del ajuste
+remuestreado del propio país, y el resultado es un arreglo (trayectorias × países × horizonte).
+Con `keys` (los country_id) el ruido de cada país sale de un generador propio
+sembrado con (seed, country_id): sus bandas no dependen de qué otros países
+van en el lote, así que coinciden al simular un país solo, todo el panel o un
+fragmento en otro proceso.
+
+Uso desde Python:
+    from forecast import forecast_all, forecast_intervals
+    df_preds = forecast_all(model, df_long, years_ahead=10)
+    df_bands = forecast_intervals(model, df_long, years_ahead=10, n_paths=2000)
+"""
+
+import numpy as np
+import pandas as pd
+
+from features import WINDOW, LAGS, add_features, advance_state, feature_names, history_length, model_spec, step_features
+from panel import as_panel
+
+# Cuantiles reportados por defecto (banda del 90 % y mediana)
+QUANTILES = (0.05, 0.5, 0.95)
+
+
+def build_state(df_long, window=None):
+    """
+    Construye el estado inicial del pronóstico: los últimos `window` valores
+    observados de cada país, alineados a la derecha.
+
+    Args:
+        df_long: DataFrame en formato largo con columnas
+                 [country_id, year, production] (country_name opcional),
+                 o un `ProductionPanel`
+        window: Número de años de historia a conservar por país
+                (por defecto `features.history_length()`)
+
+    Returns:
+        tuple: (country_ids, country_names, last_years, state) donde `state`
+               es una matriz (n_países × window); los países con menos
+               historia quedan rellenados con NaN a la izquierda.
+    """
+    window = history_length() if window is None else window
+    panel = as_panel(df_long)
+    return panel.country_ids, panel.country_names, panel.last_years(), panel.state(window)
+
+
+def forecast_recursive(model, state, years_ahead, window=WINDOW, lags=LAGS):
+    """
+    Pronostica `years_ahead` pasos para todos los países a la vez.
+
+    En cada paso se calcula la matriz de features del lote, se hace una sola
+    llamada a `model.predict` y la predicción se desplaza dentro del estado.
+    Las predicciones negativas se reemplazan por el promedio móvil.
+
+    Args:
+        model: Modelo con método `predict`
+        state: Matriz (n_países × window) devuelta por `build_state`
+        years_ahead: Número de años a predecir
+        window, lags: Configuración de features con la que se entrenó el modelo
+
+    Returns:
+        np.ndarray: Matriz (n_países × years_ahead) de predicciones
+    """
+    state = np.array(state, dtype=float)
+    predictions = np.empty((state.shape[0], years_ahead))
+    if state.shape[0] == 0:
+        return predictions
+
+    for step in range(years_ahead):
+        X_pred = step_features(state, window, lags)
+        pred = np.asarray(model.predict(X_pred), dtype=float)
+        pred = np.where(pred < 0, X_pred[:, 0], pred)
+
+        predictions[:, step] = pred
+        state = advance_state(state, pred)
+
+    return predictions
+
+
+def forecast_all(model, df_long, years_ahead=10, window=None, lags=None):
+    """
+    Genera el pronóstico recursivo de todos los países del DataFrame.
+
+    Args:
+        model: Modelo entrenado
+        df_long: DataFrame largo [country_id, year, production, country_name]
+                 o `ProductionPanel`
+        years_ahead: Número de años a predecir
+        window, lags: Configuración de features con la que se entrenó el modelo
+                      (por defecto se obtiene del propio modelo)
+
+    Returns:
+        pd.DataFrame: Columnas [country_id, country_name, year, predicted_production]
+    """
+    if window is None or lags is None:
+        window, lags = model_spec(model)
+    country_ids, country_names, last_years, state = build_state(df_long, history_length(window, lags))
+    predictions = forecast_recursive(model, state, years_ahead, window, lags)
+
+    steps = np.arange(1, years_ahead + 1)
+    return pd.DataFrame({
+        'country_id': np.repeat(country_ids, years_ahead),
+        'country_name': np.repeat(country_names, years_ahead),
+        'year': (last_years[:, None] + steps[None, :]).ravel(),
+        'predicted_production': predictions.ravel(),
+    })
+
+
+def residual_pools(model, df_features, country_ids, window=WINDOW, lags=LAGS, min_count=5):
+    """
+    Residuos del ajuste de cada país, relativos a su promedio móvil.
+
+    La producción varía varios órdenes de magnitud entre países y también su
+    volatilidad, así que cada país remuestrea sus propios residuos divididos
+    por `rolling_mean` (su escala reciente). Los países con menos de
+    `min_count` residuos usan los cuantiles del conjunto de todos los países.
+
+    Args:
+        df_features: DataFrame con [country_id, production] y las columnas de
+                     `feature_names` (p. ej. la salida de `features.add_features`)
+        country_ids: Orden de las filas (el de `build_state`)
+
+    Returns:
+        np.ndarray: Matriz (n_países × k) de residuos relativos (y - ŷ) / rolling_mean,
+        rellenada con NaN a la derecha
+    """
+    X = df_features[feature_names(window, lags)].to_numpy(dtype=float)
+    valid = X[:, 0] > 0
+    residuals = ((df_features['production'].to_numpy(dtype=float)[valid]
+                  - np.asarray(model.predict(X[valid]), dtype=float)) / X[valid, 0])
+    ids = df_features['country_id'].to_numpy()[valid]
+
+    order = np.argsort(ids, kind='stable')
+    ids, residuals = ids[order], residuals[order]
+    starts = np.searchsorted(ids, country_ids, side='left')
+    counts = np.searchsorted(ids, country_ids, side='right') - starts
+    width = max(int(counts.max(initial=0)), min_count)
+
+    pools = np.full((len(country_ids), width), np.nan)
+    pooled = np.quantile(residuals, np.linspace(0, 1, width)) if len(residuals) else np.zeros(width)
+    for row, (start, count) in enumerate(zip(starts, counts)):
+        pools[row, :count] = residuals[start:start + count]
+        if count < min_count:
+            pools[row] = pooled
+    return pools
+
+
+def simulate_paths(model, state, years_ahead, residuals, n_paths=1000, window=WINDOW, lags=LAGS, seed=None,
+                   keys=None):
+    """
+    Simula `n_paths` trayectorias del pronóstico recursivo para todos los países.
+
+    El estado se replica una vez por trayectoria y todas las filas
+    (trayectorias × países) avanzan juntas: una llamada a `model.predict` por
+    paso. A cada predicción se le suma un residuo relativo remuestreado del
+    propio país, escalado por el promedio móvil de la fila; los valores
+    negativos se reemplazan por el promedio móvil, como en `forecast_recursive`.
+
+    Args:
+        residuals: Matriz (n_países × k) de `residual_pools`, o un vector
+                   común a todos los países
+        keys: Identificador entero de cada fila (p. ej. country_id) para
+              sembrar un generador por fila; sin `keys`, un solo generador
+              para todo el lote
+
+    Returns:
+        np.ndarray: Arreglo (n_paths × n_países × years_ahead)
+    """
+    state = np.asarray(state, dtype=float)
+    n_countries = state.shape[0]
+    paths = np.empty((n_paths * n_countries, years_ahead))
+    if n_countries == 0:
+        return paths.reshape(n_paths, 0, years_ahead)
+
+    residuals = np.asarray(residuals, dtype=float)
+    if residuals.ndim == 1:
+        residuals = np.broadcast_to(residuals, (n_countries, len(residuals)))
+    counts = np.sum(~np.isnan(residuals), axis=1)
+    if keys is None:
+        uniform = np.random.default_rng(seed).random((n_paths, n_countries, years_ahead))
+    else:
+        entropy = np.random.SeedSequence(seed).entropy
+        uniform = np.stack([np.random.default_rng([entropy, int(key)]).random((n_paths, years_ahead))
+                            for key in keys], axis=1)
+    picks = (uniform * counts[None, :, None]).astype(int)
+    noise = residuals[np.arange(n_countries)[None, :, None], picks].reshape(-1, years_ahead)
+
+    sim = np.tile(state, (n_paths, 1))
+    for step in range(years_ahead):
+        X_pred = step_features(sim, window, lags)
+        pred = np.asarray(model.predict(X_pred), dtype=float) + noise[:, step] * X_pred[:, 0]
+        pred = np.where(pred < 0, X_pred[:, 0], pred)
+
+        paths[:, step] = pred
+        sim = advance_state(sim, pred)
+
+    return paths.reshape(n_paths, n_countries, years_ahead)
+
+
+def quantile_columns(quantiles=QUANTILES):
+    """Nombres de columna de cada cuantil: 0.05 -> 'p05'."""
+    return [f'p{round(q * 100):02d}' for q in quantiles]
+
+
+def forecast_intervals(model, df_long, years_ahead=10, n_paths=1000, quantiles=QUANTILES,
+                       window=None, lags=None, seed=0, residuals=None):
+    """
+    Bandas de predicción de todos los países por simulación Monte Carlo.
+
+    Args:
+        model: Modelo entrenado
+        df_long: DataFrame largo [country_id, year, production, country_name]
+                 o `ProductionPanel`
+        years_ahead: Número de años a predecir
+        n_paths: Trayectorias simuladas por país
+        quantiles: Cuantiles a reportar
+        window, lags: Configuración de features (por defecto la del modelo)
+        residuals: Matriz de `residual_pools` con una fila por país de
+                   `df_long` en orden de country_id (por defecto, la calculada
+                   sobre el propio `df_long`; pasarla permite simular solo
+                   algunos países con los residuos de todo el panel)
+
+    Returns:
+        pd.DataFrame: Columnas [country_id, country_name, year] y una columna
+        por cuantil (ver `quantile_columns`)
+    """
+    if window is None or lags is None:
+        window, lags = model_spec(model)
+    panel = as_panel(df_long)
+    country_ids, country_names, last_years, state = build_state(panel, history_length(window, lags))
+    if residuals is None:
+        residuals = residual_pools(model, add_features(panel, window, lags), country_ids, window, lags)
+    paths = simulate_paths(model, state, years_ahead, residuals, n_paths, window, lags, seed, keys=country_ids)
+    bands = np.quantile(paths, quantiles, axis=0)
+
+    steps = np.arange(1, years_ahead + 1)
+    df = pd.DataFrame({
+        'country_id': np.repeat(country_ids, years_ahead),
+        'country_name': np.repeat(country_names, years_ahead),
+        'year': (last_years[:, None] + steps[None, :]).ravel(),
+    })
+    for col, band in zip(quantile_columns(quantiles), bands):
+        df[col] = band.ravel()
+    return df
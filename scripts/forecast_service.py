@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Servicio HTTP local de pronósticos con micro-lotes.
+
+Carga el modelo y el estado de todos los países una sola vez al arrancar. Las
+peticiones concurrentes se acumulan en micro-lotes (hasta --max-batch países o
+--max-wait-ms milisegundos) y cada lote se resuelve con el motor por lotes de
+forecast.py: una llamada a `model.predict` por paso del horizonte para todos
+los países pedidos por todos los clientes del lote.
+
+Los datos se leen de --data; la copia columnar junto al CSV
+(production_long.npz) solo se usa si se generó desde ese mismo CSV.
+
+Endpoints:
+ - GET  /health                                  : estado, países cargados y estadísticas de lotes
+ - GET  /countries                               : países disponibles
+ - GET  /forecast?country=Brazil&country=Colombia&years=10
+ - GET  /forecast?country_id=16&years=5
+ - POST /forecast  {"countries": ["Brazil", 16], "years": 10}
+   (también {"country": ...} o {"country_id": ...}, como en GET)
+
+Errores (JSON {"error": ...}): 400 petición inválida, 404 país o ruta
+desconocidos, 503 el lote no se resolvió dentro de --timeout segundos.
+
+Respuesta de /forecast:
+    {"years_ahead": 10, "forecasts": [{"country_id": ..., "country_name": ...,
+      "last_year": ..., "forecast": [{"year": ..., "predicted_production": ...}]}]}
+
+Usage:
+    python scripts/forecast_service.py --port 8765
+    curl 'http://127.0.0.1:8765/forecast?country=Brazil&years=10'
+"""
+
+import argparse
+import json
+import queue
+import threading
+import time
+import warnings
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+import joblib
+
+from columnar import load_long
+from features import history_length, model_spec
+from forecast import build_state, forecast_recursive
+from instrument import span
+
+MODEL_PATH = Path('models/linear_regression_advanced.joblib')
+PROD_PATH = Path('data/prediction_data/production_long.csv')
+MAX_YEARS = 50
+
+
+class MicroBatcher:
+    """
+    Agrupa las peticiones concurrentes en lotes y resuelve cada lote con una
+    sola pasada de `forecast_recursive`.
+
+    El pronóstico recursivo de h años es prefijo del de H > h años, así que el
+    lote se calcula con el mayor horizonte pedido y cada cliente recibe sus
+    primeras columnas.
+    """
+
+    def __init__(self, model, state, window, lags, max_batch=256, max_wait_ms=5.0):
+        self.model = model
+        self.state = state
+        self.window = window
+        self.lags = lags
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.requests = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, rows, years_ahead) -> Future:
+        """Encola las filas de estado pedidas; el Future devuelve (len(rows) × years_ahead)."""
+        future = Future()
+        self._queue.put((np.asarray(rows, dtype=int), years_ahead, future))
+        return future
+
+    def _collect(self):
+        items = [self._queue.get()]
+        n_rows = len(items[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while n_rows < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            items.append(item)
+            n_rows += len(item[0])
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            try:
+                # Países repetidos entre clientes se calculan una sola vez
+                unique_rows, inverse = np.unique(np.concatenate([rows for rows, _, _ in items]), return_inverse=True)
+                horizon = max(years for _, years, _ in items)
+                with span('predict', batch_requests=len(items), batch_countries=len(unique_rows)):
+                    predictions = forecast_recursive(self.model, self.state[unique_rows], horizon,
+                                                     self.window, self.lags)
+                self.batches += 1
+                self.requests += len(items)
+
+                offset = 0
+                for rows, years, future in items:
+                    future.set_result(predictions[inverse[offset:offset + len(rows)], :years])
+                    offset += len(rows)
+            except Exception as e:
+                for _, _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+
+
+class ForecastService:
+    """Modelo, estado de todos los países e índices nombre / id -> fila."""
+
+    def __init__(self, model_path=MODEL_PATH, prod_path=PROD_PATH, columnar_path=None,
+                 max_batch=256, max_wait_ms=5.0, timeout=30.0):
+        self.model = joblib.load(model_path)
+        self.window, self.lags = model_spec(self.model)
+        self.timeout = timeout
+
+        # La copia columnar (por defecto la del CSV) solo si corresponde a prod_path
+        df_long = load_long(prod_path, columnar_path)
+
+        self.country_ids, self.country_names, self.last_years, state = build_state(
+            df_long, history_length(self.window, self.lags))
+        self._by_name = {name: row for row, name in enumerate(self.country_names)}
+        self._by_id = {int(cid): row for row, cid in enumerate(self.country_ids)}
+        self.batcher = MicroBatcher(self.model, state, self.window, self.lags, max_batch, max_wait_ms)
+
+    def resolve(self, country):
+        """
+        Fila de estado de un país dado por nombre o por id.
+
+        Raises:
+            ValueError: Si no es un nombre ni un id entero
+            KeyError: Si el país no existe
+        """
+        if isinstance(country, bool) or not isinstance(country, (str, int)):
+            raise ValueError(f'País inválido: {country!r}')
+        if isinstance(country, str) and not country.isdigit():
+            row = self._by_name.get(country)
+        else:
+            row = self._by_id.get(int(country))
+        if row is None:
+            raise KeyError(country)
+        return row
+
+    def forecast(self, countries, years_ahead):
+        """
+        Raises:
+            concurrent.futures.TimeoutError: Si el lote no se resuelve en `timeout` segundos
+        """
+        rows = [self.resolve(country) for country in countries]
+        predictions = self.batcher.submit(rows, years_ahead).result(self.timeout)
+        return [
+            {
+                'country_id': int(self.country_ids[row]),
+                'country_name': str(self.country_names[row]),
+                'last_year': int(self.last_years[row]),
+                'forecast': [
+                    {'year': int(self.last_years[row]) + step, 'predicted_production': float(value)}
+                    for step, value in enumerate(values, start=1)
+                ],
+            }
+            for row, values in zip(rows, predictions)
+        ]
+
+
+def make_handler(service: ForecastService, default_years: int = 10):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _forecast(self, countries, years):
+            try:
+                if isinstance(years, bool):
+                    raise TypeError
+                years = int(years)
+            except (TypeError, ValueError):
+                return self._send(400, {'error': f'years inválido: {years!r}'})
+            if not 1 <= years <= MAX_YEARS:
+                return self._send(400, {'error': f'years debe estar entre 1 y {MAX_YEARS}'})
+            if not countries:
+                return self._send(400, {'error': 'Indica al menos un país (country o country_id)'})
+            try:
+                forecasts = service.forecast(countries, years)
+            except KeyError as e:
+                return self._send(404, {'error': f'País no encontrado: {e.args[0]}'})
+            except ValueError as e:
+                return self._send(400, {'error': str(e)})
+            except FutureTimeout:
+                return self._send(503, {'error': f'Sin respuesta del modelo en {service.timeout:g}s'})
+            except Exception as e:
+                return self._send(500, {'error': f'{type(e).__name__}: {e}'})
+            self._send(200, {'years_ahead': years, 'forecasts': forecasts})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            if url.path == '/health':
+                batcher = service.batcher
+                return self._send(200, {
+                    'status': 'ok',
+                    'countries': len(service.country_ids),
+                    'window': service.window,
+                    'lags': service.lags,
+                    'batches': batcher.batches,
+                    'requests': batcher.requests,
+                    'mean_batch_requests': batcher.requests / batcher.batches if batcher.batches else None,
+                })
+            if url.path == '/countries':
+                return self._send(200, {'countries': [
+                    {'country_id': int(cid), 'country_name': str(name)}
+                    for cid, name in zip(service.country_ids, service.country_names)
+                ]})
+            if url.path == '/forecast':
+                countries = params.get('country', []) + params.get('country_id', [])
+                return self._forecast(countries, params.get('years', [default_years])[0])
+            self._send(404, {'error': f'Ruta no encontrada: {url.path}'})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != '/forecast':
+                return self._send(404, {'error': f'Ruta no encontrada: {url.path}'})
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+            except (ValueError, json.JSONDecodeError):
+                return self._send(400, {'error': 'JSON inválido'})
+            if not isinstance(payload, dict):
+                return self._send(400, {'error': 'El cuerpo debe ser un objeto JSON'})
+
+            countries = []
+            for key in ('countries', 'country', 'country_id'):
+                if key not in payload:
+                    continue
+                value = payload[key]
+                countries.extend(value if isinstance(value, list) else [value])
+            self._forecast(countries, payload.get('years', default_years))
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servicio HTTP de pronósticos con micro-lotes')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--model', type=Path, default=MODEL_PATH)
+    parser.add_argument('--data', type=Path, default=PROD_PATH)
+    parser.add_argument('--years', type=int, default=10, help='Horizonte por defecto')
+    parser.add_argument('--max-batch', type=int, default=256, help='Países por micro-lote')
+    parser.add_argument('--max-wait-ms', type=float, default=5.0, help='Espera máxima para completar un lote')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Segundos de espera por lote antes de responder 503')
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    service = ForecastService(args.model, args.data, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms,
+                              timeout=args.timeout)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service, args.years))
+    server.daemon_threads = True
+    print(f"☕️ Servicio de pronósticos en http://{args.host}:{args.port} "
+          f"({len(service.country_ids)} países, ventana={service.window}, rezagos={service.lags})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nServicio detenido")
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Precompute the forecasts of every country into a versioned table for Streamlit.
+
+The table is keyed by a hash of the model artifact and a hash of
+production_long.csv, so the app can do a single keyed lookup and only
+recompute when one of the inputs changed; the app rebuilds and writes back a
+table whose hashes no longer match (write_forecast_table). It also holds the p05 / p50 / p95
+prediction bands from --paths Monte Carlo paths per country (see
+forecast.forecast_intervals), so the app does not simulate on every rerun.
+
+Outputs:
+ - <out>  : columns [model_hash, data_hash, country_id, country_name, year, predicted_production,
+            p05, p50, p95]
+
+Usage:
+    python scripts/forecast_table.py --out data/prediction_data/forecasts.csv
+    python scripts/forecast_table.py --paths 0    # forecasts only, no bands
+
+"""
+
+import argparse
+import os
+import tempfile
+import warnings
+from pathlib import Path
+import pandas as pd
+
+from forecast import forecast_all, forecast_intervals
+from hashing import file_hash
+from panel import as_panel
+
+MODEL_PATH = Path('models/linear_regression_advanced.joblib')
+PROD_PATH = Path('data/prediction_data/production_long.csv')
+TABLE_PATH = Path('data/prediction_data/forecasts.csv')
+KEY_COLS = ['model_hash', 'data_hash', 'country_name']
+TABLE_COLS = ['model_hash', 'data_hash', 'country_id', 'country_name', 'year', 'predicted_production',
+              'p05', 'p50', 'p95']
+# Trayectorias Monte Carlo por país para las bandas (las mismas que muestra la app)
+N_PATHS = 2000
+
+
+def forecast_table(model, df_long, model_hash: str, data_hash: str, years_ahead: int = 10,
+                   n_paths: int = N_PATHS) -> pd.DataFrame:
+    """
+    Pronósticos de todos los países con sus bandas, bajo la clave (model_hash, data_hash).
+
+    Args:
+        model: Modelo entrenado (scikit-learn o numpy_model.LinearModel)
+        df_long: DataFrame largo o `ProductionPanel`
+        n_paths: Trayectorias por país para las bandas (0 = sin bandas)
+    """
+    panel = as_panel(df_long)
+    if not len(panel):
+        # Sin países con datos: tabla vacía con las mismas columnas
+        return pd.DataFrame(columns=TABLE_COLS if n_paths else TABLE_COLS[:-3])
+    df_preds = forecast_all(model, panel, years_ahead)
+    if n_paths:
+        bands = forecast_intervals(model, panel, years_ahead, n_paths)
+        df_preds = df_preds.merge(bands.drop(columns='country_name'), on=['country_id', 'year'], how='left')
+    df_preds.insert(0, 'model_hash', model_hash)
+    df_preds.insert(1, 'data_hash', data_hash)
+    return df_preds
+
+
+def build_forecast_table(model_path: Path, prod_path: Path, years_ahead: int = 10,
+                         n_paths: int = N_PATHS) -> pd.DataFrame:
+    # La app importa este módulo: joblib (y scikit-learn) solo al precalcular
+    import joblib
+    model = joblib.load(model_path)
+    df_long = pd.read_csv(prod_path)
+    return forecast_table(model, df_long, file_hash(model_path), file_hash(prod_path), years_ahead, n_paths)
+
+
+def write_forecast_table(df_table: pd.DataFrame, path: Path):
+    """
+    Escribe la tabla de forma atómica (archivo temporal + os.replace), para que
+    un lector concurrente vea la tabla anterior o la nueva, nunca una a medias.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Archivo temporal propio: dos escrituras concurrentes no se pisan
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f'{path.stem}.', suffix=path.suffix)
+    os.close(fd)
+    try:
+        df_table.to_csv(tmp_name, index=False)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def index_forecast_table(df_table: pd.DataFrame) -> pd.DataFrame:
+    """Tabla indexada por (model_hash, data_hash, country_name), con los años en orden."""
+    return df_table.sort_values(KEY_COLS + ['year']).set_index(KEY_COLS)
+
+
+def read_forecast_table(path: Path) -> pd.DataFrame:
+    """Lee la tabla indexada por (model_hash, data_hash, country_name), con los años en orden."""
+    return index_forecast_table(pd.read_csv(path))
+
+
+def has_forecasts(table: pd.DataFrame, model_hash: str, data_hash: str) -> bool:
+    """Si la tabla tiene pronósticos bajo la clave (model_hash, data_hash)."""
+    try:
+        table.index.get_loc((model_hash, data_hash))
+    except KeyError:
+        return False
+    return True
+
+
+def lookup_forecast(table: pd.DataFrame, model_hash: str, data_hash: str, country: str, years_ahead: int):
+    """
+    Busca el pronóstico precalculado de un país.
+
+    Returns:
+        pd.DataFrame | None: Filas [year, predicted_production] (y las columnas
+        de cuantiles si la tabla las tiene) de los primeros `years_ahead` años,
+        o None si la clave no existe (hash desactualizado) o la tabla tiene un
+        horizonte menor.
+    """
+    try:
+        # Índice ordenado: las filas de la clave son un tramo contiguo
+        loc = table.index.get_loc((model_hash, data_hash, country))
+    except KeyError:
+        return None
+    rows = table.iloc[[loc]] if isinstance(loc, int) else table.iloc[loc]
+    if len(rows) < years_ahead:
+        return None
+    return rows.iloc[:years_ahead].drop(columns='country_id').reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precalcula la tabla de pronósticos de todos los países')
+    parser.add_argument('--model', type=Path, default=MODEL_PATH)
+    parser.add_argument('--data', type=Path, default=PROD_PATH)
+    parser.add_argument('--out', type=Path, default=TABLE_PATH)
+    parser.add_argument('--years-ahead', type=int, default=10)
+    parser.add_argument('--paths', type=int, default=N_PATHS,
+                        help='Trayectorias Monte Carlo por país para las bandas (0 = sin bandas)')
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    print("Calculando pronósticos de todos los países...")
+    df_table = build_forecast_table(args.model, args.data, args.years_ahead, args.paths)
+    if df_table.empty:
+        print(f"❌ {args.data} no tiene datos de producción: no hay nada que pronosticar")
+        raise SystemExit(1)
+
+    write_forecast_table(df_table, args.out)
+
+    print(f"Modelo: {df_table['model_hash'].iloc[0][:12]}  Datos: {df_table['data_hash'].iloc[0][:12]}")
+    print(f"Guardado: {args.out} ({df_table.shape[0]} filas, {df_table['country_id'].nunique()} países)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,22 @@
+"""
+Hash de contenido de los artefactos (modelos, exportaciones, tablas).
+
+Lo usan tanto la capa de almacenamiento (columnar, export) como la de
+pronósticos (forecast_table, batch_forecast, la app) para versionar sus
+salidas, sin que una dependa de la otra.
+
+Usage:
+    from hashing import file_hash
+"""
+
+import hashlib
+from pathlib import Path
+
+
+def file_hash(path: Path) -> str:
+    """SHA-256 del contenido de un archivo."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
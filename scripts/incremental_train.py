@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Entrenamiento incremental de la regresión lineal a partir de estadísticos suficientes.
+
+Los mínimos cuadrados solo dependen de n, de las medias de X e y y de los
+co-momentos centrados [X y]ᵀ[X y] (XᵀX, Xᵀy e yᵀy centrados). Se guardan
+junto al modelo y, cuando llega un año nuevo, solo las filas nuevas de la
+última exportación se convierten en features y se combinan con los
+estadísticos guardados (fórmula de Chan para medias y co-momentos); luego
+se vuelve a resolver el sistema. El costo depende de las filas nuevas, no de
+toda la historia, y el resultado coincide con un ajuste completo.
+
+Se guardan co-momentos centrados en lugar de XᵀX crudo: las features mezclan
+escalas de 1e9 kg con porcentajes y las sumas crudas pierden precisión. El
+sistema centrado se resuelve sin escalar, con la solución de norma mínima de
+mínimos cuadrados, igual que LinearRegression (modelo.py, model_search.py):
+las direcciones de escala pequeña (como pct_change_1y) quedan fuera del rango
+numérico en ambos casos y los coeficientes y predicciones coinciden. `--check`
+compara con LinearRegression ajustado sobre todo el panel.
+
+Una fila es nueva si su año es posterior al último año ya incorporado de su
+país. Las revisiones de años ya incorporados requieren `--init`.
+
+Outputs (junto a --model):
+ - <model>.joblib      : LinearRegression con los coeficientes resueltos
+ - <model>.json        : descripción NumPy (numpy_model.py)
+ - <model>.stats.npz   : n, medias, co-momentos, features y último año por país
+
+Usage:
+    python scripts/incremental_train.py --init
+    python scripts/incremental_train.py
+    python scripts/incremental_train.py --check
+"""
+
+import argparse
+import time
+import warnings
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from features import WINDOW, LAGS, add_features, feature_names, history_length, spec_from_names
+from hashing import file_hash
+from numpy_model import export_model, json_path
+
+MODEL_PATH = Path('models/linear_regression_advanced.joblib')
+PROD_PATH = Path('data/prediction_data/production_long.csv')
+
+
+def stats_path(model_path: Path) -> Path:
+    return Path(model_path).with_suffix('.stats.npz')
+
+
+class RegressionStats:
+    """Estadísticos suficientes de una regresión lineal con intercepto."""
+
+    def __init__(self, names, n=0, mean=None, comoment=None, country_id=None, last_year=None):
+        self.names = list(names)
+        k = len(self.names) + 1
+        self.n = int(n)
+        self.mean = np.zeros(k) if mean is None else np.asarray(mean, dtype=float)
+        self.comoment = np.zeros((k, k)) if comoment is None else np.asarray(comoment, dtype=float)
+        # Último año incorporado de cada país
+        self.last_year = {} if country_id is None else dict(zip(np.asarray(country_id).tolist(),
+                                                                 np.asarray(last_year).tolist()))
+
+    def update(self, X, y):
+        """Combina un lote de filas con los estadísticos acumulados."""
+        Z = np.column_stack([np.asarray(X, dtype=float), np.asarray(y, dtype=float)])
+        n_b = len(Z)
+        if n_b == 0:
+            return self
+        mean_b = Z.mean(axis=0)
+        centered = Z - mean_b
+        comoment_b = centered.T @ centered
+
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.comoment = self.comoment + comoment_b + np.outer(delta, delta) * (self.n * n_b / n)
+        self.mean = self.mean + delta * (n_b / n)
+        self.n = n
+        return self
+
+    def solve(self):
+        """
+        Coeficientes e intercepto de mínimos cuadrados: solución de norma
+        mínima del sistema centrado sin escalar, como LinearRegression.
+        """
+        Cxx, cxy = self.comoment[:-1, :-1], self.comoment[:-1, -1]
+        coef = np.linalg.lstsq(Cxx, cxy, rcond=None)[0]
+        intercept = self.mean[-1] - self.mean[:-1] @ coef
+        return coef, float(intercept)
+
+    def save(self, path: Path):
+        ids = np.array(sorted(self.last_year), dtype=np.int64)
+        np.savez(path, names=np.array(self.names), n=np.array(self.n), mean=self.mean,
+                 comoment=self.comoment, country_id=ids,
+                 last_year=np.array([self.last_year[i] for i in ids.tolist()], dtype=np.int64))
+
+    @classmethod
+    def load(cls, path: Path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['names'].tolist(), int(data['n']), data['mean'], data['comoment'],
+                       data['country_id'], data['last_year'])
+
+
+def new_rows(df_long, last_year: dict, window=WINDOW, lags=LAGS):
+    """
+    Features de las filas posteriores al último año incorporado de cada país.
+
+    Solo se procesan las filas nuevas y las `history_length` filas previas de
+    su país que necesitan sus features.
+
+    Returns:
+        pd.DataFrame: Salida de `add_features` restringida a las filas nuevas
+    """
+    df = df_long.sort_values(['country_id', 'year'], kind='stable').reset_index(drop=True)
+    seen = df['country_id'].map(last_year)
+    is_new = seen.isna().to_numpy() | (df['year'] > seen).to_numpy()
+    if not is_new.any():
+        return add_features(df.iloc[:0], window, lags)
+
+    position = df.groupby('country_id').cumcount().to_numpy()
+    first_new = (pd.Series(np.where(is_new, position, np.iinfo(np.int64).max))
+                 .groupby(df['country_id']).transform('min'))
+    keep = position >= first_new.to_numpy() - history_length(window, lags)
+
+    df_features = add_features(df[keep], window, lags)
+    seen = df_features['country_id'].map(last_year)
+    return df_features[seen.isna().to_numpy() | (df_features['year'] > seen).to_numpy()]
+
+
+def absorb(stats: RegressionStats, df_long, window, lags):
+    """Incorpora las filas nuevas a los estadísticos. Devuelve cuántas filas eran nuevas."""
+    df_new = new_rows(df_long, stats.last_year, window, lags)
+    stats.update(df_new[feature_names(window, lags)], df_new['production'])
+    # Años recorridos (aunque una fila no genere features, ya no es nueva)
+    last = df_long.groupby('country_id')['year'].max()
+    for country_id, year in last.items():
+        stats.last_year[int(country_id)] = max(int(year), stats.last_year.get(int(country_id), int(year)))
+    return len(df_new)
+
+
+def to_estimator(stats: RegressionStats):
+    """LinearRegression de scikit-learn con los coeficientes resueltos."""
+    from sklearn.linear_model import LinearRegression
+    coef, intercept = stats.solve()
+    model = LinearRegression()
+    model.coef_ = coef
+    model.intercept_ = intercept
+    model.feature_names_in_ = np.array(stats.names, dtype=object)
+    model.n_features_in_ = len(stats.names)
+    return model
+
+
+def save_model(stats: RegressionStats, model_path: Path):
+    import joblib
+    model = to_estimator(stats)
+    model_path.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(model, model_path)
+    export_model(model, json_path(model_path), file_hash(model_path))
+    stats.save(stats_path(model_path))
+    return model
+
+
+def full_refit(df_long, window, lags):
+    """
+    Ajuste completo de referencia: LinearRegression sobre todo el panel, el
+    mismo estimador que entrenan modelo.py y model_search.py.
+    """
+    from sklearn.linear_model import LinearRegression
+    df_features = add_features(df_long, window, lags)
+    model = LinearRegression().fit(df_features[feature_names(window, lags)], df_features['production'])
+    return model.coef_, float(model.intercept_)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Entrenamiento incremental de la regresión lineal')
+    parser.add_argument('--data', type=Path, default=PROD_PATH, help='Última exportación en formato largo')
+    parser.add_argument('--model', type=Path, default=MODEL_PATH)
+    parser.add_argument('--init', action='store_true', help='Reinicia los estadísticos con todo el panel')
+    parser.add_argument('--window', type=int, default=WINDOW, help='Solo con --init')
+    parser.add_argument('--lags', type=int, default=LAGS, help='Solo con --init')
+    parser.add_argument('--check', action='store_true', help='Compara con un ajuste completo')
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    df_long = pd.read_csv(args.data)
+    path = stats_path(args.model)
+    if args.init:
+        window, lags = args.window, args.lags
+        stats = RegressionStats(feature_names(window, lags))
+    elif path.exists():
+        stats = RegressionStats.load(path)
+        window, lags = spec_from_names(stats.names)
+    else:
+        print(f"❌ No se encontró {path}. Inicializa los estadísticos con --init")
+        raise SystemExit(1)
+
+    start = time.perf_counter()
+    added = absorb(stats, df_long, window, lags)
+    seconds = time.perf_counter() - start
+    print(f"📈 {added} filas nuevas incorporadas en {seconds * 1000:.1f} ms ({stats.n} filas en total)")
+
+    if added or args.init:
+        model = save_model(stats, args.model)
+        print(f"✅ Modelo guardado en: {args.model} (+ {json_path(args.model).name}, {path.name})")
+    else:
+        model = to_estimator(stats)
+        print("✅ Sin filas nuevas; el modelo no cambió")
+
+    if args.check:
+        coef, intercept = full_refit(df_long, window, lags)
+        df_features = add_features(df_long, window, lags)
+        X = df_features[feature_names(window, lags)].to_numpy(dtype=float)
+        gap = np.max(np.abs(X @ (model.coef_ - coef) + model.intercept_ - intercept), initial=0.0)
+        print(f"🔍 LinearRegression completo: diferencia máxima de predicción "
+              f"{gap / df_features['production'].mean():.2e} de la producción media, "
+              f"intercepto {model.intercept_:,.4f} vs {intercept:,.4f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Instrumentación por etapas del pipeline (load, reshape, features, train,
+evaluate, predict, export, render).
+
+Desactivada por defecto: `span` no hace nada salvo que COFFEE_TRACE apunte a un
+archivo de salida.
+ - COFFEE_TRACE=trace.jsonl : una línea JSON por span (nombre, padre, inicio,
+   duración, hilo y atributos), añadida al cerrar cada span raíz.
+ - COFFEE_TRACE=coffee.prom : textfile de Prometheus (collector textfile de
+   node_exporter) con llamadas, segundos acumulados y última duración por
+   etapa; se reescribe de forma atómica.
+ - COFFEE_PROFILE_STAGE=train : además, perfila con cProfile la etapa indicada
+   y guarda profile_<etapa>.prof junto al trace (ver con `python -m pstats`).
+
+Usage:
+    from instrument import span
+
+    with span('train', rows=len(X_train)):
+        model = train_model(X_train, y_train)
+
+    COFFEE_TRACE=trace.jsonl python scripts/modelo.py
+"""
+
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+TRACE_ENV = 'COFFEE_TRACE'
+PROFILE_ENV = 'COFFEE_PROFILE_STAGE'
+
+_pending = []
+_totals = {}
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def trace_path():
+    """Archivo de salida configurado, o None si la instrumentación está desactivada."""
+    value = os.environ.get(TRACE_ENV)
+    return Path(value) if value else None
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Mide la etapa `name`; los spans anidados registran a su padre."""
+    path = trace_path()
+    if path is None:
+        yield
+        return
+
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    parent = stack[-1] if stack else None
+    stack.append(name)
+
+    profiler = cProfile.Profile() if os.environ.get(PROFILE_ENV) == name else None
+    start_wall = time.time()
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        seconds = time.perf_counter() - start
+        stack.pop()
+        with _lock:
+            _pending.append({
+                'name': name,
+                'parent': parent,
+                'start': round(start_wall, 6),
+                'seconds': seconds,
+                'thread': threading.current_thread().name,
+                'pid': os.getpid(),
+                **attrs,
+            })
+            calls, total, _ = _totals.get(name, (0, 0.0, 0.0))
+            _totals[name] = (calls + 1, total + seconds, seconds)
+        if profiler is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(path.with_name(f'profile_{name}.prof'))
+        if parent is None:
+            flush(path)
+
+
+def flush(path=None):
+    """Escribe los spans pendientes (JSON lines) o las métricas acumuladas (.prom)."""
+    path = Path(path) if path else trace_path()
+    if path is None:
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _lock:
+        if path.suffix == '.prom':
+            _write_prometheus(path)
+        else:
+            with open(path, 'a', encoding='utf-8') as f:
+                for event in _pending:
+                    f.write(json.dumps(event, default=str) + '\n')
+        _pending.clear()
+
+
+def _write_prometheus(path: Path):
+    lines = [
+        '# HELP coffee_stage_calls_total Veces que se ejecutó la etapa',
+        '# TYPE coffee_stage_calls_total counter',
+    ]
+    lines += [f'coffee_stage_calls_total{{stage="{name}"}} {calls}' for name, (calls, _, _) in sorted(_totals.items())]
+    lines += [
+        '# HELP coffee_stage_seconds_total Segundos acumulados en la etapa',
+        '# TYPE coffee_stage_seconds_total counter',
+    ]
+    lines += [f'coffee_stage_seconds_total{{stage="{name}"}} {total:.6f}' for name, (_, total, _) in sorted(_totals.items())]
+    lines += [
+        '# HELP coffee_stage_last_seconds Duración de la última ejecución de la etapa',
+        '# TYPE coffee_stage_last_seconds gauge',
+    ]
+    lines += [f'coffee_stage_last_seconds{{stage="{name}"}} {last:.6f}' for name, (_, _, last) in sorted(_totals.items())]
+
+    # El collector puede leer en cualquier momento: escribir aparte y renombrar
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp_path, path)
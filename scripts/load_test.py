@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga local de streamlit_app.py con sesiones concurrentes.
+
+Cada usuario simulado es una sesión `AppTest` independiente que corre en su
+propio hilo, como las sesiones de un servidor Streamlit: todas comparten el
+proceso y, por tanto, las cachés `st.cache_data` / `st.cache_resource`. Cada
+usuario cambia de país `--reruns` veces y se mide la latencia de cada rerun.
+
+Reporta latencia p50 / p95 / p99, RSS máximo del proceso y tasa de aciertos de
+cada función cacheada de la app (ver cache_stats.py).
+
+Usage:
+    python scripts/load_test.py --users 16 --reruns 20
+    python scripts/load_test.py --users 32 --reruns 10 --cold --out load_test.json
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+import cache_stats
+
+APP_PATH = Path(__file__).resolve().parent.parent / 'streamlit_app.py'
+
+
+def peak_rss_mb():
+    """RSS máximo del proceso en MB (ru_maxrss está en KB en Linux y en bytes en macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def simulate_user(user_id, countries, reruns, timeout, seed=0):
+    """
+    Una sesión: carga inicial y luego `reruns` cambios de país.
+
+    Returns:
+        list[dict]: Una fila por rerun [user, step, country, seconds, error]
+    """
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed + user_id)
+    at = AppTest.from_file(str(APP_PATH), default_timeout=timeout)
+
+    rows = []
+    start = time.perf_counter()
+    at.run()
+    rows.append({'user': user_id, 'step': 0, 'country': None,
+                 'seconds': time.perf_counter() - start, 'error': bool(at.exception)})
+    if not at.selectbox:
+        # La app no llegó al selector (falta el modelo o los datos exportados)
+        rows[0]['error'] = True
+        return rows
+
+    for step in range(1, reruns + 1):
+        country = rng.choice(countries)
+        start = time.perf_counter()
+        at.selectbox[0].select(country).run()
+        rows.append({'user': user_id, 'step': step, 'country': country,
+                     'seconds': time.perf_counter() - start, 'error': bool(at.exception)})
+    return rows
+
+
+def run_load_test(users, reruns, countries, timeout=60, cold=False):
+    """
+    Lanza `users` sesiones concurrentes.
+
+    Returns:
+        dict: Resumen de latencias, memoria y cachés, y el detalle por rerun
+    """
+    import streamlit as st
+
+    if cold:
+        st.cache_data.clear()
+        st.cache_resource.clear()
+    cache_stats.reset()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        results = list(executor.map(lambda u: simulate_user(u, countries, reruns, timeout), range(users)))
+    wall_seconds = time.perf_counter() - start
+
+    detail = pd.DataFrame([row for rows in results for row in rows])
+    reruns_ms = detail.loc[detail['step'] > 0, 'seconds'].to_numpy() * 1000
+    first_ms = detail.loc[detail['step'] == 0, 'seconds'].to_numpy() * 1000
+
+    def percentiles(values):
+        if len(values) == 0:
+            return {}
+        return {f'p{q}': float(np.percentile(values, q)) for q in (50, 95, 99)} | {'max': float(values.max())}
+
+    return {
+        'users': users,
+        'reruns_per_user': reruns,
+        'cold': cold,
+        'wall_seconds': wall_seconds,
+        'reruns_per_second': len(detail) / wall_seconds,
+        'errors': int(detail['error'].sum()),
+        'first_run_ms': percentiles(first_ms),
+        'rerun_ms': percentiles(reruns_ms),
+        'peak_rss_mb': peak_rss_mb(),
+        'cache': cache_stats.snapshot(),
+        'detail': detail.to_dict('records'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba de carga de streamlit_app.py con sesiones concurrentes')
+    parser.add_argument('--users', type=int, default=8, help='Sesiones concurrentes')
+    parser.add_argument('--reruns', type=int, default=10, help='Cambios de país por sesión')
+    parser.add_argument('--countries', type=Path, default=Path('data/prediction_data/countries.csv'))
+    parser.add_argument('--timeout', type=float, default=60, help='Timeout de cada rerun en segundos')
+    parser.add_argument('--cold', action='store_true', help='Vaciar las cachés de Streamlit antes de empezar')
+    parser.add_argument('--out', type=Path, default=None, help='Archivo JSON con el resumen y el detalle')
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    countries = pd.read_csv(args.countries)['name'].tolist()
+    # La app usa rutas relativas a la raíz del repositorio
+    os.chdir(APP_PATH.parent)
+    print(f"🚦 {args.users} sesiones concurrentes × {args.reruns} cambios de país...")
+    report = run_load_test(args.users, args.reruns, countries, args.timeout, args.cold)
+
+    print(f"\n✅ {len(report['detail'])} ejecuciones en {report['wall_seconds']:.1f}s "
+          f"({report['reruns_per_second']:.1f}/s), {report['errors']} con error")
+    print("Latencia de rerun (ms): " + ', '.join(f"{k}={v:.0f}" for k, v in report['rerun_ms'].items()))
+    print("Primera carga (ms):     " + ', '.join(f"{k}={v:.0f}" for k, v in report['first_run_ms'].items()))
+    print(f"RSS máximo: {report['peak_rss_mb']:.0f} MB")
+    print("\n🗄️  Cachés:")
+    for name, stats in report['cache'].items():
+        hit_rate = f"{stats['hit_rate']:.1%}" if stats['hit_rate'] is not None else '-'
+        print(f"   {name:<22} llamadas={stats['calls']:<6} fallos={stats['misses']:<4} aciertos={hit_rate}")
+
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nGuardado: {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Modelos por país entrenados en paralelo y guardados en un directorio de registro.
+
+Outputs:
+ - <out_dir>/<country_id>.joblib : modelo ajustado solo con la historia del país
+ - <out_dir>/index.json          : id / nombre del país, archivo, muestras y features de cada modelo
+
+El índice se reemplaza de forma atómica y después se borran los .joblib que ya
+no aparecen en él.
+
+Los países con menos de --min-samples filas de features no tienen modelo; la
+app usa el modelo global para ellos.
+
+Usage:
+    python scripts/model_registry.py --out-dir models/registry --workers 8
+
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+import pandas as pd
+
+from features import WINDOW, LAGS, add_features, feature_names
+
+REGISTRY_DIR = Path('models/registry')
+INDEX_NAME = 'index.json'
+ESTIMATORS = ['linear', 'ridge']
+
+
+def make_estimator(name: str):
+    from sklearn.linear_model import LinearRegression, Ridge
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+    if name == 'ridge':
+        return make_pipeline(StandardScaler(), Ridge(alpha=1.0))
+    return LinearRegression()
+
+
+def fit_country(task):
+    """Ajusta y guarda el modelo de un país. Se ejecuta en un proceso del pool."""
+    import joblib
+    country_id, rows, estimator_name, cols, out_dir = task
+    warnings.filterwarnings('ignore')
+    model = make_estimator(estimator_name)
+    model.fit(rows[cols], rows['production'])
+
+    file_name = f'{country_id}.joblib'
+    joblib.dump(model, out_dir / file_name)
+    return country_id, file_name, len(rows)
+
+
+def train_registry(df_long: pd.DataFrame, out_dir: Path, estimator='linear',
+                   window=WINDOW, lags=LAGS, min_samples=10, workers=None):
+    """
+    Entrena un modelo por país en paralelo y escribe el índice del registro.
+
+    Returns:
+        dict: Índice del registro
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    df_features = add_features(df_long, window, lags)
+    cols = feature_names(window, lags)
+
+    names = df_long.drop_duplicates('country_id').set_index('country_id')['country_name']
+    tasks = [
+        (country_id, rows[cols + ['production']], estimator, cols, out_dir)
+        for country_id, rows in df_features.groupby('country_id', sort=True)
+        if len(rows) >= min_samples
+    ]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        fitted = list(executor.map(fit_country, tasks))
+
+    index = {
+        'trained_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'estimator': estimator,
+        'features': cols,
+        'countries': {
+            str(country_id): {'name': names[country_id], 'file': file_name, 'n_samples': n_samples}
+            for country_id, file_name, n_samples in fitted
+        },
+    }
+    # Índice nuevo de forma atómica: un lector ve el índice anterior o el nuevo
+    fd, tmp_name = tempfile.mkstemp(dir=out_dir, prefix='index.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_name, out_dir / INDEX_NAME)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+    # Modelos de países que ya no están en el índice (p. ej. bajo --min-samples)
+    listed = {entry['file'] for entry in index['countries'].values()}
+    for path in out_dir.glob('*.joblib'):
+        if path.name not in listed:
+            path.unlink(missing_ok=True)
+    return index
+
+
+class ModelRegistry:
+    """
+    Registro de modelos por país con carga perezosa.
+
+    Solo se lee el índice al crearlo; cada modelo se carga la primera vez que
+    se pide y se mantiene en un LRU acotado a `max_models`, de modo que la
+    memoria no crece con el número de países del registro.
+    """
+
+    def __init__(self, path: Path = REGISTRY_DIR, max_models: int = 16):
+        self.path = Path(path)
+        self.max_models = max_models
+        with open(self.path / INDEX_NAME, encoding='utf-8') as f:
+            self.index = json.load(f)
+        self._by_name = {entry['name']: entry for entry in self.index['countries'].values()}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, country_name):
+        return country_name in self._by_name
+
+    def file(self, country_name):
+        """Ruta del modelo del país, o None si no tiene modelo propio."""
+        entry = self._by_name.get(country_name)
+        return None if entry is None else self.path / entry['file']
+
+    def get(self, country_name):
+        """Modelo del país, o None si no tiene modelo propio."""
+        entry = self._by_name.get(country_name)
+        if entry is None:
+            return None
+        with self._lock:
+            if country_name in self._cache:
+                self._cache.move_to_end(country_name)
+                return self._cache[country_name]
+
+        # Importado al cargar el primer modelo: la app no paga joblib si no hay registro
+        import joblib
+        model = joblib.load(self.path / entry['file'])
+
+        with self._lock:
+            self._cache[country_name] = model
+            self._cache.move_to_end(country_name)
+            while len(self._cache) > self.max_models:
+                self._cache.popitem(last=False)
+        return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Entrena un modelo por país en paralelo')
+    parser.add_argument('--data', type=Path, default=Path('data/prediction_data/production_long.csv'))
+    parser.add_argument('--out-dir', type=Path, default=REGISTRY_DIR)
+    parser.add_argument('--estimator', choices=ESTIMATORS, default='linear')
+    parser.add_argument('--min-samples', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    df_long = pd.read_csv(args.data)
+
+    print(f"🤖 Entrenando modelos por país ({args.estimator}) con {args.workers} procesos...")
+    start = time.perf_counter()
+    index = train_registry(df_long, args.out_dir, args.estimator,
+                           min_samples=args.min_samples, workers=args.workers)
+    n_countries = df_long['country_id'].nunique()
+    print(f"✅ {len(index['countries'])} de {n_countries} países con modelo propio "
+          f"en {time.perf_counter() - start:.1f}s")
+    print(f"Guardado: {args.out_dir / INDEX_NAME}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Búsqueda paralela de modelo y conjunto de features.
+
+Ajusta una grilla de modelos candidatos (regresión lineal, ridge, lasso,
+random forest, gradient boosting) sobre varios conjuntos de features (distintas
+ventanas móviles y número de rezagos) en un pool de procesos, registra el tiempo
+de ajuste y las métricas de cada candidato y guarda el ganador (menor RMSE en los
+últimos años) reentrenado con todos los datos en models/linear_regression_advanced.joblib
+(y, si es lineal, su descripción NumPy en linear_regression_advanced.json).
+
+Cada conjunto de features descarta las filas sin historia suficiente para su
+ventana, así que todos los candidatos se puntúan sobre las mismas filas: las
+de los años de prueba que puede puntuar el conjunto más exigente (la
+intersección de las filas de todos los conjuntos de la grilla).
+
+Usage:
+    python scripts/model_search.py
+    python scripts/model_search.py --workers 8 --test-years 3 --results models/model_search_results.csv
+"""
+
+import argparse
+import itertools
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import joblib
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import Lasso, LinearRegression, Ridge
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from features import add_features, feature_names
+from hashing import file_hash
+from numpy_model import export_model, json_path
+
+MODEL_PATH = Path('models/linear_regression_advanced.joblib')
+RESULTS_PATH = Path('models/model_search_results.csv')
+
+# Conjuntos de features: (ventana móvil, número de rezagos)
+FEATURE_SETS = [(3, 1), (2, 1), (5, 1), (3, 2), (3, 3), (5, 3)]
+
+# Modelos candidatos: nombre -> (constructor, grilla de hiperparámetros)
+CANDIDATE_MODELS = {
+    'linear': (LinearRegression, {}),
+    'ridge': (Ridge, {'alpha': [0.1, 1.0, 10.0, 100.0]}),
+    'lasso': (Lasso, {'alpha': [1e3, 1e5, 1e7], 'max_iter': [50000]}),
+    'random_forest': (RandomForestRegressor, {'n_estimators': [300], 'max_depth': [None, 10],
+                                              'min_samples_leaf': [1, 5], 'random_state': [42]}),
+    'gradient_boosting': (GradientBoostingRegressor, {'n_estimators': [300], 'learning_rate': [0.05, 0.1],
+                                                      'max_depth': [2, 3], 'random_state': [42]}),
+}
+
+# Modelos lineales con penalización: escalar las features antes de ajustar
+SCALED_MODELS = {'ridge', 'lasso'}
+
+# Panel en formato largo y filas de prueba comunes, cargados una vez por proceso del pool
+_PANEL = None
+_SCORED = None
+_FEATURE_CACHE = {}
+
+
+def build_grid(models=None, feature_sets=None):
+    """Lista de candidatos (modelo, parámetros, ventana, rezagos)."""
+    grid = []
+    for name in models or CANDIDATE_MODELS:
+        _, param_grid = CANDIDATE_MODELS[name]
+        keys = list(param_grid)
+        for values in itertools.product(*(param_grid[k] for k in keys)):
+            params = dict(zip(keys, values))
+            for window, lags in feature_sets or FEATURE_SETS:
+                grid.append({'model': name, 'params': params, 'window': window, 'lags': lags})
+    return grid
+
+
+def make_estimator(name, params):
+    constructor, _ = CANDIDATE_MODELS[name]
+    estimator = constructor(**params)
+    if name in SCALED_MODELS:
+        return make_pipeline(StandardScaler(), estimator)
+    return estimator
+
+
+def scored_rows(df_long, feature_sets):
+    """
+    Filas (country_id, year) con features en todos los conjuntos: las que
+    puede puntuar el de historia más larga.
+
+    Returns:
+        pd.MultiIndex: Claves (country_id, year)
+    """
+    keys = None
+    for window, lags in sorted(set(feature_sets)):
+        index = pd.MultiIndex.from_frame(add_features(df_long, window, lags)[['country_id', 'year']])
+        keys = index if keys is None else keys.intersection(index)
+    return keys
+
+
+def _init_worker(df_long, scored=None):
+    global _PANEL, _SCORED
+    warnings.filterwarnings('ignore')
+    _PANEL = df_long
+    _SCORED = scored
+    _FEATURE_CACHE.clear()
+
+
+def _features(window, lags):
+    key = (window, lags)
+    if key not in _FEATURE_CACHE:
+        _FEATURE_CACHE[key] = add_features(_PANEL, window, lags)
+    return _FEATURE_CACHE[key]
+
+
+def evaluate_candidate(candidate, test_years=3):
+    """
+    Ajusta un candidato con los años previos al corte y lo evalúa en los
+    últimos `test_years` años, solo en las filas comunes a todos los
+    candidatos (`scored_rows`). Se ejecuta en un proceso del pool.
+    """
+    df = _features(candidate['window'], candidate['lags'])
+    cols = feature_names(candidate['window'], candidate['lags'])
+
+    cutoff_year = _PANEL['year'].max() - test_years + 1
+    train = df[df['year'] < cutoff_year]
+    test = df[df['year'] >= cutoff_year]
+    if _SCORED is not None:
+        test = test[pd.MultiIndex.from_frame(test[['country_id', 'year']]).isin(_SCORED)]
+
+    estimator = make_estimator(candidate['model'], candidate['params'])
+    start = time.perf_counter()
+    estimator.fit(train[cols], train['production'])
+    fit_seconds = time.perf_counter() - start
+
+    y_pred = estimator.predict(test[cols])
+    return {
+        **candidate,
+        'params': str(candidate['params']),
+        'fit_seconds': fit_seconds,
+        'n_test': len(test),
+        'MAE': mean_absolute_error(test['production'], y_pred),
+        'RMSE': np.sqrt(mean_squared_error(test['production'], y_pred)),
+        'R²': r2_score(test['production'], y_pred),
+    }
+
+
+def run_search(df_long, grid, test_years=3, workers=None):
+    """
+    Evalúa todos los candidatos en paralelo.
+
+    Returns:
+        pd.DataFrame: Una fila por candidato, ordenada por RMSE
+    """
+    results = []
+    scored = scored_rows(df_long, [(c['window'], c['lags']) for c in grid])
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(df_long, scored)) as executor:
+        futures = [executor.submit(evaluate_candidate, candidate, test_years) for candidate in grid]
+        for i, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            results.append(result)
+            print(f"   [{i}/{len(grid)}] {result['model']:<18} w={result['window']} lags={result['lags']} "
+                  f"RMSE={result['RMSE']:,.0f} ({result['fit_seconds']:.2f}s)")
+    return pd.DataFrame(results).sort_values('RMSE').reset_index(drop=True)
+
+
+def fit_winner(df_long, best):
+    """Reentrena el mejor candidato con todos los datos disponibles."""
+    window, lags = int(best['window']), int(best['lags'])
+    df = add_features(df_long, window, lags)
+    cols = feature_names(window, lags)
+
+    # `params` se guarda como texto en la tabla de resultados
+    params = next(c['params'] for c in build_grid([best['model']], [(window, lags)])
+                  if str(c['params']) == best['params'])
+    estimator = make_estimator(best['model'], params)
+    # Ajustar con DataFrame: feature_names_in_ guarda la configuración de features
+    estimator.fit(df[cols], df['production'])
+    return estimator
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Búsqueda paralela de modelo y features')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--test-years', type=int, default=3)
+    parser.add_argument('--models', nargs='+', choices=list(CANDIDATE_MODELS), default=None)
+    parser.add_argument('--out', type=Path, default=MODEL_PATH)
+    parser.add_argument('--results', type=Path, default=RESULTS_PATH)
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    from modelo import load_production_data
+    df_long = load_production_data()
+
+    grid = build_grid(args.models)
+    print(f"\n🔎 Evaluando {len(grid)} candidatos con {args.workers} procesos...")
+    start = time.perf_counter()
+    results = run_search(df_long, grid, args.test_years, args.workers)
+    print(f"✅ Búsqueda completada en {time.perf_counter() - start:.1f}s")
+
+    args.results.parent.mkdir(parents=True, exist_ok=True)
+    results.to_csv(args.results, index=False)
+    print(f"Guardado: {args.results}")
+
+    print("\n🏆 Mejores candidatos:")
+    print(results.head(5)[['model', 'params', 'window', 'lags', 'MAE', 'RMSE', 'R²', 'fit_seconds']].to_string(index=False))
+
+    best = results.iloc[0]
+    model = fit_winner(df_long, best)
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(model, args.out)
+    print(f"\n✅ Modelo ganador ({best['model']}, ventana={best['window']}, rezagos={best['lags']}) guardado en: {args.out}")
+
+    # Descripción NumPy para la app; un modelo no lineal deja solo el .joblib
+    try:
+        export_model(model, json_path(args.out), file_hash(args.out))
+        print(f"✅ Coeficientes exportados a: {json_path(args.out)}")
+    except TypeError as e:
+        json_path(args.out).unlink(missing_ok=True)
+        print(f"⚠️  Sin exportación NumPy ({e}); la app cargará el .joblib")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,10 +3,13 @@ Modelo de Machine Learning para predecir la producción anual de café por país
 
 Este script carga los datos históricos de producción de café (1990-2019) desde
 la base de datos MySQL y entrena un modelo de regresión lineal simple para
-estimar la producción futura de cada país.
+estimar la producción futura de cada país. Con COFFEE_DB_BACKEND=sqlite los
+datos se leen desde un motor SQLite embebido (ver backend.py). Con COFFEE_TRACE
+se registra la duración de cada etapa (ver instrument.py).
 
 Modelo implementado:
-- Regresión Lineal
+- Regresión Lineal con 6 features (rolling + lag + momentum + interacciones),
+  calculadas con el módulo compartido features.py
 
 Métricas de evaluación:
 - MAE (Mean Absolute Error)
@@ -16,74 +19,51 @@ Métricas de evaluación:
 
 import pandas as pd
 import numpy as np
-import mysql.connector
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import matplotlib.pyplot as plt
+import sys
 import warnings
 
-warnings.filterwarnings('ignore')
+import backend
+from features import FEATURE_COLS, add_features
+from forecast import forecast_all, forecast_intervals, quantile_columns
+from instrument import span
+from panel import ProductionPanel
 
-# Configuración de conexión a la base de datos
-DB_CONFIG = {
-    'host': 'localhost',
-    'database': 'coffee',
-    'user': 'analitica',
-    'password': 'Operador1704'
-}
+warnings.filterwarnings('ignore')
 
 
 def get_connection():
-    """Crea y retorna una conexión a la base de datos"""
-    return mysql.connector.connect(**DB_CONFIG)
+    """Crea y retorna una conexión al backend configurado (MySQL o SQLite)"""
+    return backend.get_connection()
 
 
-def load_production_data():
+def load_production_data(chunk_size=10000):
     """
     Carga los datos de producción desde la base de datos y los transforma
     a formato largo para el modelado.
     
+    Args:
+        chunk_size: Filas leídas por bloque (anchas con MySQL, largas con el motor embebido)
+    
     Returns:
         pd.DataFrame: DataFrame con columnas [country_id, year, production]
     """
     print("📊 Cargando datos de producción...")
     conn = get_connection()
     
-    # Cargar tabla de producción
-    df_production = pd.read_sql('SELECT * FROM production', con=conn)
-    df_countries = pd.read_sql('SELECT id, name FROM countries', con=conn)
-    conn.close()
-    
-    print(f"✅ Datos cargados: {df_production.shape[0]} países")
-    
-    # Identificar columnas de años
-    year_cols = [col for col in df_production.columns 
-                 if col not in ['id', 'country_id', 'coffee_type', 'total']]
-    
-    print(f"📅 Años disponibles: {len(year_cols)} ({year_cols[0]} - {year_cols[-1]})")
-    
-    # Transformar a formato largo
-    data_long = []
-    for _, row in df_production.iterrows():
-        country_id = row['country_id']
-        for year_col in year_cols:
-            # Extraer el año inicial del formato "1990/91" -> 1990
-            year = int(year_col.split('/')[0])
-            production = row[year_col]
-            
-            # Solo incluir valores no nulos
-            if pd.notna(production):
-                data_long.append({
-                    'country_id': country_id,
-                    'year': year,
-                    'production': production
-                })
-    
-    df_long = pd.DataFrame(data_long)
-    
-    # Unir con nombres de países
-    df_long = df_long.merge(df_countries.rename(columns={'id': 'country_id', 'name': 'country_name'}),
-                            on='country_id', how='left')
+    try:
+        # Mismo camino para los dos backends: bloques en formato largo (con el
+        # motor embebido el despliegue es SQL; con MySQL, bloques de la tabla
+        # ancha desplegados en pandas, sin tenerla completa en memoria)
+        chunks = list(backend.iter_long_chunks(conn, 'production', chunk_size))
+        # Tabla vacía: sin bloques que concatenar
+        df_long = (pd.concat(chunks, ignore_index=True) if chunks
+                   else pd.DataFrame(columns=['country_id', 'year', 'production', 'country_name']))
+        print(f"✅ Datos cargados ({backend.get_backend()}, {len(chunks)} bloques)")
+    finally:
+        conn.close()
     
     print(f"✅ Dataset transformado: {len(df_long)} registros")
     print(f"   Países únicos: {df_long['country_id'].nunique()}")
@@ -94,11 +74,16 @@ def load_production_data():
 
 def create_features(df):
     """
-    Crea features combinando año y producción histórica.
+    Crea las features del modelo para todas las filas del panel.
     
-    Features creadas:
-    - year: Año (captura tendencia temporal)
-    - production_lag1: Producción del año anterior (captura inercia)
+    Features creadas (solo con la historia hasta el año anterior, igual que
+    en la predicción):
+    - rolling_mean_3y: Promedio últimos 3 años (tendencia local)
+    - rolling_std_3y: Desviación estándar últimos 3 años (volatilidad)
+    - production_lag1: Producción del año anterior (inercia)
+    - pct_change_1y: Cambio porcentual año a año (momentum)
+    - mean_x_pct: Tendencia × momentum (interacción)
+    - volatility_norm: Volatilidad relativa a la escala (interacción)
     
     Args:
         df: DataFrame con columnas [country_id, year, production]
@@ -106,20 +91,15 @@ def create_features(df):
     Returns:
         pd.DataFrame: DataFrame con features combinadas
     """
-    print("\n🔧 Creando features combinadas...")
+    print("\n🔧 Creando features (rolling + lag + momentum + interacciones)...")
     
-    df = df.copy()
-    df = df.sort_values(['country_id', 'year'])
-    
-    # Feature: Producción del año anterior
-    df['production_lag1'] = df.groupby('country_id')['production'].shift(1)
-    
-    # Eliminar primera fila de cada país (no tiene lag)
-    df = df.dropna(subset=['production_lag1'])
+    # Un único pase agrupado y vectorizado sobre todo el panel; se eliminan
+    # las filas de cada país sin 3 años previos
+    df = add_features(df)
     
     print("✅ Features creadas:")
-    print("   - year (tendencia temporal)")
-    print("   - production_lag1 (producción del año anterior)")
+    for col in FEATURE_COLS:
+        print(f"   - {col}")
     
     return df
 
@@ -152,8 +132,8 @@ def prepare_train_test_data(df, test_years=3):
     train_df = df[df['year'] < cutoff_year].copy()
     test_df = df[df['year'] >= cutoff_year].copy()
     
-    # Seleccionar año y producción anterior como features
-    feature_cols = ['year', 'production_lag1']
+    # Features compartidas con la predicción (features.py)
+    feature_cols = FEATURE_COLS
     
     X_train = train_df[feature_cols]
     y_train = train_df['production']
@@ -187,10 +167,9 @@ def train_model(X_train, y_train):
     
     # Mostrar coeficientes
     print("\n✅ Modelo entrenado")
-    print(f"   Coeficiente año: {model.coef_[0]:.4f}")
-    print(f"   Coeficiente producción(t-1): {model.coef_[1]:.4f}")
-    print(f"   Intercepto: {model.intercept_:.2f}")
-    print(f"\n   Ecuación: producción = {model.coef_[0]:.4f}*año + {model.coef_[1]:.4f}*producción(t-1) + {model.intercept_:.2f}")
+    for col, coef in zip(FEATURE_COLS, model.coef_):
+        print(f"   Coef. {col + ':':<18} {coef:>16.4f}")
+    print(f"   Intercepto:        {model.intercept_:>16.2f}")
     
     print("-" * 60)
     return model
@@ -254,6 +233,7 @@ def plot_predictions_vs_actual(model, X_test, y_test, test_df):
     
     # Seleccionar top 5 países por producción promedio
     top_countries = results.groupby('country_name')['actual'].mean().nlargest(5).index
+    by_country = dict(tuple(results.groupby('country_name')))
     
     _, axes = plt.subplots(2, 3, figsize=(18, 10))
     axes = axes.flatten()
@@ -262,7 +242,7 @@ def plot_predictions_vs_actual(model, X_test, y_test, test_df):
         if idx >= 6:
             break
         
-        country_data = results[results['country_name'] == country].sort_values('year')
+        country_data = by_country[country].sort_values('year')
         
         ax = axes[idx]
         ax.plot(country_data['year'], country_data['actual'], 
@@ -288,53 +268,29 @@ def plot_predictions_vs_actual(model, X_test, y_test, test_df):
     plt.show()
 
 
-def predict_future_production(model, df, future_years=5):
+def predict_future_production(model, df, future_years=5, n_paths=1000):
     """
-    Predice la producción futura usando año y producción histórica.
+    Predice la producción futura de forma recursiva para todos los países.
+    
+    Todos los países avanzan juntos: una llamada a `model.predict` por año
+    predicho (ver forecast.py). Las bandas p05 / p50 / p95 salen de `n_paths`
+    trayectorias simuladas con residuos remuestreados del ajuste.
     
     Args:
         model: Modelo entrenado
-        df: DataFrame con datos históricos completos
+        df: Datos históricos completos (DataFrame largo o ProductionPanel)
         future_years: Número de años a predecir
+        n_paths: Trayectorias Monte Carlo por país (0 = solo pronóstico puntual)
     
     Returns:
         pd.DataFrame: Predicciones futuras por país
     """
     print(f"\n🔮 Prediciendo producción futura ({future_years} años)...")
     
-    max_year = df['year'].max()
-    future_predictions = []
-    
-    # Por cada país
-    for country_id in df['country_id'].unique():
-        country_data = df[df['country_id'] == country_id].sort_values('year')
-        country_name = country_data['country_name'].iloc[0]
-        
-        # Obtener última producción conocida
-        last_production = country_data['production'].iloc[-1]
-        
-        # Predecir cada año futuro
-        for year_offset in range(1, future_years + 1):
-            future_year = max_year + year_offset
-            
-            # Usar año y producción del año anterior como features
-            x_future = np.array([[future_year, last_production]])
-            
-            # Predecir
-            prediction = model.predict(x_future)[0]
-            prediction = max(0, prediction)  # No permitir valores negativos
-            
-            future_predictions.append({
-                'country_id': country_id,
-                'country_name': country_name,
-                'year': future_year,
-                'predicted_production': prediction
-            })
-            
-            # Actualizar last_production para siguiente iteración
-            last_production = prediction
-    
-    future_df = pd.DataFrame(future_predictions)
+    future_df = forecast_all(model, df, years_ahead=future_years)
+    if n_paths:
+        bands = forecast_intervals(model, df, years_ahead=future_years, n_paths=n_paths)
+        future_df = future_df.merge(bands.drop(columns='country_name'), on=['country_id', 'year'], how='left')
     
     print(f"✅ Predicciones generadas para {future_df['country_id'].nunique()} países")
     print(f"   Años predichos: {future_df['year'].min()} - {future_df['year'].max()}")
@@ -342,42 +298,49 @@ def predict_future_production(model, df, future_years=5):
     return future_df
 
 
-def plot_future_predictions(df, future_df, top_n=5):
+def plot_future_predictions(panel, future_df, top_n=5):
     """
     Visualiza las predicciones futuras para los principales países productores.
     
     Args:
-        df: DataFrame con datos históricos
+        panel: ProductionPanel con los datos históricos
         future_df: DataFrame con predicciones futuras
         top_n: Número de países a visualizar
     """
-    # Seleccionar top países por producción histórica
-    top_countries = df.groupby('country_name')['production'].mean().nlargest(top_n).index
+    # Seleccionar top países por producción histórica (promedio de cada fila del panel)
+    means = np.nanmean(panel.values, axis=1)
+    top_rows = np.argsort(-means, kind='stable')[:top_n]
+    futures = dict(tuple(future_df.groupby('country_id')))
     
     _, axes = plt.subplots(2, 3, figsize=(18, 10))
     axes = axes.flatten()
     
-    for idx, country in enumerate(top_countries):
+    for idx, row in enumerate(top_rows):
         if idx >= 6:
             break
         
         ax = axes[idx]
+        country = panel.country_names[row]
         
-        # Datos históricos
-        historical = df[df['country_name'] == country].sort_values('year')
-        ax.plot(historical['year'], historical['production'], 
+        # Datos históricos: una fila del panel
+        years, values = panel.series(country)
+        ax.plot(years, values, 
                marker='o', linewidth=2.5, markersize=7, label='Histórico', 
                color='#2E8B57')
         
         # Predicciones futuras
-        future = future_df[future_df['country_name'] == country].sort_values('year')
+        future = futures.get(panel.country_ids[row], future_df.iloc[:0]).sort_values('year')
         ax.plot(future['year'], future['predicted_production'], 
                marker='s', linewidth=2.5, markersize=7, label='Predicción', 
                color='#DC143C', linestyle='--')
+        lower, _, upper = quantile_columns()
+        if lower in future.columns:
+            ax.fill_between(future['year'], future[lower], future[upper],
+                            color='#DC143C', alpha=0.15, label='Banda p05-p95')
         
         # Línea vertical separando histórico de predicción
         if len(future) > 0:
-            ax.axvline(x=historical['year'].max(), color='gray', 
+            ax.axvline(x=years.max(), color='gray', 
                       linestyle=':', linewidth=2, alpha=0.5)
         
         ax.set_xlabel('Año', fontsize=11, fontweight='bold')
@@ -387,7 +350,7 @@ def plot_future_predictions(df, future_df, top_n=5):
         ax.grid(True, alpha=0.3)
     
     # Ocultar ejes sobrantes
-    for idx in range(len(top_countries), 6):
+    for idx in range(len(top_rows), 6):
         axes[idx].axis('off')
     
     plt.suptitle('Predicción de Producción Futura de Café (2020-2024)', 
@@ -397,7 +360,6 @@ def plot_future_predictions(df, future_df, top_n=5):
     plt.show()
 
 
-
 def main():
     """
     Función principal que ejecuta todo el pipeline de modelado.
@@ -407,19 +369,28 @@ def main():
     print("=" * 60)
     
     # 1. Cargar datos
-    df = load_production_data()
+    with span('load'):
+        df = load_production_data()
+        # Panel países × años: pronóstico y gráficos sin filtrar el DataFrame por país
+        panel = ProductionPanel.from_long(df)
+    if df.empty:
+        print("❌ La tabla production no tiene datos: no hay nada que entrenar")
+        sys.exit(1)
     
     # 2. Crear features
-    df = create_features(df)
+    with span('features', rows=len(df)):
+        df = create_features(df)
     
     # 3. Preparar datos de entrenamiento y prueba
     X_train, X_test, y_train, y_test, test_df = prepare_train_test_data(df, test_years=3)
     
     # 4. Entrenar modelo de regresión lineal
-    model = train_model(X_train, y_train)
+    with span('train', rows=len(X_train)):
+        model = train_model(X_train, y_train)
     
     # 5. Evaluar modelo
-    results = evaluate_model(model, X_test, y_test)
+    with span('evaluate', rows=len(X_test)):
+        results = evaluate_model(model, X_test, y_test)
     
     print("\n🏆 Modelo de Regresión Lineal")
     print(f"   MAE: {results['MAE']:,.2f}")
@@ -427,13 +398,16 @@ def main():
     print(f"   R²: {results['R²']:.4f}")
     
     # 6. Visualizar predicciones vs valores reales
-    plot_predictions_vs_actual(model, X_test, y_test, test_df)
+    with span('render', chart='predictions_vs_actual'):
+        plot_predictions_vs_actual(model, X_test, y_test, test_df)
     
     # 7. Predecir producción futura
-    future_predictions = predict_future_production(model, df, future_years=5)
+    with span('predict', years=5):
+        future_predictions = predict_future_production(model, panel, future_years=5)
     
     # 8. Visualizar predicciones futuras
-    plot_future_predictions(df, future_predictions, top_n=5)
+    with span('render', chart='future_predictions'):
+        plot_future_predictions(panel, future_predictions, top_n=5)
     
     # 9. Mostrar muestra de predicciones
     print("\n📋 Muestra de predicciones futuras:")
@@ -450,4 +424,5 @@ def main():
 
 
 if __name__ == '__main__':
-    df, model, results, future_predictions = main()
+    with span('modelo'):
+        df, model, results, future_predictions = main()
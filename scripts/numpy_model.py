@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Descripción en JSON de un modelo lineal, evaluable solo con NumPy.
+
+El modelo global es una regresión lineal de unas pocas features, pero cargar el
+.joblib obliga a importar scikit-learn y deserializar el estimador en cada
+arranque y en cada proceso. Este módulo guarda junto al .joblib un .json con
+los coeficientes, el intercepto y el orden de las features, y lo carga como
+`LinearModel`, que expone la misma interfaz que usan features.py y forecast.py
+(`predict` y `feature_names_in_`) sin importar scikit-learn ni joblib.
+
+Formato (version = FORMAT_VERSION):
+    {"format": "linear", "version": 1, "estimator": "LinearRegression",
+     "feature_names": [...], "coef": [...], "intercept": ...,
+     "source_hash": "<sha256 del .joblib>", "exported_at": "..."}
+
+Se exportan LinearRegression, Ridge, Lasso y un Pipeline StandardScaler +
+modelo lineal (el escalado se incorpora a los coeficientes). `source_hash`
+permite detectar un .json desactualizado respecto del .joblib.
+
+Usage:
+    python scripts/numpy_model.py models/linear_regression_advanced.joblib
+"""
+
+import argparse
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+
+FORMAT_VERSION = 1
+
+
+def json_path(model_path: Path) -> Path:
+    """Ruta del .json que acompaña a un .joblib."""
+    return Path(model_path).with_suffix('.json')
+
+
+def linear_params(model):
+    """
+    Coeficientes e intercepto equivalentes de un modelo lineal de scikit-learn.
+
+    Raises:
+        TypeError: Si el modelo no es lineal (p. ej. random forest)
+    """
+    steps = getattr(model, 'steps', None)
+    if steps is None:
+        estimator, mean, scale = model, None, None
+    elif len(steps) == 2 and type(steps[0][1]).__name__ == 'StandardScaler':
+        scaler, estimator = steps[0][1], steps[1][1]
+        mean, scale = scaler.mean_, scaler.scale_
+    else:
+        raise TypeError(f'Pipeline no exportable: {[name for name, _ in steps]}')
+
+    if not hasattr(estimator, 'coef_') or np.ndim(estimator.coef_) != 1:
+        raise TypeError(f'Modelo no lineal: {type(estimator).__name__}')
+
+    coef = np.asarray(estimator.coef_, dtype=float)
+    intercept = float(estimator.intercept_)
+    if scale is not None:
+        # (x - mean) / scale · coef + b  ==  x · (coef / scale) + (b - mean · coef / scale)
+        coef = coef / scale
+        intercept -= float(np.dot(mean, coef))
+    return type(estimator).__name__, coef, intercept
+
+
+def export_model(model, path: Path, source_hash: str = None) -> dict:
+    """Escribe el .json de un modelo lineal entrenado con nombres de features."""
+    estimator, coef, intercept = linear_params(model)
+    names = getattr(model, 'feature_names_in_', None)
+    if names is None:
+        raise TypeError('El modelo no guarda feature_names_in_ (entrenar con un DataFrame)')
+
+    description = {
+        'format': 'linear',
+        'version': FORMAT_VERSION,
+        'estimator': estimator,
+        'feature_names': [str(name) for name in names],
+        'coef': coef.tolist(),
+        'intercept': intercept,
+        'source_hash': source_hash,
+        'exported_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(description, f, indent=2)
+    return description
+
+
+class LinearModel:
+    """Modelo lineal evaluado con NumPy: ŷ = X · coef + intercept."""
+
+    def __init__(self, coef, intercept, feature_names, source_hash=None):
+        self.coef_ = np.asarray(coef, dtype=float)
+        self.intercept_ = float(intercept)
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        self.n_features_in_ = len(self.coef_)
+        self.source_hash = source_hash
+
+    @classmethod
+    def from_json(cls, path: Path):
+        with open(path, encoding='utf-8') as f:
+            description = json.load(f)
+        if description.get('format') != 'linear' or description.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Formato de modelo no soportado: {description.get('format')} "
+                             f"v{description.get('version')}")
+        return cls(description['coef'], description['intercept'],
+                   description['feature_names'], description.get('source_hash'))
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=float)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f'Se esperaban {self.n_features_in_} features, se recibieron {X.shape[1]}')
+        return X @ self.coef_ + self.intercept_
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exporta un modelo lineal .joblib a JSON evaluable con NumPy')
+    parser.add_argument('model', type=Path)
+    parser.add_argument('--out', type=Path, default=None, help='Por defecto, el .joblib con extensión .json')
+    args = parser.parse_args()
+
+    import warnings
+    import joblib
+    from hashing import file_hash
+
+    warnings.filterwarnings('ignore')
+    model = joblib.load(args.model)
+    out = args.out or json_path(args.model)
+    description = export_model(model, out, file_hash(args.model))
+    print(f"✅ {description['estimator']} con {len(description['coef'])} coeficientes exportado a: {out}")
+
+
+if __name__ == '__main__':
+    main()
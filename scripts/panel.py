@@ -0,0 +1,191 @@
+"""
+Panel países × años de la producción de café respaldado por una matriz NumPy.
+
+El formato largo de production_long.csv se convierte una sola vez en una
+matriz densa (n_países × n_años, NaN = sin dato) con su máscara de valores
+observados y los índices id -> fila, nombre -> fila y año -> columna. La serie
+de un país es una fila de la matriz (acceso O(1), sin recorrer el DataFrame
+con una máscara booleana) y las operaciones de todo el panel (estado del
+pronóstico, historia previa de cada fila para las features) son operaciones
+vectorizadas sobre la matriz.
+
+Los años forman un rango continuo entre el primero y el último observado. Si
+el formato largo trae varias filas de un mismo (país, año), sus valores se
+suman (como el `pivot_table(aggfunc='sum')` que usaba el backtest).
+
+Uso desde Python:
+    from panel import ProductionPanel
+    panel = ProductionPanel.from_csv('data/prediction_data/production_long.csv')
+    history = panel.history('Brazil')
+    state = panel.state(width=3)
+"""
+
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+LONG_COLUMNS = ['country_id', 'year', 'production', 'country_name']
+
+
+def last_observed(matrix, width):
+    """
+    Estado a partir de una matriz densa países × años: los últimos `width`
+    valores observados de cada fila (sin NaN intermedios), alineados a la
+    derecha y rellenados con NaN a la izquierda.
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    if matrix.shape[1] < width:
+        pad = np.full((matrix.shape[0], width - matrix.shape[1]), np.nan)
+        matrix = np.hstack([pad, matrix])
+    # Orden estable: primero los NaN, luego los valores observados en su orden
+    order = np.argsort(~np.isnan(matrix), axis=1, kind='stable')
+    return np.take_along_axis(matrix, order, axis=1)[:, -width:]
+
+
+class ProductionPanel:
+    """Matriz países × años con máscara de observados e índices por id, nombre y año."""
+
+    def __init__(self, country_ids, country_names, years, values):
+        self.country_ids = np.asarray(country_ids, dtype=np.int64)
+        self.country_names = np.asarray(country_names, dtype=str)
+        self.years = np.asarray(years, dtype=np.int64)
+        self.values = np.asarray(values, dtype=float)
+        self.mask = ~np.isnan(self.values)
+
+        self._row_by_id = {cid: i for i, cid in enumerate(self.country_ids.tolist())}
+        self._row_by_name = {name: i for i, name in enumerate(self.country_names.tolist())}
+        self._first_year = int(self.years[0]) if len(self.years) else 0
+
+    @classmethod
+    def from_long(cls, df_long: pd.DataFrame, value_col='production'):
+        """
+        Construye el panel desde el formato largo [country_id, year, <value_col>]
+        (country_name opcional). Las filas sin valor se ignoran y las filas
+        repetidas de un mismo (país, año) se suman.
+        """
+        df = df_long.dropna(subset=[value_col])
+        ids = df['country_id'].to_numpy(dtype=np.int64)
+        year = df['year'].to_numpy(dtype=np.int64)
+
+        country_ids, first, rows = np.unique(ids, return_index=True, return_inverse=True)
+        years = np.arange(year.min(), year.max() + 1) if len(year) else np.array([], dtype=np.int64)
+        shape = (len(country_ids), len(years))
+
+        # Suma por celda: cada fila cae en su (país, año); las celdas sin filas quedan NaN
+        cells = rows * shape[1] + (year - (years[0] if len(years) else 0))
+        counts = np.bincount(cells, minlength=shape[0] * shape[1])
+        sums = np.bincount(cells, weights=df[value_col].to_numpy(dtype=float), minlength=shape[0] * shape[1])
+        values = np.where(counts > 0, sums, np.nan).reshape(shape)
+
+        if 'country_name' in df.columns:
+            country_names = df['country_name'].to_numpy()[first].astype(str)
+        else:
+            country_names = country_ids.astype(str)
+        return cls(country_ids, country_names, years, values)
+
+    @classmethod
+    def from_csv(cls, path: Path):
+        return cls.from_long(pd.read_csv(path))
+
+    def __len__(self):
+        return len(self.country_ids)
+
+    def __contains__(self, country):
+        try:
+            self.row(country)
+        except KeyError:
+            return False
+        return True
+
+    def row(self, country) -> int:
+        """Fila de un país dado por nombre o por id."""
+        if isinstance(country, str):
+            return self._row_by_name[country]
+        return self._row_by_id[int(country)]
+
+    def rows(self, countries) -> np.ndarray:
+        return np.array([self.row(country) for country in countries], dtype=np.int64)
+
+    def col(self, year) -> int:
+        """Columna de un año."""
+        col = int(year) - self._first_year
+        if not 0 <= col < len(self.years):
+            raise KeyError(year)
+        return col
+
+    def series(self, country):
+        """(años, valores) observados de un país."""
+        row = self.row(country)
+        observed = self.mask[row]
+        return self.years[observed], self.values[row, observed]
+
+    def history(self, country) -> pd.DataFrame:
+        """Serie de un país en formato largo [country_id, year, production, country_name] (vacía si no tiene datos)."""
+        if country not in self:
+            return pd.DataFrame({col: [] for col in LONG_COLUMNS})
+        row = self.row(country)
+        years, values = self.series(country)
+        return pd.DataFrame({
+            'country_id': self.country_ids[row],
+            'year': years,
+            'production': values,
+            'country_name': self.country_names[row],
+        })
+
+    def last_years(self) -> np.ndarray:
+        """Último año observado de cada país (vacío si el panel no tiene datos)."""
+        if self.values.size == 0:
+            return np.empty(len(self.country_ids), dtype=np.int64)
+        from_end = np.argmax(self.mask[:, ::-1], axis=1)
+        return self.years[len(self.years) - 1 - from_end]
+
+    def state(self, width, countries=None) -> np.ndarray:
+        """
+        Estado del pronóstico: los últimos `width` valores observados de cada
+        país (de todos, o de `countries` en ese orden), alineados a la derecha.
+        """
+        values = self.values if countries is None else self.values[self.rows(countries)]
+        return last_observed(values, width)
+
+    def lagged(self, width):
+        """
+        Todas las observaciones del panel con los `width` valores observados
+        previos de su país (columna final = el anterior), como `features.lagged_state`.
+
+        Returns:
+            tuple: (DataFrame largo [country_id, year, production, country_name]
+                   ordenado por país y año, matriz (n_obs × width))
+        """
+        n, n_years = self.values.shape
+        # Valores observados de cada fila alineados a la izquierda
+        order = np.argsort(~self.mask, axis=1, kind='stable')
+        packed = np.take_along_axis(self.values, order, axis=1)
+        counts = self.mask.sum(axis=1)
+
+        padded = np.hstack([np.full((n, width), np.nan), packed])
+        windows = sliding_window_view(padded, width, axis=1)[:, :n_years]
+        rows, positions = np.nonzero(np.arange(n_years)[None, :] < counts[:, None])
+
+        df = pd.DataFrame({
+            'country_id': self.country_ids[rows],
+            'year': self.years[order[rows, positions]],
+            'production': packed[rows, positions],
+            'country_name': self.country_names[rows],
+        })
+        return df, windows[rows, positions]
+
+    def to_long(self) -> pd.DataFrame:
+        """Formato largo [country_id, year, production, country_name] ordenado por país y año."""
+        rows, cols = np.nonzero(self.mask)
+        return pd.DataFrame({
+            'country_id': self.country_ids[rows],
+            'year': self.years[cols],
+            'production': self.values[rows, cols],
+            'country_name': self.country_names[rows],
+        })
+
+
+def as_panel(data) -> ProductionPanel:
+    """El panel tal cual, o construido desde un DataFrame largo."""
+    return data if isinstance(data, ProductionPanel) else ProductionPanel.from_long(data)
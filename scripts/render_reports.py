@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Reporte gráfico por país, renderizado sin pantalla (backend Agg) en paralelo.
+
+Para cada país se dibuja un gráfico con el histórico, las predicciones del
+modelo en los últimos `--test-years` años y el pronóstico recursivo con su
+banda p05-p95, y se guarda como PNG. Los datos de todos los países se calculan
+una vez en el proceso principal; el dibujo se reparte entre procesos.
+
+Cada gráfico tiene una clave: hash de la serie del país, de los residuos que
+remuestrea su banda, del modelo y de los parámetros del reporte (incluido el
+primer año de prueba, común a todo el panel). Si la clave coincide con la del
+manifiesto y el PNG existe, el país se omite, así que volver a generar el
+reporte sin cambios no dibuja nada. Los residuos se calculan sobre todo el
+panel (un país con pocos residuos usa los de todos, que cambian con los demás
+países) y la banda de cada país sale de un generador sembrado con su id, así
+que redibujar solo algunos países da los mismos gráficos que redibujarlos todos.
+
+Outputs (en --out-dir):
+ - <country_id>.png : gráfico del país
+ - manifest.json    : clave y archivo de cada país
+
+Usage:
+    python scripts/render_reports.py --out-dir reports/countries --workers 4
+    python scripts/render_reports.py --force
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import joblib
+
+from features import add_features, feature_names, model_spec
+from forecast import forecast_all, forecast_intervals, quantile_columns, residual_pools
+from hashing import file_hash
+from instrument import span
+
+MODEL_PATH = Path('models/linear_regression_advanced.joblib')
+PROD_PATH = Path('data/prediction_data/production_long.csv')
+OUT_DIR = Path('reports/countries')
+MANIFEST_NAME = 'manifest.json'
+
+# Cambiar al modificar el dibujo para invalidar los gráficos existentes
+RENDER_VERSION = 2
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+    warnings.filterwarnings('ignore')
+
+
+def render_country(task):
+    """Dibuja y guarda el gráfico de un país. Se ejecuta en un proceso del pool."""
+    import matplotlib.pyplot as plt
+
+    country, history, test, future, path = task
+    lower, _, upper = quantile_columns()
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+    ax.plot(history['year'], history['production'],
+            marker='o', linewidth=2, markersize=5, label='Histórico', color='#2E8B57')
+    if len(test):
+        ax.plot(test['year'], test['prediction'],
+                marker='s', linewidth=2, markersize=6, label='Predicción (prueba)', color='#4169E1', linestyle='--')
+    if len(future):
+        ax.plot(future['year'], future['predicted_production'],
+                marker='s', linewidth=2, markersize=6, label='Pronóstico', color='#DC143C', linestyle='--')
+        if lower in future.columns:
+            ax.fill_between(future['year'], future[lower], future[upper],
+                            color='#DC143C', alpha=0.15, label='Banda p05-p95')
+        ax.axvline(x=history['year'].max(), color='gray', linestyle=':', linewidth=2, alpha=0.5)
+        # Las bandas largas pueden crecer órdenes de magnitud: no dejar que aplanen la serie
+        scale = max(history['production'].max(), future['predicted_production'].max())
+        if scale > 0 and ax.get_ylim()[1] > 3 * scale:
+            ax.set_ylim(0, 3 * scale)
+
+    ax.set_xlabel('Año', fontsize=11, fontweight='bold')
+    ax.set_ylabel('Producción (kg)', fontsize=11, fontweight='bold')
+    ax.set_title(country, fontsize=13, fontweight='bold')
+    ax.legend(fontsize=9)
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    fig.savefig(path, dpi=100)
+    plt.close(fig)
+    return path.name
+
+
+def country_key(history: pd.DataFrame, model_hash: str, params: dict, pool=None) -> str:
+    """Clave del gráfico: serie del país + residuos de su banda + modelo + parámetros del reporte."""
+    digest = hashlib.sha256()
+    digest.update(model_hash.encode())
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    digest.update(history['year'].to_numpy(dtype=np.int64).tobytes())
+    digest.update(history['production'].to_numpy(dtype=np.float64).tobytes())
+    if pool is not None:
+        # Sin el relleno NaN, cuyo ancho depende del país con más residuos
+        pool = np.asarray(pool, dtype=np.float64)
+        digest.update(pool[~np.isnan(pool)].tobytes())
+    return digest.hexdigest()
+
+
+def load_manifest(out_dir: Path) -> dict:
+    path = out_dir / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f).get('countries', {})
+
+
+def save_manifest(out_dir: Path, countries: dict, model_hash: str):
+    manifest = {
+        'rendered_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'model_hash': model_hash,
+        'countries': countries,
+    }
+    with open(out_dir / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False, sort_keys=True)
+
+
+def render_reports(model_path: Path, prod_path: Path, out_dir: Path, years_ahead=10, test_years=3,
+                   n_paths=1000, workers=None, force=False):
+    """
+    Renderiza los gráficos desactualizados.
+
+    Returns:
+        tuple: (gráficos dibujados, gráficos omitidos)
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    model = joblib.load(model_path)
+    model_hash = file_hash(model_path)
+    window, lags = model_spec(model)
+    params = {'years_ahead': years_ahead, 'test_years': test_years, 'n_paths': n_paths,
+              'render_version': RENDER_VERSION}
+
+    df_long = pd.read_csv(prod_path).sort_values(['country_id', 'year'])
+    histories = dict(tuple(df_long.groupby('country_id', sort=True)))
+    country_ids = np.array(sorted(histories), dtype=np.int64)
+
+    # Features, primer año de prueba y residuos de todo el panel: lo que ve un
+    # país no depende de qué otros países se redibujan
+    df_features = add_features(df_long, window, lags)
+    params['cutoff'] = int(df_long['year'].max()) - test_years + 1 if len(df_long) else None
+    pools = residual_pools(model, df_features, country_ids, window, lags) if n_paths else None
+    keys = {str(cid): country_key(histories[cid], model_hash, params, None if pools is None else pools[row])
+            for row, cid in enumerate(country_ids.tolist())}
+
+    previous = {} if force else load_manifest(out_dir)
+    stale = [cid for cid, key in keys.items()
+             if previous.get(cid, {}).get('key') != key or not (out_dir / previous[cid]['file']).exists()]
+
+    # Archivos de países que ya no están en los datos
+    for cid, entry in previous.items():
+        if cid not in keys and (out_dir / entry['file']).exists():
+            (out_dir / entry['file']).unlink()
+
+    if stale:
+        stale_ids = {int(cid) for cid in stale}
+        df_stale = df_long[df_long['country_id'].isin(stale_ids)]
+
+        # Datos de los países desactualizados, una sola vez y por lotes
+        test = df_features[df_features['country_id'].isin(stale_ids)
+                           & (df_features['year'] >= params['cutoff'])].copy()
+        test['prediction'] = (model.predict(test[feature_names(window, lags)].to_numpy(dtype=float))
+                              if len(test) else [])
+        future = forecast_all(model, df_stale, years_ahead, window, lags)
+        if n_paths:
+            rows = np.searchsorted(country_ids, sorted(stale_ids))
+            bands = forecast_intervals(model, df_stale, years_ahead, n_paths, window=window, lags=lags,
+                                       residuals=pools[rows])
+            future = future.merge(bands.drop(columns='country_name'), on=['country_id', 'year'], how='left')
+
+        tests = dict(tuple(test.groupby('country_id')))
+        futures = dict(tuple(future.groupby('country_id')))
+        empty = pd.DataFrame(columns=['year', 'prediction', 'predicted_production'])
+        tasks = [
+            (histories[cid]['country_name'].iloc[0],
+             histories[cid][['year', 'production']],
+             tests.get(cid, empty)[['year', 'prediction']],
+             futures.get(cid, empty),
+             out_dir / f'{cid}.png')
+            for cid in sorted(stale_ids)
+        ]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            list(executor.map(render_country, tasks, chunksize=max(1, len(tasks) // (4 * (workers or 1)))))
+
+    countries = {cid: {'key': key, 'file': f'{cid}.png',
+                       'country_name': histories[int(cid)]['country_name'].iloc[0]}
+                 for cid, key in keys.items()}
+    save_manifest(out_dir, countries, model_hash)
+    return len(stale), len(keys) - len(stale)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Renderiza el reporte gráfico de todos los países')
+    parser.add_argument('--model', type=Path, default=MODEL_PATH)
+    parser.add_argument('--data', type=Path, default=PROD_PATH)
+    parser.add_argument('--out-dir', type=Path, default=OUT_DIR)
+    parser.add_argument('--years-ahead', type=int, default=10)
+    parser.add_argument('--test-years', type=int, default=3)
+    parser.add_argument('--paths', type=int, default=1000, help='Trayectorias para la banda p05-p95 (0 = sin banda)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--force', action='store_true', help='Redibuja todos los gráficos')
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    print(f"🖼️  Renderizando reporte por país con {args.workers} procesos...")
+    start = time.perf_counter()
+    with span('render', what='country_reports'):
+        rendered, skipped = render_reports(args.model, args.data, args.out_dir, args.years_ahead,
+                                           args.test_years, args.paths, args.workers, args.force)
+    print(f"✅ {rendered} gráficos generados, {skipped} sin cambios (omitidos) "
+          f"en {time.perf_counter() - start:.1f}s")
+    print(f"Guardado en: {args.out_dir}")
+
+
+if __name__ == '__main__':
+    main()
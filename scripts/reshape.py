@@ -0,0 +1,86 @@
+"""
+Transformación vectorizada de tablas anchas (una columna por año) a formato largo.
+
+Todas las tablas de años del esquema `coffee` (ver pk_fk_sql.sql) comparten la
+misma estructura: columnas de identificación (`id`, `country_id`, opcionalmente
+`coffee_type`), una columna por año ("1990/91" o "1990") y `total`. Este módulo
+interpreta los nombres de las columnas de año una sola vez y despliega todas las
+filas en una única pasada NumPy, en lugar de recorrer fila × año con iterrows.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Tablas anchas del esquema y columnas que no son años
+WIDE_TABLES = ['production', 'domestic_consumption', 'exports', 'imports',
+               'importer_consumption', 're_exports']
+ID_COLS = ['id', 'country_id', 'coffee_type', 'total']
+
+
+def parse_year_columns(columns):
+    """
+    Identifica las columnas de año y su año inicial.
+
+    Acepta nombres de campaña ("1990/91" -> 1990) y años simples ("1990").
+    Las columnas de identificación y las que no representan un año se ignoran.
+
+    Args:
+        columns: Nombres de columnas de la tabla ancha
+
+    Returns:
+        tuple: (year_cols, years) con los nombres originales y un array de años
+    """
+    year_cols, years = [], []
+    for col in columns:
+        if col in ID_COLS:
+            continue
+        try:
+            year = int(str(col).split('/')[0])
+        except ValueError:
+            continue
+        year_cols.append(col)
+        years.append(year)
+    return year_cols, np.array(years, dtype=np.int64)
+
+
+def wide_to_long(df_wide, df_countries=None, value_name='production', extra_cols=()):
+    """
+    Convierte una tabla ancha a formato largo en una sola pasada vectorizada.
+
+    Args:
+        df_wide: Tabla ancha con `country_id` y columnas de año
+        df_countries: DataFrame [id, name] para añadir `country_name` (opcional)
+        value_name: Nombre de la columna de valores
+        extra_cols: Columnas de identificación a conservar (p. ej. 'coffee_type')
+
+    Returns:
+        pd.DataFrame: Columnas [country_id, year, <value_name>, *extra_cols,
+                      country_name] ordenadas por país y año, sin valores nulos
+    """
+    year_cols, years = parse_year_columns(df_wide.columns)
+    if not year_cols:
+        raise RuntimeError('No se encontraron columnas de años en la tabla')
+
+    # Valores vacíos o no numéricos se tratan como nulos
+    df_years = df_wide[year_cols]
+    text_cols = [col for col, dtype in df_years.dtypes.items() if not pd.api.types.is_numeric_dtype(dtype)]
+    if len(text_cols):
+        df_years = df_years.assign(**{
+            col: pd.to_numeric(df_years[col], errors='coerce') for col in text_cols
+        })
+    values = df_years.to_numpy()
+    rows, cols = np.nonzero(pd.notna(values))
+
+    df_long = pd.DataFrame({
+        'country_id': df_wide['country_id'].to_numpy()[rows],
+        'year': years[cols],
+        value_name: values[rows, cols],
+    })
+    for col in extra_cols:
+        df_long[col] = df_wide[col].to_numpy()[rows]
+
+    if df_countries is not None:
+        names = df_countries.set_index('id')['name']
+        df_long['country_name'] = df_long['country_id'].map(names)
+
+    return df_long.sort_values(['country_id', 'year'], kind='stable').reset_index(drop=True)
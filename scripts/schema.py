@@ -0,0 +1,87 @@
+"""
+Tipos compactos para la carga en MySQL (crearDb.py) y las exportaciones.
+
+Cada columna recibe el tipo más pequeño que representa sus valores sin
+pérdida, y los valores faltantes se conservan como nulos en lugar de
+rellenarse con texto (lo que convertía la columna entera en VARCHAR):
+
+    enteros (o flotantes sin decimales)  int32 si cabe, si no int64;
+                                         Int32 / Int64 (nullable) si hay nulos
+    flotantes                            float32 si el redondeo es exacto, si no float64
+    coffee_type, nombres de país         category
+
+En el DDL: INT / BIGINT, FLOAT / DOUBLE, ENUM para categorías con pocos
+valores y VARCHAR(255) para el resto del texto. `sql_rows` entrega las filas
+con None en lugar de NaN / pd.NA para que los nulos lleguen como NULL.
+
+Uso desde Python:
+    from schema import compact_dtypes, sql_type, sql_rows
+    df = compact_dtypes(pd.read_excel(xls, sheet_name='production'))
+"""
+
+import numpy as np
+import pandas as pd
+
+# Columnas de texto que se guardan como categorías
+CATEGORICAL_COLS = ['coffee_type', 'name', 'country_name']
+# Máximo de categorías para declarar ENUM en lugar de VARCHAR
+MAX_ENUM_VALUES = 16
+
+INT32 = np.iinfo(np.int32)
+
+
+def compact_column(s: pd.Series, categorical: bool = False) -> pd.Series:
+    """Columna convertida al tipo compacto sin pérdida (ver docstring del módulo)."""
+    if pd.api.types.is_bool_dtype(s):
+        return s
+    if not pd.api.types.is_numeric_dtype(s):
+        return s.astype('category') if categorical else s
+
+    has_nulls = bool(s.isna().any())
+    if pd.api.types.is_integer_dtype(s):
+        integral = True
+    else:
+        observed = s.dropna().to_numpy(dtype=float)
+        integral = bool(np.all(observed == np.floor(observed))) and not np.isinf(observed).any()
+        if integral and len(observed) and np.abs(observed).max() >= 2 ** 53:
+            # Más allá de 2^53 un float64 ya no distingue enteros consecutivos
+            integral = False
+
+    if integral:
+        if s.notna().any():
+            lo, hi = s.min(), s.max()
+            dtype = 'int32' if INT32.min <= lo and hi <= INT32.max else 'int64'
+        else:
+            dtype = 'int32'
+        return s.astype(dtype.capitalize() if has_nulls else dtype)
+
+    values = s.to_numpy(dtype=np.float64, na_value=np.nan)
+    if np.array_equal(values.astype(np.float32).astype(np.float64), values, equal_nan=True):
+        return s.astype(np.float32)
+    return s.astype(np.float64)
+
+
+def compact_dtypes(df: pd.DataFrame, categorical=CATEGORICAL_COLS) -> pd.DataFrame:
+    """Copia del DataFrame con cada columna en su tipo compacto."""
+    return pd.DataFrame({col: compact_column(df[col], col in categorical) for col in df.columns})
+
+
+def sql_type(s: pd.Series) -> str:
+    """Tipo MySQL de una columna ya compactada."""
+    dtype = s.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'BOOLEAN'
+    if pd.api.types.is_integer_dtype(dtype):
+        return 'BIGINT' if dtype.itemsize > 4 else 'INT'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'FLOAT' if dtype.itemsize <= 4 else 'DOUBLE'
+    if isinstance(dtype, pd.CategoricalDtype) and len(dtype.categories) <= MAX_ENUM_VALUES:
+        values = ', '.join("'" + str(value).replace("'", "''") + "'" for value in dtype.categories)
+        return f'ENUM({values})'
+    return 'VARCHAR(255)'
+
+
+def sql_rows(df: pd.DataFrame):
+    """Filas como tuplas de tipos nativos de Python, con None en los nulos."""
+    values = df.astype(object).where(df.notna(), None)
+    return list(values.itertuples(index=False, name=None))
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Generador de datos sintéticos con la forma de data/clean/csv/production.csv.
+
+Produce tablas anchas (id, country_id, coffee_type, una columna "AAAA/AA" por año,
+total) y la tabla de países, escalables a miles de países y cientos de años,
+para benchmarks y pruebas de carga.
+
+Usage:
+    python scripts/synthetic_data.py --countries 2000 --years 300 --out-dir /tmp/synthetic
+"""
+
+import argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+COFFEE_TYPES = ['Arabica', 'Robusta', 'Arabica/Robusta', 'Robusta/Arabica']
+
+# Los valores originales son múltiplos de 60.000 kg (miles de sacos de 60 kg)
+BAG_KG = 60000
+
+
+def year_columns(n_years: int, first_year: int = 1990):
+    """Nombres de campaña "1990/91", "1991/92", ..."""
+    return [f'{year}/{(year + 1) % 100:02d}' for year in range(first_year, first_year + n_years)]
+
+
+def make_countries(n_countries: int) -> pd.DataFrame:
+    ids = np.arange(1, n_countries + 1)
+    return pd.DataFrame({'id': ids, 'name': [f'Country {i:05d}' for i in ids]})
+
+
+def make_wide_table(n_countries: int, n_years: int, first_year: int = 1990,
+                    missing_rate: float = 0.01, seed: int = 0, zero_rate: float = 0.02) -> pd.DataFrame:
+    """
+    Tabla ancha sintética: una caminata aleatoria log-normal por país con
+    escalas muy distintas entre países (como en los datos reales), una
+    fracción `zero_rate` de ceros (años sin producción reportada) y una
+    fracción `missing_rate` de valores nulos.
+    """
+    rng = np.random.default_rng(seed)
+    scale = np.exp(rng.uniform(np.log(1e5), np.log(3e9), size=(n_countries, 1)))
+    growth = rng.normal(0.01, 0.12, size=(n_countries, n_years)).cumsum(axis=1)
+    values = np.round(scale * np.exp(growth) / BAG_KG) * BAG_KG
+
+    values[rng.random(values.shape) < missing_rate] = np.nan
+    values[rng.random(values.shape) < zero_rate] = 0.0
+
+    cols = year_columns(n_years, first_year)
+    df = pd.DataFrame(values, columns=cols)
+    df.insert(0, 'id', np.arange(1, n_countries + 1))
+    df.insert(1, 'country_id', np.arange(1, n_countries + 1))
+    df.insert(2, 'coffee_type', rng.choice(COFFEE_TYPES, size=n_countries))
+    df['total'] = np.nansum(values, axis=1)
+    return df
+
+
+def make_long(n_countries: int, n_years: int, seed: int = 0) -> pd.DataFrame:
+    """Formato largo [country_id, year, production, country_name] equivalente a production_long.csv."""
+    from reshape import wide_to_long
+    return wide_to_long(make_wide_table(n_countries, n_years, seed=seed), make_countries(n_countries))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Genera tablas anchas sintéticas de producción')
+    parser.add_argument('--countries', type=int, default=1000)
+    parser.add_argument('--years', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out-dir', type=Path, default=Path('data/synthetic'))
+    args = parser.parse_args()
+
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    make_wide_table(args.countries, args.years, seed=args.seed).to_csv(args.out_dir / 'production.csv', index=False)
+    make_countries(args.countries).to_csv(args.out_dir / 'countries.csv', index=False)
+    print(f"Guardado: {args.out_dir} ({args.countries} países × {args.years} años)")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,10 +2,25 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from pathlib import Path
-import joblib
 import traceback
 import sys
 
+# Shared pipeline modules live in scripts/
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'scripts'))
+from features import add_features, history_length, model_spec  # noqa: E402
+from forecast import forecast_recursive, quantile_columns, residual_pools, simulate_paths  # noqa: E402
+from columnar import load_long, npz_source_hash  # noqa: E402
+from hashing import file_hash  # noqa: E402
+from panel import ProductionPanel  # noqa: E402
+from forecast_table import (N_PATHS, forecast_table, has_forecasts, index_forecast_table,  # noqa: E402
+	lookup_forecast, read_forecast_table, write_forecast_table)
+from model_registry import ModelRegistry, INDEX_NAME  # noqa: E402
+from cache_stats import tracked  # noqa: E402
+from instrument import span  # noqa: E402
+from cube import Cube  # noqa: E402
+from numpy_model import LinearModel, json_path  # noqa: E402
+from reshape import WIDE_TABLES  # noqa: E402
+
 # Configure Streamlit page for better mobile compatibility
 st.set_page_config(
     page_title="Predicción de Café",
@@ -15,18 +30,206 @@ st.set_page_config(
 
 years_ahead = 10
 MODEL_PATH = Path('models/linear_regression_advanced.joblib')
+FORECASTS_PATH = Path('data/prediction_data/forecasts.csv')
+COLUMNAR_PATH = Path('data/prediction_data/production_long.npz')
+REGISTRY_PATH = Path('models/registry')
+CUBE_PATH = Path('data/prediction_data/cube.npz')
+# Prediction bands (5th / 95th percentiles of N_PATHS simulated paths); they come
+# from the precomputed table and are simulated live only on a table miss
+BAND_QUANTILES = (0.05, 0.95)
 
 
-@st.cache_data
-def load_model(path: Path):
-	if path.exists():
-		try:
+@tracked(st.cache_resource)
+def load_model(path: Path, mtime: float):
+	# One model per process. The NumPy description next to the joblib file avoids
+	# importing scikit-learn; it is used only when it was exported from this file
+	coef_path = json_path(path)
+	try:
+		if coef_path.exists():
+			model = LinearModel.from_json(coef_path)
+			if not path.exists() or model.source_hash == cached_file_hash(path, path.stat().st_mtime):
+				return model
+		if path.exists():
+			import joblib
 			return joblib.load(path)
-		except Exception as e:
-			st.error(f"Error cargando el modelo: {e}")
-			return None
+	except Exception as e:
+		st.error(f"Error cargando el modelo: {e}")
 	return None
 
+
+def model_mtime(path: Path):
+	"""mtime of the model artifacts, so a retrained model invalidates the cache."""
+	return max((p.stat().st_mtime for p in (path, json_path(path)) if p.exists()), default=0.0)
+
+@tracked(st.cache_resource(max_entries=1))
+def load_registry(path: Path, mtime: float):
+	# Only the index is read here; per-country models load on first use (bounded LRU).
+	# A retrained registry changes the mtime: keep one entry so the old one is released
+	return ModelRegistry(path, max_models=16)
+
+
+@tracked(st.cache_resource)
+def load_cube(path: Path, mtime: float):
+	# Country × year × measure cube held in memory and shared by every session
+	return Cube(path)
+
+
+def show_cube(country: str):
+	"""Production, trade and consumption measures of the country, its coffee type or the world."""
+	cube = load_cube(CUBE_PATH, CUBE_PATH.stat().st_mtime)
+	if country not in cube:
+		return
+
+	st.subheader(f'Producción, comercio y consumo - {country}')
+	coffee_type = cube.country_type(country)
+	scopes = ['País', f'Tipo de café ({coffee_type})', 'Mundo'] if coffee_type else ['País', 'Mundo']
+	scope = st.radio('Ámbito', scopes, horizontal=True)
+
+	# Default to the schema tables this country actually reports
+	reported = cube.country(country, WIDE_TABLES).drop(columns='year').notna().any()
+	measures = st.multiselect('Medidas', cube.measures(), default=reported[reported].index.tolist())
+	if not measures:
+		st.info('Selecciona al menos una medida.')
+		return
+
+	if scope == 'País':
+		df = cube.country(country, measures)
+	elif scope == 'Mundo':
+		df = cube.world(measures)
+	else:
+		df = cube.coffee_type_rollup(coffee_type, measures)
+	st.line_chart(df.set_index('year'))
+
+
+def get_registry():
+	index_path = REGISTRY_PATH / INDEX_NAME
+	if not index_path.exists():
+		return None
+	return load_registry(REGISTRY_PATH, index_path.stat().st_mtime)
+
+
+def get_country_model(country: str):
+	"""Per-country model from the registry, or None to use the global model."""
+	registry = get_registry()
+	return registry.get(country) if registry is not None else None
+
+
+def model_hash(country: str, is_country_model: bool):
+	"""Hash of the artifact behind the forecast: the country's registry file or the global model."""
+	if is_country_model:
+		path = get_registry().file(country)
+	else:
+		path = MODEL_PATH if MODEL_PATH.exists() else json_path(MODEL_PATH)
+	return cached_file_hash(path, path.stat().st_mtime)
+
+
+@tracked(st.cache_resource)
+def load_panel(prod_path: Path, mtime: float):
+	# Country × year matrix built once per process and shared by every session.
+	# The columnar copy avoids re-parsing the CSV, but only when it was built from
+	# the current CSV; a missing or stale copy is rebuilt for the next process
+	try:
+		df_long = load_long(prod_path, COLUMNAR_PATH, data_hash(prod_path), rebuild=True)
+	except OSError:
+		# Read-only deployment: keep serving from the CSV
+		df_long = load_long(prod_path, COLUMNAR_PATH, data_hash(prod_path))
+	return ProductionPanel.from_long(df_long)
+
+
+def data_mtime(prod_path: Path):
+	"""mtime of the exported data, so a new export invalidates the panel. The columnar
+	copy derives from the CSV, so its own mtime counts only when there is no CSV."""
+	return (prod_path if prod_path.exists() else COLUMNAR_PATH).stat().st_mtime
+
+
+@tracked(st.cache_data)
+def load_country_names(countries_path: Path, mtime: float):
+	df_countries = pd.read_csv(countries_path)
+	return df_countries['name'].tolist() if 'name' in df_countries.columns else []
+
+
+@tracked(st.cache_data)
+def load_residual_pools(model_path: Path, mtime: float, prod_path: Path, prod_mtime: float):
+	# Per-country residuals of the global model over the whole panel, computed once
+	model = load_model(model_path, mtime)
+	window, lags = model_spec(model)
+	panel = load_panel(prod_path, prod_mtime)
+	pools = residual_pools(model, add_features(panel, window, lags), panel.country_ids, window, lags)
+	return dict(zip(panel.country_names.tolist(), pools))
+
+
+@tracked(st.cache_data)
+def live_bands(country: str, prod_path: Path, model_hash: str, data_hash: str, is_country_model: bool):
+	"""
+	(len(BAND_QUANTILES) × years_ahead) bands simulated for one country on a table
+	miss, cached per (country, model hash, data hash). The country's generator is
+	seeded with its id, so the global model gives the same bands as the table.
+	"""
+	model = get_country_model(country) if is_country_model else load_model(MODEL_PATH, model_mtime(MODEL_PATH))
+	panel = load_panel(prod_path, data_mtime(prod_path))
+	history = panel.history(country)
+	country_id = int(history['country_id'].iloc[0])
+	window, lags = model_spec(model)
+	state = panel.state(history_length(window, lags), [country])
+	if is_country_model:
+		# The country's own model: resample the residuals of its own fit
+		residuals = residual_pools(model, add_features(history, window, lags), [country_id], window, lags)[0]
+	else:
+		pools = load_residual_pools(MODEL_PATH, model_mtime(MODEL_PATH), prod_path, data_mtime(prod_path))
+		residuals = pools[country]
+	paths = simulate_paths(model, state, years_ahead, residuals, N_PATHS, window, lags, seed=0, keys=[country_id])
+	return np.quantile(paths[:, 0, :], BAND_QUANTILES, axis=0)
+
+
+@tracked(st.cache_data)
+def cached_file_hash(path: Path, mtime: float):
+	return file_hash(path)
+
+
+@tracked(st.cache_data)
+def cached_source_hash(path: Path, mtime: float):
+	return npz_source_hash(path)
+
+
+def data_hash(prod_path: Path):
+	"""Hash of the exported CSV; without the CSV, the one recorded in the columnar copy."""
+	if prod_path.exists():
+		return cached_file_hash(prod_path, prod_path.stat().st_mtime)
+	return cached_source_hash(COLUMNAR_PATH, COLUMNAR_PATH.stat().st_mtime)
+
+
+@tracked(st.cache_resource(max_entries=1))
+def load_forecast_table(path: Path, mtime: float):
+	# Shared read-only across sessions: cache_data would unpickle a copy on every rerun
+	return read_forecast_table(path)
+
+
+@tracked(st.cache_resource(max_entries=1))
+def refresh_forecast_table(model_hash: str, data_hash: str, prod_path: Path):
+	# The table is missing or was built from another model / export: rebuild it once
+	# for every country and write it back, so the next process finds it up to date
+	model = load_model(MODEL_PATH, model_mtime(MODEL_PATH))
+	panel = load_panel(prod_path, data_mtime(prod_path))
+	df_table = forecast_table(model, panel, model_hash, data_hash, years_ahead)
+	try:
+		write_forecast_table(df_table, FORECASTS_PATH)
+	except OSError:
+		# Read-only deployment: keep serving the rebuilt table from memory
+		pass
+	return index_forecast_table(df_table)
+
+
+def get_precomputed_forecast(country: str, prod_path: Path):
+	"""Keyed lookup in the precomputed table, rebuilt when missing or out of date."""
+	if not MODEL_PATH.exists():
+		return None
+	model_hash = cached_file_hash(MODEL_PATH, MODEL_PATH.stat().st_mtime)
+	current_data = data_hash(prod_path)
+	table = load_forecast_table(FORECASTS_PATH, FORECASTS_PATH.stat().st_mtime) if FORECASTS_PATH.exists() else None
+	if table is None or not has_forecasts(table, model_hash, current_data):
+		table = refresh_forecast_table(model_hash, current_data, prod_path)
+	return lookup_forecast(table, model_hash, current_data, country, years_ahead)
+
 def main():
 	# Add a simple status indicator
 	with st.spinner('Cargando aplicación...'):
@@ -40,7 +243,8 @@ def main():
 	if 'initialized' not in st.session_state:
 		st.session_state.initialized = True
 
-	model = load_model(MODEL_PATH)
+	with span('load', what='model'):
+		model = load_model(MODEL_PATH, model_mtime(MODEL_PATH))
 	if model is None:
 		st.warning(f"No se encontró el modelo en '{MODEL_PATH}'. Ejecuta el notebook para entrenar y guardarlo en esa ruta.")
 		return
@@ -49,19 +253,19 @@ def main():
 	prod_path = Path('data/prediction_data/production_long.csv')
 	countries_path = Path('data/prediction_data/countries.csv')
 
-	if not prod_path.exists() or not countries_path.exists():
-		st.warning('No se encontraron los CSV exportados en data/prediction_data/')
+	# The columnar copy alone is enough; countries.csv only adds countries without data
+	if not prod_path.exists() and not COLUMNAR_PATH.exists():
+		st.warning('No se encontraron los datos exportados en data/prediction_data/')
 		return
 
-	df_long = pd.read_csv(prod_path)
-	df_countries = pd.read_csv(countries_path)
-
-	# Build country selector
-	country_names = df_countries['name'].tolist() if 'name' in df_countries.columns else df_long['country_name'].unique().tolist()
-	country = st.selectbox('Selecciona un país', options=country_names)
+	with span('load', what='data'):
+		panel = load_panel(prod_path, data_mtime(prod_path))
+		country_names = (load_country_names(countries_path, countries_path.stat().st_mtime)
+			if countries_path.exists() else None) or panel.country_names.tolist()
+		country = st.selectbox('Selecciona un país', options=country_names)
 
-	# Extract historical series for selected country
-	history = df_long[df_long['country_name'] == country].sort_values('year')
+		# One row of the panel: O(1), no scan of the long table
+		history = panel.history(country)
 	if history.empty:
 		st.info('No hay datos históricos para el país seleccionado.')
 		return
@@ -74,60 +278,74 @@ def main():
 		'production': 'Producción (kg)'
 	})
 
-	# Prepare production history list
-	production_history = history['production'].astype(float).tolist()
 	last_year = int(history['year'].max())
 
-	predictions = [{'year': last_year, 'predicted_production': float(production_history[-1])}]
-
-	for i in range(1, years_ahead + 1):
-		recent = production_history[-3:]
-		rolling_mean = float(np.mean(recent))
-		rolling_std = float(np.std(recent))
-		prod_lag1 = float(production_history[-1])
-		if len(recent) >= 2 and recent[-2] != 0:
-			pct_change = float((recent[-1] - recent[-2]) / recent[-2])
+	# Prefer the country's own model when the registry has one. With the global
+	# model, use the precomputed table (rebuilt when its hashes do not match); a
+	# country missing from it is forecast with the batched engine
+	with span('predict', country=country):
+		country_model = get_country_model(country)
+		precomputed = get_precomputed_forecast(country, prod_path) if country_model is None else None
+		if country_model is not None:
+			model = country_model
+		if precomputed is not None:
+			forecast = precomputed['predicted_production'].to_numpy()
 		else:
-			pct_change = 0.0
-		mean_x_pct = rolling_mean * pct_change
-		volatility_norm = rolling_std / (rolling_mean + 1) if rolling_mean > 0 else 0.0
+			window, lags = model_spec(model)
+			state = panel.state(history_length(window, lags), [country])
+			forecast = forecast_recursive(model, state, years_ahead, window, lags)[0]
 
-		X_pred = np.array([[rolling_mean, rolling_std, prod_lag1, pct_change, mean_x_pct, volatility_norm]])
-		pred = model.predict(X_pred)[0]
-		if pred < 0:
-			pred = rolling_mean
-
-		pred_year = last_year + i
-		predictions.append({'year': pred_year, 'predicted_production': float(pred)})
+		lower_col, upper_col = quantile_columns(BAND_QUANTILES)
+		if precomputed is not None and {lower_col, upper_col} <= set(precomputed.columns):
+			bands = precomputed[[lower_col, upper_col]].to_numpy().T
+		else:
+			is_country_model = country_model is not None
+			bands = live_bands(country, prod_path, model_hash(country, is_country_model), data_hash(prod_path),
+				is_country_model)
+	if country_model is not None:
+		st.caption('Modelo específico del país')
 
-		# update history
-		production_history.append(float(pred))
+	predictions = [{'year': last_year, 'predicted_production': float(history['production'].iloc[-1])}]
+	for i, pred in enumerate(forecast, start=1):
+		predictions.append({'year': last_year + i, 'predicted_production': float(pred)})
 
 	df_preds = pd.DataFrame(predictions)
+	# The bands start at the anchor year too, so the chart lines join the history
+	df_preds[lower_col] = np.concatenate([[df_preds['predicted_production'].iloc[0]], bands[0]])
+	df_preds[upper_col] = np.concatenate([[df_preds['predicted_production'].iloc[0]], bands[1]])
 
-	st.subheader(f'Predicción (próximos {years_ahead} años)')
-	# Show only the future years in the table (exclude the anchor last_year)
-	df_preds_future = df_preds[df_preds['year'] > last_year].reset_index(drop=True).rename(columns={
-		'year': 'Año',
-		'predicted_production': 'Predicción (kg)'
-	})
-	st.table(df_preds_future)
+	with span('render', country=country):
+		st.subheader(f'Predicción (próximos {years_ahead} años)')
+		# Show only the future years in the table (exclude the anchor last_year)
+		df_preds_future = df_preds[df_preds['year'] > last_year].reset_index(drop=True).rename(columns={
+			'year': 'Año',
+			'predicted_production': 'Predicción (kg)',
+			lower_col: f'{lower_col.upper()} (kg)',
+			upper_col: f'{upper_col.upper()} (kg)'
+		})
+		st.table(df_preds_future)
+		st.caption(f'Banda del {BAND_QUANTILES[0]:.0%} al {BAND_QUANTILES[1]:.0%} de {N_PATHS} trayectorias simuladas con residuos remuestreados del ajuste')
+
+		# Combined chart with separate series for historical vs prediction
+		hist_df = history[['year', 'production']].rename(columns={'production': 'historical'}).set_index('year')
+		pred_df = df_preds.rename(columns={'predicted_production': 'prediction'}).set_index('year')
 
-	# Combined chart with separate series for historical vs prediction
-	hist_df = history[['year', 'production']].rename(columns={'production': 'historical'}).set_index('year')
-	pred_df = df_preds.rename(columns={'predicted_production': 'prediction'}).set_index('year')
+		combined = pd.concat([hist_df, pred_df], axis=1)
+		# Ensure years are sorted
+		combined = combined.sort_index()
 
-	combined = pd.concat([hist_df, pred_df], axis=1)
-	# Ensure years are sorted
-	combined = combined.sort_index()
+		st.subheader(f'Histórico vs Predicción {country}')
+		st.line_chart(combined)
 
-	st.subheader(f'Histórico vs Predicción {country}')
-	st.line_chart(combined)
+	if CUBE_PATH.exists():
+		with span('render', what='cube'):
+			show_cube(country)
 
 
 if __name__ == '__main__':
 	try:
-		main()
+		with span('app_rerun'):
+			main()
 	except Exception as e:
 		tb = traceback.format_exc()
 		try:
@@ -0,0 +1,41 @@
+"""
+Configuración común de las pruebas.
+
+Los módulos del pipeline viven en scripts/ y se importan por nombre, igual que
+desde streamlit_app.py. Los datos de prueba son sintéticos (synthetic_data.py)
+y no dependen de MySQL ni de los CSV exportados.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+from features import FEATURE_COLS, add_features  # noqa: E402
+from reshape import wide_to_long  # noqa: E402
+from synthetic_data import make_countries, make_wide_table  # noqa: E402
+
+
+@pytest.fixture
+def df_long():
+    """Panel largo de 25 países × 20 años con huecos (15 % de nulos)."""
+    df_wide = make_wide_table(25, 20, missing_rate=0.15, seed=7)
+    return wide_to_long(df_wide, make_countries(25))
+
+
+@pytest.fixture
+def fitted_model(df_long):
+    """LinearRegression con las features por defecto, ajustado sobre todo `df_long`."""
+    from sklearn.linear_model import LinearRegression
+    df_features = add_features(df_long)
+    return LinearRegression().fit(df_features[FEATURE_COLS], df_features['production'])
+
+
+@pytest.fixture
+def model_path(fitted_model, tmp_path):
+    """`fitted_model` guardado con joblib en tmp_path / 'model.joblib'."""
+    import joblib
+    joblib.dump(fitted_model, tmp_path / 'model.joblib')
+    return tmp_path / 'model.joblib'
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from backtest import _init_worker, make_context, run_origin, summarize, walk_forward
+from benchmark import forecast_loop
+from features import FEATURE_COLS, add_features
+from panel import ProductionPanel
+
+pytestmark = pytest.mark.filterwarnings('ignore')
+
+
+class RecordingRegression(LinearRegression):
+    """LinearRegression que guarda el índice de las filas con las que se ajusta."""
+    fits = []
+
+    def fit(self, X, y, sample_weight=None):
+        RecordingRegression.fits.append(X.index)
+        return super().fit(X, y, sample_weight)
+
+
+@pytest.fixture
+def detail(df_long):
+    return walk_forward(df_long, LinearRegression(), horizon=4, min_train_years=10, window=3, lags=1, workers=2)
+
+
+def test_folds_never_train_on_their_cutoff_or_later(df_long):
+    context = make_context(ProductionPanel.from_long(df_long), RecordingRegression(), 4, 3, 1)
+    _init_worker(context)
+    RecordingRegression.fits.clear()
+    origins = range(int(df_long['year'].min()) + 10, int(df_long['year'].max()))
+    for origin in origins:
+        fold = run_origin(origin)
+        cutoff = origin + 1
+        train_years = context['features'].loc[RecordingRegression.fits[-1], 'year']
+        assert train_years.max() < cutoff <= fold['year'].min()
+        # Todas las filas anteriores al corte sí se usan
+        assert len(train_years) == (context['features']['year'] < cutoff).sum()
+    assert len(RecordingRegression.fits) == len(origins)
+
+
+def test_fold_does_not_see_later_years(df_long, detail):
+    cutoff = int(df_long['year'].max()) - 3
+    changed = df_long.copy()
+    changed.loc[changed['year'] >= cutoff, 'production'] *= 3.0
+    other = walk_forward(changed, LinearRegression(), horizon=4, min_train_years=10, window=3, lags=1, workers=2)
+
+    before = detail[detail['origin'] < cutoff].set_index(['origin', 'country_id', 'horizon'])['forecast']
+    after = other[other['origin'] < cutoff].set_index(['origin', 'country_id', 'horizon'])['forecast']
+    pd.testing.assert_series_equal(before, after)
+
+
+def test_horizon_errors_match_a_hand_computed_fold(df_long, detail):
+    origin = int(df_long['year'].min()) + 12
+    df_features = add_features(df_long)
+    train = df_features[df_features['year'] <= origin]
+    model = LinearRegression().fit(train[FEATURE_COLS], train['production'])
+
+    rows = []
+    for country_id, history in df_long[df_long['year'] <= origin].groupby('country_id'):
+        if history['year'].max() != origin:
+            continue  # Sin dato en el año de origen: el país no entra en el pliegue
+        actual = df_long[df_long['country_id'] == country_id].set_index('year')['production']
+        for horizon, forecast in enumerate(forecast_loop(model, history['production'], 4), start=1):
+            if origin + horizon in actual.index:
+                rows.append((horizon, forecast - actual[origin + horizon]))
+    expected = pd.DataFrame(rows, columns=['horizon', 'error'])
+    expected['abs_error'] = expected['error'].abs()
+
+    fold = detail[detail['origin'] == origin]
+    assert len(fold) == len(expected) > 0
+    got = summarize(fold.assign(ape=np.nan), ['horizon']).set_index('horizon')
+    by_horizon = expected.groupby('horizon')
+    np.testing.assert_allclose(got['MAE'], by_horizon['abs_error'].mean(), rtol=1e-9)
+    np.testing.assert_allclose(got['RMSE'], np.sqrt((expected['error'] ** 2).groupby(expected['horizon']).mean()),
+                               rtol=1e-9)
+    np.testing.assert_array_equal(got['n'], by_horizon.size())
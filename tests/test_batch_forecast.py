@@ -0,0 +1,46 @@
+import joblib
+import numpy as np
+import pytest
+
+from batch_forecast import effective_workers, fit_table_model, main, read_forecast_npz
+from features import model_spec
+from forecast import forecast_all
+
+pytestmark = pytest.mark.filterwarnings('ignore')
+
+
+def run(monkeypatch, *args):
+    monkeypatch.setattr('sys.argv', ['batch_forecast.py', *args])
+    main()
+
+
+def test_effective_workers():
+    assert effective_workers(8, 3) == 3
+    assert effective_workers(2, 30) == 2
+    assert effective_workers(4, 0) == 1
+
+
+def test_metadata_records_the_workers_used(df_long, model_path, tmp_path, monkeypatch):
+    df_long.to_csv(tmp_path / 'production_long.csv', index=False)
+    run(monkeypatch, '--data-dir', str(tmp_path), '--model', str(model_path), '--years-ahead', '3',
+        '--workers', '64')
+    df, metadata = read_forecast_npz(tmp_path / 'production_forecast.npz')
+    assert metadata['workers'] == df_long['country_id'].nunique() and metadata['workers_requested'] == 64
+    assert 'table_model' not in metadata
+
+    expected = forecast_all(joblib.load(model_path), df_long, 3)
+    np.testing.assert_allclose(df['predicted_production'], expected['predicted_production'])
+
+
+def test_other_tables_get_their_own_model(df_long, model_path, tmp_path, monkeypatch):
+    df_exports = df_long.rename(columns={'production': 'exports'}).assign(exports=lambda d: d['exports'] * 0.3 + 5e6)
+    df_exports.to_csv(tmp_path / 'exports_long.csv', index=False)
+    run(monkeypatch, '--table', 'exports', '--data-dir', str(tmp_path), '--model', str(model_path),
+        '--years-ahead', '3', '--workers', '1')
+    df, metadata = read_forecast_npz(tmp_path / 'exports_forecast.npz')
+
+    df_table = df_exports.rename(columns={'exports': 'production'})
+    table_model = fit_table_model(df_table, *model_spec(joblib.load(model_path)))
+    np.testing.assert_allclose(metadata['table_model']['coef'], table_model.coef_)
+    expected = forecast_all(table_model, df_table, 3)
+    np.testing.assert_allclose(df['predicted_production'], expected['predicted_production'])
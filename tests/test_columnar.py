@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+from columnar import ColumnarProduction, is_current, load_long, npz_source_hash, write_npz
+from hashing import file_hash
+from synthetic_data import make_countries
+
+
+def export(df_long, tmp_path):
+    csv_path, npz_path = tmp_path / 'production_long.csv', tmp_path / 'production_long.npz'
+    df_long.to_csv(csv_path, index=False)
+    write_npz(df_long, make_countries(25), npz_path, file_hash(csv_path))
+    return csv_path, npz_path
+
+
+def test_history_slices(df_long, tmp_path):
+    _, npz_path = export(df_long, tmp_path)
+    store = ColumnarProduction(npz_path)
+    for country_id, rows in df_long.groupby('country_id'):
+        history = store.history_by_id(country_id)
+        np.testing.assert_array_equal(history['year'], rows['year'])
+        np.testing.assert_array_equal(history['production'], rows['production'])
+        assert (history['country_name'] == rows['country_name'].iloc[0]).all()
+    assert store.history('Atlantis').empty
+    pd.testing.assert_frame_equal(store.to_long(), df_long, check_dtype=False)
+
+
+def test_source_hash(df_long, tmp_path):
+    csv_path, npz_path = export(df_long, tmp_path)
+    assert npz_source_hash(npz_path) == ColumnarProduction(npz_path).source_hash == file_hash(csv_path)
+    assert is_current(npz_path, csv_path)
+
+
+def test_stale_copy_falls_back_to_csv(df_long, tmp_path):
+    csv_path, npz_path = export(df_long, tmp_path)
+    # Nueva exportación del CSV sin regenerar el .npz
+    df_new = df_long.assign(production=df_long['production'] * 2)
+    df_new.to_csv(csv_path, index=False)
+    assert not is_current(npz_path, csv_path)
+    np.testing.assert_array_equal(load_long(csv_path)['production'], df_new['production'])
+
+
+def test_copy_without_csv(df_long, tmp_path):
+    csv_path, npz_path = export(df_long, tmp_path)
+    csv_path.unlink()
+    assert is_current(npz_path, csv_path)
+    np.testing.assert_array_equal(load_long(csv_path)['production'], df_long['production'])
+
+
+def test_copy_without_source_hash_is_stale(df_long, tmp_path):
+    csv_path, npz_path = export(df_long, tmp_path)
+    write_npz(df_long, make_countries(25), npz_path)
+    assert npz_source_hash(npz_path) == ''
+    assert not is_current(npz_path, csv_path)
+
+
+def test_stale_copy_is_rebuilt(df_long, tmp_path):
+    csv_path, npz_path = export(df_long, tmp_path)
+    df_new = df_long[df_long['year'] < 2005]
+    df_new.to_csv(csv_path, index=False)
+    np.testing.assert_array_equal(load_long(csv_path, rebuild=True)['year'], df_new['year'])
+    assert is_current(npz_path, csv_path)
+    np.testing.assert_array_equal(ColumnarProduction(npz_path).year, df_new['year'])
+
+
+
+def test_rebuild_uses_a_private_temp_file(tmp_path, monkeypatch):
+    import columnar
+    df_long = pd.DataFrame({'country_id': [1, 1], 'year': [2000, 2001],
+                            'production': [1.0, 2.0], 'country_name': ['A', 'A']})
+    csv_path = tmp_path / 'production_long.csv'
+    df_long.to_csv(csv_path, index=False)
+    # Nombre temporal fijo de otro proceso: no se usa ni se borra
+    stray = tmp_path / 'production_long.tmp.npz'
+    stray.write_bytes(b'otro proceso')
+
+    temps = []
+    write_npz = columnar.write_npz
+
+    def record(df, countries, path, source_hash):
+        temps.append(path)
+        write_npz(df, countries, path, source_hash)
+
+    monkeypatch.setattr(columnar, 'write_npz', record)
+    load_long(csv_path, rebuild=True)
+    load_long(csv_path, tmp_path / 'other.npz', rebuild=True)
+
+    assert len(set(temps)) == 2 and stray not in temps
+    assert stray.read_bytes() == b'otro proceso'
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['other.npz', 'production_long.csv',
+                                                          'production_long.npz', 'production_long.tmp.npz']
+    assert is_current(csv_path.with_suffix('.npz'), csv_path)
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crearDb import create_table, insert_data, insert_data_chunked, load_data_infile, load_sheet
+from schema import compact_dtypes
+
+
+class FakeCursor:
+    """Registra las sentencias; en LOAD DATA guarda el CSV antes de que se borre."""
+
+    def __init__(self):
+        self.statements = []
+        self.infile = None
+
+    def execute(self, sql, params=None):
+        self.statements.append((sql, params))
+        if sql.startswith('LOAD DATA'):
+            with open(params[0], encoding='utf-8') as f:
+                self.infile = f.read()
+
+    def executemany(self, sql, rows):
+        self.statements.append((sql, list(rows)))
+
+    def close(self):
+        pass
+
+
+class FakePool:
+    def __init__(self):
+        self.cursor_ = FakeCursor()
+        self.committed = False
+
+    def get_connection(self):
+        return self
+
+    def cursor(self):
+        return self.cursor_
+
+    def commit(self):
+        self.committed = True
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def df():
+    return compact_dtypes(pd.DataFrame({
+        'country_id': [1, 2, 3],
+        'coffee_type': ['Arabica', 'Robusta', None],
+        '1990/91': [1.5, np.nan, 3.25],
+    }))
+
+
+def test_create_table_keeps_compact_types(df):
+    cursor = FakeCursor()
+    create_table(cursor, 'production', df)
+    sql = cursor.statements[0][0]
+    assert '`country_id` INT' in sql and '`coffee_type` ENUM(' in sql and '`1990/91` FLOAT' in sql
+
+
+def test_executemany_sends_nulls_as_none(df):
+    cursor = FakeCursor()
+    insert_data(cursor, 'production', df)
+    sql, rows = cursor.statements[0]
+    assert sql.count('%s') == 3
+    assert rows == [(1, 'Arabica', 1.5), (2, 'Robusta', None), (3, None, 3.25)]
+
+
+def test_chunked_splits_rows_into_multi_row_inserts(df):
+    cursor = FakeCursor()
+    insert_data_chunked(cursor, 'production', df, batch_size=2)
+    (first, first_params), (second, second_params) = cursor.statements
+    assert first.count('(%s, %s, %s)') == 2 and second.count('(%s, %s, %s)') == 1
+    assert first_params == [1, 'Arabica', 1.5, 2, 'Robusta', None]
+    assert second_params == [3, None, 3.25]
+
+
+def test_infile_writes_nulls_as_backslash_n(df, tmp_path):
+    cursor = FakeCursor()
+    load_data_infile(cursor, 'production', df)
+    assert cursor.infile.splitlines() == ['1,Arabica,1.5', '2,Robusta,\\N', '3,\\N,3.25']
+    assert '(`country_id`, `coffee_type`, `1990/91`)' in cursor.statements[0][0]
+
+
+@pytest.mark.parametrize('mode', ['executemany', 'chunked', 'infile'])
+def test_load_sheet_restores_checks_and_commits(df, mode):
+    pool = FakePool()
+    rows, _ = load_sheet(pool, 'production', df, mode)
+    statements = [sql for sql, _ in pool.cursor_.statements]
+    assert rows == 3 and pool.committed
+    assert statements[1:3] == ['SET unique_checks = 0', 'SET foreign_key_checks = 0']
+    assert statements[-2:] == ['SET foreign_key_checks = 1', 'SET unique_checks = 1']
+    assert not any('DISABLE KEYS' in sql for sql in statements)
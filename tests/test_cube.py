@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cube import MEASURES, Cube, build_cube, write_cube
+
+
+def wide(rows, year_cols, coffee_type=None):
+    """Tabla ancha con una fila por (country_id, valores) y columnas de año `year_cols`."""
+    df = pd.DataFrame([values for _, values in rows], columns=year_cols)
+    df.insert(0, 'id', np.arange(1, len(rows) + 1))
+    df.insert(1, 'country_id', [country_id for country_id, _ in rows])
+    if coffee_type is not None:
+        df.insert(2, 'coffee_type', coffee_type)
+    df['total'] = df[year_cols].sum(axis=1)
+    return df
+
+
+@pytest.fixture
+def cube(tmp_path):
+    # Tablas de productores con años de cosecha, de comercio con años calendario
+    harvest, calendar = ['1990/91', '1991/92'], ['1991', '1992']
+    tables = {
+        'production': wide([(1, [100.0, 110.0]), (2, [50.0, np.nan]), (1, [100.0, 110.0])], harvest,
+                           coffee_type=['Arabica', 'Robusta', 'Robusta']),
+        'domestic_consumption': wide([(1, [10.0, 20.0]), (2, [5.0, 5.0])], harvest),
+        'exports': wide([(1, [80.0, 70.0]), (2, [40.0, 45.0])], calendar),
+        'imports': wide([(3, [30.0, 35.0])], calendar),
+        'importer_consumption': wide([(3, [28.0, 30.0])], calendar),
+        're_exports': wide([(3, [-1.0, 4.0])], calendar),
+    }
+    df_countries = pd.DataFrame({'id': [1, 2, 3], 'name': ['Colombia', 'Vietnam', 'Germany']})
+    write_cube(build_cube(tables, df_countries), tmp_path / 'cube.npz')
+    return Cube(tmp_path / 'cube.npz')
+
+
+def test_years_are_aligned_by_their_first_year(cube):
+    np.testing.assert_array_equal(cube.year, [1990, 1991, 1992])
+    colombia = cube.country('Colombia', ['production', 'exports'])
+    np.testing.assert_array_equal(colombia['production'], [100.0, 110.0, np.nan])
+    np.testing.assert_array_equal(colombia['exports'], [np.nan, 80.0, 70.0])
+
+
+def test_duplicated_country_keeps_its_first_coffee_type(cube):
+    assert cube.country_type('Colombia') == 'Arabica'
+    assert cube.country_type('Vietnam') == 'Robusta'
+    assert cube.country_type('Germany') == ''
+    assert cube.type_names.tolist() == ['Arabica', 'Robusta']
+
+
+def test_balances_need_every_measure(cube):
+    colombia = cube.country('Colombia', years=[1991])
+    assert colombia['exportable_production'].item() == 110.0 - 20.0
+    assert colombia['stock_change'].item() == 110.0 - 20.0 - 80.0
+    # 1990 no tiene exportaciones y Vietnam no reporta producción en 1991
+    assert np.isnan(cube.country('Colombia', ['stock_change'], [1990])['stock_change'].item())
+    assert np.isnan(cube.country('Vietnam', ['exportable_production'], [1991])['exportable_production'].item())
+    # El valor negativo de re_exports se trata como faltante
+    germany = cube.country('Germany', ['net_imports'])
+    np.testing.assert_array_equal(germany['net_imports'], [np.nan, np.nan, 35.0 - 4.0])
+
+
+def test_rollups_sum_the_reporting_countries(cube):
+    values = np.stack([cube.country(name)[MEASURES].to_numpy() for name in cube.country_name])
+    by_type = {t: values[cube.coffee_type == t] for t in cube.type_names}
+    for coffee_type, rows in by_type.items():
+        expected = np.where(np.isnan(rows).all(axis=0), np.nan, np.nansum(rows, axis=0))
+        np.testing.assert_allclose(cube.coffee_type_rollup(coffee_type)[MEASURES].to_numpy(), expected)
+
+    world = cube.world(['production', 'exports', 'imports'])
+    np.testing.assert_array_equal(world['production'], [150.0, 110.0, np.nan])
+    np.testing.assert_array_equal(world['exports'], [np.nan, 120.0, 115.0])
+    np.testing.assert_array_equal(world['imports'], [np.nan, 30.0, 35.0])
@@ -0,0 +1,186 @@
+import json
+
+import pandas as pd
+import pytest
+
+import backend
+import modelo
+from export_production_data import MANIFEST_NAME, country_checksums, export, export_streaming
+from hashing import file_hash
+from reshape import WIDE_TABLES, wide_to_long
+from schema import compact_dtypes
+from synthetic_data import make_countries, make_wide_table
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Motor SQLite embebido construido desde CSV sintéticos."""
+    csv_dir = tmp_path / 'csv'
+    csv_dir.mkdir()
+    make_countries(12).to_csv(csv_dir / 'countries.csv', index=False)
+    for seed, table in enumerate(WIDE_TABLES):
+        make_wide_table(12, 15, missing_rate=0.1, seed=seed).to_csv(csv_dir / f'{table}.csv', index=False)
+    monkeypatch.setattr(backend, 'CSV_DIR', csv_dir)
+    monkeypatch.setenv('COFFEE_DB_BACKEND', 'sqlite')
+    monkeypatch.setenv('COFFEE_SQLITE_PATH', str(tmp_path / 'coffee.sqlite'))
+    return csv_dir
+
+
+def read_long(path):
+    return pd.read_csv(path).sort_values(['country_id', 'year']).reset_index(drop=True)
+
+
+def test_table_chunks_cover_the_table(db):
+    conn = backend.get_connection()
+    try:
+        chunks = list(backend.iter_table_chunks(conn, 'production', chunk_size=5))
+        conn.execute('DELETE FROM production')
+        assert list(backend.iter_table_chunks(conn, 'production')) == []
+    finally:
+        conn.close()
+    assert [len(chunk) for chunk in chunks] == [5, 5, 2]
+    assert pd.concat(chunks)['country_id'].tolist() == list(range(1, 13))
+
+
+def test_chunked_load_of_an_empty_table(db, monkeypatch):
+    conn = backend.get_connection()
+    conn.execute('DELETE FROM production')
+    conn.commit()
+    conn.close()
+    # Camino de MySQL (lectura por bloques) sobre el motor embebido
+    monkeypatch.setattr(backend, 'is_embedded', lambda backend=None: False)
+    df_long = modelo.load_production_data()
+    assert df_long.empty and list(df_long.columns) == ['country_id', 'year', 'production', 'country_name']
+    with pytest.raises(SystemExit):
+        modelo.main()
+
+
+@pytest.mark.parametrize('embedded', [True, False])
+def test_model_data_matches_the_long_table(db, monkeypatch, embedded):
+    conn = backend.get_connection()
+    try:
+        expected = backend.load_long_table(conn, 'production')
+    finally:
+        conn.close()
+    monkeypatch.setattr(backend, 'is_embedded', lambda backend=None: embedded)
+    df_long = modelo.load_production_data(chunk_size=5)
+    pd.testing.assert_frame_equal(df_long, expected, check_dtype=False)
+
+
+def test_stream_keeps_derived_files_and_incremental_recovers(db, tmp_path):
+    out_dir = tmp_path / 'out'
+    export(out_dir)
+    npz = (out_dir / 'production_long.npz').read_bytes()
+    manifest = (out_dir / MANIFEST_NAME).read_text()
+    assert json.loads(manifest)['source_hash'] == file_hash(out_dir / 'production_long.csv')
+
+    # La base cambia y se exporta por bloques: los derivados quedan intactos
+    df_wide = pd.read_csv(db / 'production.csv')
+    df_wide.loc[3, df_wide.columns[4]] = 123456.0
+    df_wide.to_csv(db / 'production.csv', index=False)
+    (tmp_path / 'coffee.sqlite').unlink()
+    export_streaming(out_dir, chunk_size=4)
+    assert (out_dir / 'production_long.npz').read_bytes() == npz
+    assert (out_dir / MANIFEST_NAME).read_text() == manifest
+
+    # El manifiesto describe otro CSV: --incremental hace una exportación completa
+    streamed = read_long(out_dir / 'production_long.csv')
+    export(out_dir, incremental=True)
+    pd.testing.assert_frame_equal(read_long(out_dir / 'production_long.csv'), streamed, check_dtype=False)
+    assert json.loads((out_dir / MANIFEST_NAME).read_text())['source_hash'] == file_hash(
+        out_dir / 'production_long.csv')
+
+
+@pytest.mark.parametrize('engine', ['sqlite', 'mysql'])
+def test_long_chunks_match_the_long_table(db, engine):
+    conn = backend.get_connection()
+    try:
+        # 'mysql': bloques anchos desplegados en pandas, sobre la misma conexión
+        chunks = list(backend.iter_long_chunks(conn, 'production', chunk_size=7, backend=engine))
+        df_long = backend.load_long_table(conn, 'production', backend='sqlite')
+    finally:
+        conn.close()
+    assert len(chunks) > 1
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), df_long, check_dtype=False)
+
+
+def test_stream_and_full_export_agree(db, tmp_path):
+    export(tmp_path / 'full')
+    export_streaming(tmp_path / 'stream', chunk_size=10)
+    expected = wide_to_long(pd.read_csv(db / 'production.csv'), make_countries(12))
+    for out_dir in ('full', 'stream'):
+        pd.testing.assert_frame_equal(read_long(tmp_path / out_dir / 'production_long.csv'), expected,
+                                      check_dtype=False)
+
+
+def test_crearDb_builds_the_configured_sqlite_file(db, tmp_path, monkeypatch):
+    import crearDb
+    path = tmp_path / 'custom.sqlite'
+    monkeypatch.setenv('COFFEE_SQLITE_PATH', str(path))
+    monkeypatch.setattr('sys.argv', ['crearDb.py'])
+    crearDb.main()
+    assert path.exists() and backend.sqlite_path() == path
+
+
+def test_checksums_do_not_depend_on_dtypes(df_long):
+    expected = country_checksums(df_long)
+    assert country_checksums(compact_dtypes(df_long)) == expected
+    assert country_checksums(df_long.astype({'year': 'int16', 'production': 'float64'}).iloc[::-1]) == expected
+
+
+def test_incremental_rewrites_only_changed_countries(db, tmp_path):
+    # El país 13 ya tiene nombre, así que añadirlo no cambia la tabla de países
+    df_countries = make_countries(13)
+    df_countries.to_csv(db / 'countries.csv', index=False)
+    out_dir = tmp_path / 'out'
+    export(out_dir)
+    before = (out_dir / 'production_long.csv').read_bytes()
+    offsets = json.loads((out_dir / MANIFEST_NAME).read_text())['offsets']
+
+    # Cambia un valor del país 4, se elimina el país 9 y aparece el 13
+    df_wide = pd.read_csv(db / 'production.csv')
+    df_wide.loc[3, df_wide.columns[4]] = 7200000.0
+    df_new = df_wide.iloc[[0]].assign(id=13, country_id=13)
+    df_wide = pd.concat([df_wide[df_wide['country_id'] != 9], df_new], ignore_index=True)
+    df_wide.to_csv(db / 'production.csv', index=False)
+    (tmp_path / 'coffee.sqlite').unlink()
+    export(out_dir, incremental=True)
+
+    after = (out_dir / 'production_long.csv').read_bytes()
+    new_offsets = json.loads((out_dir / MANIFEST_NAME).read_text())['offsets']
+    for cid in ('1', '5', '12'):
+        assert after[slice(*new_offsets[cid])] == before[slice(*offsets[cid])]
+    assert after[slice(*new_offsets['4'])] != before[slice(*offsets['4'])]
+    assert '9' not in new_offsets and after[slice(*new_offsets['13'])].startswith(b'13,')
+
+    # Mismo archivo que una exportación completa
+    export(tmp_path / 'full')
+    assert after == (tmp_path / 'full' / 'production_long.csv').read_bytes()
+    expected = wide_to_long(df_wide, df_countries)
+    pd.testing.assert_frame_equal(read_long(out_dir / 'production_long.csv'), expected, check_dtype=False)
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_reshape_stage_is_traced(db, tmp_path, monkeypatch, stream):
+    trace = tmp_path / 'trace.jsonl'
+    monkeypatch.setenv('COFFEE_TRACE', str(trace))
+    if stream:
+        export_streaming(tmp_path / 'out', chunk_size=50)
+    else:
+        export(tmp_path / 'out')
+    spans = [json.loads(line) for line in trace.read_text().splitlines()]
+    reshape = [record for record in spans if record['name'] == 'reshape']
+    assert reshape and all(record['parent'] == ('export' if stream else 'load') for record in reshape)
+
+
+def test_concurrent_sqlite_builds_do_not_collide(db, tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    path = tmp_path / 'built.sqlite'
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: backend.build_sqlite(path), range(4)))
+    assert [p.name for p in tmp_path.glob('built*')] == ['built.sqlite']
+    conn = backend.connect_sqlite(path)
+    try:
+        assert conn.execute('SELECT COUNT(*) FROM production').fetchone()[0] == 12
+    finally:
+        conn.close()
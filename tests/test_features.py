@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from features import (FEATURE_COLS, add_features, advance_state, feature_names, lagged_state,
+                      spec_from_names, step_features)
+from panel import ProductionPanel
+
+
+def pandas_features(df_long):
+    """Features con rolling / shift de pandas sobre las observaciones previas de cada país."""
+    df = df_long.sort_values(['country_id', 'year']).reset_index(drop=True)
+    prev = df.groupby('country_id')['production'].shift(1)
+    prev2 = df.groupby('country_id')['production'].shift(2)
+    grouped = prev.groupby(df['country_id'])
+    df['rolling_mean_3y'] = grouped.transform(lambda s: s.rolling(3).mean())
+    df['rolling_std_3y'] = grouped.transform(lambda s: s.rolling(3).std(ddof=0))
+    df['production_lag1'] = prev
+    df['pct_change_1y'] = ((prev - prev2) / prev2).where(prev2 != 0, 0.0)
+    df['mean_x_pct'] = df['rolling_mean_3y'] * df['pct_change_1y']
+    df['volatility_norm'] = df['rolling_std_3y'] / (df['rolling_mean_3y'] + 1)
+    return df.dropna(subset=FEATURE_COLS).reset_index(drop=True)
+
+
+def test_add_features_matches_pandas(df_long):
+    expected = pandas_features(df_long)
+    got = add_features(df_long)
+    np.testing.assert_array_equal(got['year'], expected['year'])
+    np.testing.assert_allclose(got[FEATURE_COLS], expected[FEATURE_COLS], rtol=1e-10)
+
+
+def test_panel_and_dataframe_paths_agree(df_long):
+    for window, lags in [(3, 1), (5, 2), (2, 3)]:
+        from_frame = add_features(df_long, window, lags)
+        from_panel = add_features(ProductionPanel.from_long(df_long), window, lags)
+        np.testing.assert_array_equal(from_panel['year'], from_frame['year'])
+        np.testing.assert_allclose(from_panel[feature_names(window, lags)],
+                                   from_frame[feature_names(window, lags)], rtol=0, atol=0)
+
+
+def test_step_features_row():
+    state = np.array([[100.0, 110.0, 121.0], [np.nan, 0.0, 5.0], [np.nan, np.nan, 7.0]])
+    X = step_features(state)
+    mean, std = np.mean([100, 110, 121]), np.std([100, 110, 121])
+    np.testing.assert_allclose(X[0], [mean, std, 121.0, 0.1, mean * 0.1, std / (mean + 1)])
+    # División por cero y falta de año previo: pct_change = 0
+    np.testing.assert_allclose(X[1], [2.5, 2.5, 5.0, 0.0, 0.0, 2.5 / 3.5])
+    np.testing.assert_allclose(X[2], [7.0, 0.0, 7.0, 0.0, 0.0, 0.0])
+
+
+def test_advance_state_matches_lagged_state(df_long):
+    # Avanzar el estado con el valor observado reproduce el estado de la fila siguiente
+    df = df_long.sort_values(['country_id', 'year']).reset_index(drop=True)
+    state = lagged_state(df, 3)
+    same_country = df['country_id'].to_numpy()[1:] == df['country_id'].to_numpy()[:-1]
+    advanced = advance_state(state[:-1], df['production'].to_numpy()[:-1])
+    np.testing.assert_array_equal(advanced[same_country], state[1:][same_country])
+
+
+def test_spec_from_names():
+    assert spec_from_names(FEATURE_COLS) == (3, 1)
+    assert spec_from_names(feature_names(5, 2)) == (5, 2)
+    with pytest.raises(ValueError):
+        spec_from_names(['rolling_mean_3y', 'production_lag1'])
+
+
+def test_rows_without_history_are_dropped(df_long):
+    df_features = add_features(df_long, min_history=3)
+    first_years = df_long.groupby('country_id')['year'].min()
+    assert (df_features['year'].to_numpy() > df_features['country_id'].map(first_years).to_numpy()).all()
+    assert not df_features[FEATURE_COLS].isna().any().any()
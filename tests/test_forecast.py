@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from benchmark import forecast_loop
+from forecast import build_state, forecast_all, forecast_recursive
+
+pytestmark = pytest.mark.filterwarnings('ignore')
+
+
+def test_matches_per_country_loop(fitted_model, df_long):
+    df_preds = forecast_all(fitted_model, df_long, years_ahead=10)
+    for country_id, rows in df_long.groupby('country_id'):
+        expected = forecast_loop(fitted_model, rows['production'], 10)
+        got = df_preds.loc[df_preds['country_id'] == country_id, 'predicted_production']
+        np.testing.assert_allclose(got, expected, rtol=1e-9)
+
+
+def test_forecast_years_follow_last_observed(fitted_model, df_long):
+    df_preds = forecast_all(fitted_model, df_long, years_ahead=4)
+    last = df_long.groupby('country_id')['year'].max()
+    first = df_preds.groupby('country_id')['year'].min()
+    np.testing.assert_array_equal(first.to_numpy(), last.to_numpy() + 1)
+    assert (df_preds.groupby('country_id').size() == 4).all()
+
+
+def test_negative_predictions_fall_back_to_rolling_mean():
+    class Negative:
+        def predict(self, X):
+            return -np.ones(len(X))
+
+    state = np.array([[1.0, 2.0, 3.0], [np.nan, 4.0, 8.0]])
+    predictions = forecast_recursive(Negative(), state, 2)
+    np.testing.assert_allclose(predictions[:, 0], [2.0, 6.0])
+    np.testing.assert_allclose(predictions[:, 1], [(2.0 + 3.0 + 2.0) / 3, (4.0 + 8.0 + 6.0) / 3])
+
+
+def test_empty_panel(fitted_model, df_long):
+    country_ids, _, last_years, state = build_state(df_long.iloc[:0], 3)
+    assert state.shape == (0, 3) and len(country_ids) == len(last_years) == 0
+    assert forecast_all(fitted_model, df_long.iloc[:0], 5).empty
@@ -0,0 +1,107 @@
+import http.client
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from columnar import write_npz
+from forecast import forecast_all
+from forecast_service import ForecastService, make_handler
+from synthetic_data import make_countries
+
+pytestmark = pytest.mark.filterwarnings('ignore')
+
+
+@pytest.fixture
+def paths(fitted_model, model_path, df_long, tmp_path):
+    prod_path = tmp_path / 'production_long.csv'
+    df_long.to_csv(prod_path, index=False)
+    return model_path, prod_path, fitted_model
+
+
+@pytest.fixture
+def service(paths):
+    model_path, prod_path, _ = paths
+    return ForecastService(model_path, prod_path, max_wait_ms=1.0, timeout=5.0)
+
+
+@pytest.fixture
+def request_json(service):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(service, default_years=3))
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True)
+    thread.start()
+
+    def request(method, path, body=None):
+        conn = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=10)
+        conn.request(method, path, body=None if body is None else json.dumps(body))
+        response = conn.getresponse()
+        payload = json.loads(response.read())
+        conn.close()
+        return response.status, payload
+
+    yield request
+    server.shutdown()
+    server.server_close()
+
+
+def test_forecast_matches_engine(paths, request_json, df_long):
+    _, _, model = paths
+    status, payload = request_json('POST', '/forecast', {'countries': ['Country 00003', 5], 'years': 4})
+    assert status == 200
+    expected = forecast_all(model, df_long, 4)
+    for entry in payload['forecasts']:
+        rows = expected[expected['country_id'] == entry['country_id']]
+        np.testing.assert_allclose([f['predicted_production'] for f in entry['forecast']],
+                                   rows['predicted_production'], rtol=1e-12)
+        assert [f['year'] for f in entry['forecast']] == rows['year'].tolist()
+
+
+@pytest.mark.parametrize('body', [['Country 00001'], 'Country 00001', 3, None])
+def test_non_object_body_is_rejected(request_json, body):
+    status, payload = request_json('POST', '/forecast', body)
+    assert status == 400 and 'error' in payload
+
+
+@pytest.mark.parametrize('body', [
+    {'country': None},
+    {'countries': [None]},
+    {'countries': [['Country 00001']]},
+    {'countries': [True]},
+    {'countries': []},
+    {'country': 'Country 00001', 'years': 'ten'},
+    {'country': 'Country 00001', 'years': 0},
+])
+def test_invalid_input_is_rejected(request_json, body):
+    status, payload = request_json('POST', '/forecast', body)
+    assert status == 400 and 'error' in payload
+
+
+def test_unknown_country(request_json):
+    assert request_json('POST', '/forecast', {'country': 'Atlantis'})[0] == 404
+    assert request_json('GET', '/forecast?country_id=999999')[0] == 404
+
+
+def test_timeout_is_503(service, request_json):
+    class Slow:
+        def predict(self, X):
+            time.sleep(0.5)
+            return np.zeros(len(X))
+
+    service.timeout = 0.05
+    service.batcher.model = Slow()
+    status, payload = request_json('GET', '/forecast?country=Country%2000001&years=1')
+    assert status == 503 and 'error' in payload
+
+
+def test_data_argument_wins_over_stale_columnar_copy(paths, df_long):
+    model_path, prod_path, model = paths
+    # Copia columnar de otros datos junto al CSV
+    write_npz(df_long.assign(production=1.0), make_countries(25), prod_path.with_suffix('.npz'), 'other')
+    service = ForecastService(model_path, prod_path, max_wait_ms=1.0)
+    expected = forecast_all(model, df_long, 2)
+    got = service.forecast([1], 2)[0]['forecast']
+    np.testing.assert_allclose([f['predicted_production'] for f in got],
+                               expected.loc[expected['country_id'] == 1, 'predicted_production'], rtol=1e-12)
@@ -0,0 +1,70 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from forecast_table import (forecast_table, has_forecasts, lookup_forecast, main, read_forecast_table,
+                            write_forecast_table)
+
+pytestmark = pytest.mark.filterwarnings('ignore')
+
+
+@pytest.fixture
+def df_table(fitted_model, df_long):
+    return forecast_table(fitted_model, df_long, 'model', 'data', years_ahead=4, n_paths=0)
+
+
+def test_write_replaces_the_table(df_table, tmp_path):
+    path = tmp_path / 'forecasts.csv'
+    write_forecast_table(df_table.assign(data_hash='old'), path)
+    write_forecast_table(df_table, path)
+    assert [p.name for p in tmp_path.iterdir()] == ['forecasts.csv']
+
+    table = read_forecast_table(path)
+    assert has_forecasts(table, 'model', 'data')
+    assert not has_forecasts(table, 'model', 'old')
+    assert not has_forecasts(table, 'other', 'data')
+
+
+def test_lookup_returns_the_country_years(df_table, tmp_path):
+    write_forecast_table(df_table, tmp_path / 'forecasts.csv')
+    table = read_forecast_table(tmp_path / 'forecasts.csv')
+    name = df_table['country_name'].iloc[0]
+    expected = df_table[df_table['country_name'] == name].sort_values('year')
+
+    rows = lookup_forecast(table, 'model', 'data', name, 3)
+    pd.testing.assert_series_equal(rows['year'], expected['year'].iloc[:3].reset_index(drop=True))
+    assert lookup_forecast(table, 'model', 'data', 'Atlantis', 3) is None
+
+
+def test_concurrent_writes_use_private_temp_files(df_table, tmp_path, monkeypatch):
+    path = tmp_path / 'forecasts.csv'
+    temps = []
+    to_csv = pd.DataFrame.to_csv
+
+    def record(self, target, *args, **kwargs):
+        temps.append(Path(target))
+        return to_csv(self, target, *args, **kwargs)
+
+    monkeypatch.setattr(pd.DataFrame, 'to_csv', record)
+    write_forecast_table(df_table, path)
+    write_forecast_table(df_table, path)
+    assert len(set(temps)) == 2 and path not in temps
+    assert [p.name for p in tmp_path.iterdir()] == ['forecasts.csv']
+
+
+def test_empty_panel_gives_an_empty_table(fitted_model, df_long, df_table):
+    empty = forecast_table(fitted_model, df_long.iloc[:0], 'model', 'data', years_ahead=4, n_paths=0)
+    assert empty.empty and list(empty.columns) == list(df_table.columns)
+
+
+def test_main_exits_on_an_empty_table(model_path, df_long, tmp_path, monkeypatch, capsys):
+    df_long.iloc[:0].to_csv(tmp_path / 'production_long.csv', index=False)
+    monkeypatch.setattr(sys, 'argv', ['forecast_table.py', '--model', str(model_path),
+                                      '--data', str(tmp_path / 'production_long.csv'),
+                                      '--out', str(tmp_path / 'forecasts.csv')])
+    with pytest.raises(SystemExit):
+        main()
+    assert 'no tiene datos' in capsys.readouterr().out
+    assert not (tmp_path / 'forecasts.csv').exists()
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from features import add_features, feature_names
+from incremental_train import RegressionStats, absorb, full_refit, new_rows
+
+pytestmark = pytest.mark.filterwarnings('ignore')
+
+
+def test_yearly_updates_match_full_refit(df_long):
+    stats = RegressionStats(feature_names())
+    first = df_long['year'].min() + 8
+    absorb(stats, df_long[df_long['year'] <= first], 3, 1)
+    for year in range(first + 1, df_long['year'].max() + 1):
+        absorb(stats, df_long[df_long['year'] <= year], 3, 1)
+
+    coef, intercept = stats.solve()
+    expected_coef, expected_intercept = full_refit(df_long, 3, 1)
+    assert stats.n == len(add_features(df_long))
+    np.testing.assert_allclose(coef, expected_coef, rtol=1e-6, atol=1e-8)
+    assert intercept == pytest.approx(expected_intercept, rel=1e-7)
+
+
+@pytest.mark.parametrize('window,lags', [(3, 1), (5, 2), (2, 3)])
+def test_solution_matches_linear_regression(df_long, window, lags):
+    stats = RegressionStats(feature_names(window, lags))
+    absorb(stats, df_long, window, lags)
+    coef, intercept = stats.solve()
+
+    df_features = add_features(df_long, window, lags)
+    X, y = df_features[feature_names(window, lags)], df_features['production']
+    model = LinearRegression().fit(X, y)
+    np.testing.assert_allclose(coef, model.coef_, rtol=1e-6, atol=1e-8)
+    assert intercept == pytest.approx(model.intercept_, rel=1e-7)
+    np.testing.assert_allclose(X.to_numpy() @ coef + intercept, model.predict(X), rtol=1e-9, atol=1e-6 * y.mean())
+
+
+def test_chan_merge_matches_single_batch():
+    rng = np.random.default_rng(0)
+    X, y = rng.normal(size=(200, 4)) * [1e9, 1.0, 1e-3, 50.0], rng.normal(size=200)
+    merged = RegressionStats(list('abcd'))
+    for rows in np.array_split(np.arange(200), [13, 90, 91]):
+        merged.update(X[rows], y[rows])
+    single = RegressionStats(list('abcd')).update(X, y)
+    np.testing.assert_allclose(merged.mean, single.mean, rtol=1e-12)
+    np.testing.assert_allclose(merged.comoment, single.comoment, rtol=1e-9)
+
+
+def test_only_new_rows_are_absorbed(df_long):
+    stats = RegressionStats(feature_names())
+    assert absorb(stats, df_long, 3, 1) == len(add_features(df_long))
+    assert absorb(stats, df_long, 3, 1) == 0
+    assert new_rows(df_long, stats.last_year).empty
+
+
+def test_save_and_load(df_long, tmp_path):
+    stats = RegressionStats(feature_names())
+    absorb(stats, df_long, 3, 1)
+    stats.save(tmp_path / 'model.stats.npz')
+    loaded = RegressionStats.load(tmp_path / 'model.stats.npz')
+    assert loaded.names == stats.names and loaded.n == stats.n and loaded.last_year == stats.last_year
+    np.testing.assert_array_equal(loaded.comoment, stats.comoment)
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from batch_forecast import batch_forecast
+from features import add_features, history_length
+from forecast import forecast_intervals, forecast_recursive, quantile_columns, residual_pools, simulate_paths
+from forecast_table import forecast_table, lookup_forecast, read_forecast_table
+from panel import ProductionPanel
+
+pytestmark = pytest.mark.filterwarnings('ignore')
+
+
+@pytest.fixture
+def inputs(fitted_model, df_long):
+    panel = ProductionPanel.from_long(df_long)
+    pools = residual_pools(fitted_model, add_features(panel), panel.country_ids)
+    return panel, panel.state(history_length()), pools
+
+
+def test_zero_residuals_reproduce_point_forecast(fitted_model, inputs):
+    _, state, pools = inputs
+    paths = simulate_paths(fitted_model, state, 6, np.zeros_like(pools), n_paths=3, seed=0)
+    expected = forecast_recursive(fitted_model, state, 6)
+    for path in paths:
+        np.testing.assert_allclose(path, expected, rtol=1e-12)
+
+
+def test_keyed_paths_do_not_depend_on_the_batch(fitted_model, inputs):
+    panel, state, pools = inputs
+    rows = np.array([3, 11, 17])
+    full = simulate_paths(fitted_model, state, 5, pools, 200, seed=4, keys=panel.country_ids)
+    subset = simulate_paths(fitted_model, state[rows], 5, pools[rows], 200, seed=4, keys=panel.country_ids[rows])
+    alone = simulate_paths(fitted_model, state[[11]], 5, pools[[11]], 200, seed=4, keys=panel.country_ids[[11]])
+    np.testing.assert_array_equal(full[:, rows], subset)
+    np.testing.assert_array_equal(full[:, [11]], alone)
+
+
+def test_residuals_come_from_each_country_pool(fitted_model, inputs):
+    _, state, pools = inputs
+    # Un solo residuo por país: cada trayectoria es determinista
+    single = np.full((len(state), 1), 0.1)
+    paths = simulate_paths(fitted_model, state, 1, single, 4, seed=0)
+    X_mean = np.nanmean(state[:, -3:], axis=1)
+    expected = forecast_recursive(fitted_model, state, 1)[:, 0] + 0.1 * X_mean
+    np.testing.assert_allclose(paths[0, :, 0], np.where(expected < 0, X_mean, expected), rtol=1e-12)
+
+
+def test_intervals_are_ordered(fitted_model, df_long):
+    bands = forecast_intervals(fitted_model, df_long, 5, n_paths=300)
+    lower, median, upper = (bands[col] for col in quantile_columns())
+    assert (lower <= median).all() and (median <= upper).all()
+
+
+def test_forecast_table_serves_bands(fitted_model, df_long, tmp_path):
+    df_table = forecast_table(fitted_model, df_long, 'model', 'data', years_ahead=5, n_paths=300)
+    df_table.to_csv(tmp_path / 'forecasts.csv', index=False)
+    table = read_forecast_table(tmp_path / 'forecasts.csv')
+
+    bands = forecast_intervals(fitted_model, df_long, 5, n_paths=300)
+    name = bands['country_name'].iloc[0]
+    rows = lookup_forecast(table, 'model', 'data', name, 5)
+    np.testing.assert_allclose(rows[quantile_columns()], bands[bands['country_name'] == name][quantile_columns()])
+    assert lookup_forecast(table, 'model', 'other', name, 5) is None
+    assert lookup_forecast(table, 'model', 'data', name, 6) is None
+
+
+def test_batch_bands_do_not_depend_on_workers(fitted_model, df_long):
+    *_, one = batch_forecast(fitted_model, df_long, 4, workers=1, n_paths=100)
+    *_, three = batch_forecast(fitted_model, df_long, 4, workers=3, n_paths=100)
+    np.testing.assert_array_equal(one, three)
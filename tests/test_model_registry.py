@@ -0,0 +1,23 @@
+import pytest
+
+from model_registry import INDEX_NAME, ModelRegistry, train_registry
+
+pytestmark = pytest.mark.filterwarnings('ignore')
+
+
+def test_retraining_replaces_the_index_and_drops_stale_models(df_long, tmp_path):
+    first = train_registry(df_long, tmp_path, min_samples=5, workers=2)
+    samples = sorted(entry['n_samples'] for entry in first['countries'].values())
+    min_samples = samples[len(samples) // 2] + 1
+
+    second = train_registry(df_long, tmp_path, min_samples=min_samples, workers=2)
+    assert 0 < len(second['countries']) < len(first['countries'])
+
+    files = {entry['file'] for entry in second['countries'].values()}
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(files | {INDEX_NAME})
+
+    registry = ModelRegistry(tmp_path)
+    for entry in second['countries'].values():
+        assert entry['name'] in registry and registry.file(entry['name']).exists()
+    dropped = set(first['countries']) - set(second['countries'])
+    assert all(first['countries'][key]['name'] not in registry for key in dropped)
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from features import add_features, feature_names
+from model_search import build_grid, run_search, scored_rows
+
+pytestmark = pytest.mark.filterwarnings('ignore')
+
+FEATURE_SETS = [(2, 1), (5, 3)]
+
+
+def keys(df):
+    return pd.MultiIndex.from_frame(df[['country_id', 'year']])
+
+
+def test_scored_rows_are_common_to_every_feature_set(df_long):
+    scored = scored_rows(df_long, FEATURE_SETS)
+    short, long = (keys(add_features(df_long, window, lags)) for window, lags in FEATURE_SETS)
+    assert len(scored) < len(short)
+    assert scored.isin(short).all() and scored.isin(long).all()
+    assert len(scored) == len(short.intersection(long))
+
+
+def test_candidates_are_scored_on_the_same_rows(df_long):
+    results = run_search(df_long, build_grid(['linear'], FEATURE_SETS), test_years=3, workers=2)
+    assert results['n_test'].nunique() == 1 and results['n_test'].iloc[0] > 0
+
+    # RMSE de la ventana corta, a mano, sobre las filas que puede puntuar la larga
+    cutoff = df_long['year'].max() - 2
+    df = add_features(df_long, 2, 1)
+    cols = feature_names(2, 1)
+    train = df[df['year'] < cutoff]
+    test = df[(df['year'] >= cutoff) & keys(df).isin(scored_rows(df_long, FEATURE_SETS))]
+    y_pred = LinearRegression().fit(train[cols], train['production']).predict(test[cols])
+    expected = np.sqrt(np.mean((test['production'].to_numpy() - y_pred) ** 2))
+
+    row = results[results['window'] == 2].iloc[0]
+    assert row['n_test'] == len(test)
+    assert row['RMSE'] == pytest.approx(expected, rel=1e-9)
@@ -0,0 +1,61 @@
+import json
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from features import FEATURE_COLS, add_features
+from forecast import forecast_all
+from numpy_model import LinearModel, export_model
+
+# Avisos de sklearn (nombres de features, matriz mal condicionada) como en los scripts
+pytestmark = pytest.mark.filterwarnings('ignore')
+
+
+@pytest.fixture
+def training(df_long):
+    df_features = add_features(df_long)
+    return df_features[FEATURE_COLS], df_features['production']
+
+
+@pytest.mark.parametrize('estimator', [
+    LinearRegression(),
+    Ridge(alpha=2.0),
+    make_pipeline(StandardScaler(), Ridge(alpha=1.0)),
+])
+def test_matches_sklearn(estimator, training, tmp_path):
+    X, y = training
+    model = estimator.fit(X, y)
+    export_model(model, tmp_path / 'model.json', source_hash='abc')
+    numpy_model = LinearModel.from_json(tmp_path / 'model.json')
+
+    assert numpy_model.source_hash == 'abc'
+    assert list(numpy_model.feature_names_in_) == FEATURE_COLS
+    np.testing.assert_allclose(numpy_model.predict(X.to_numpy()), model.predict(X), rtol=1e-9)
+
+
+def test_forecast_matches_sklearn(training, df_long, tmp_path):
+    model = LinearRegression().fit(*training)
+    export_model(model, tmp_path / 'model.json')
+    numpy_model = LinearModel.from_json(tmp_path / 'model.json')
+    np.testing.assert_allclose(forecast_all(numpy_model, df_long)['predicted_production'],
+                               forecast_all(model, df_long)['predicted_production'], rtol=1e-9)
+
+
+def test_rejects_non_linear_models(training, tmp_path):
+    model = RandomForestRegressor(n_estimators=2, random_state=0).fit(*training)
+    with pytest.raises(TypeError):
+        export_model(model, tmp_path / 'model.json')
+
+
+def test_rejects_unknown_format(training, tmp_path):
+    path = tmp_path / 'model.json'
+    export_model(LinearRegression().fit(*training), path)
+    description = json.loads(path.read_text())
+    description['version'] += 1
+    path.write_text(json.dumps(description))
+    with pytest.raises(ValueError):
+        LinearModel.from_json(path)
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from features import history_length, lagged_state
+from panel import ProductionPanel, last_observed
+
+
+def groupby_state(df_long, width):
+    """Estado con el groupby de la implementación anterior a ProductionPanel."""
+    df = df_long.dropna(subset=['production']).sort_values(['country_id', 'year'])
+    tail = df.groupby('country_id', sort=True).tail(width)
+    country_ids, rows = np.unique(tail['country_id'].to_numpy(), return_inverse=True)
+    from_end = tail.groupby('country_id').cumcount(ascending=False).to_numpy()
+    state = np.full((len(country_ids), width), np.nan)
+    state[rows, width - 1 - from_end] = tail['production'].to_numpy(dtype=float)
+    last_years = tail.groupby('country_id', sort=True)['year'].last().to_numpy()
+    return country_ids, last_years, state
+
+
+def test_to_long_round_trip(df_long):
+    panel = ProductionPanel.from_long(df_long)
+    pd.testing.assert_frame_equal(panel.to_long(), df_long[panel.to_long().columns], check_dtype=False)
+
+
+def test_state_matches_groupby(df_long):
+    panel = ProductionPanel.from_long(df_long)
+    for width in (1, 3, 5):
+        country_ids, last_years, state = groupby_state(df_long, width)
+        np.testing.assert_array_equal(panel.country_ids, country_ids)
+        np.testing.assert_array_equal(panel.last_years(), last_years)
+        np.testing.assert_array_equal(panel.state(width), state)
+
+
+def test_state_of_selected_countries(df_long):
+    panel = ProductionPanel.from_long(df_long)
+    names = panel.country_names[[4, 0, 9]]
+    np.testing.assert_array_equal(panel.state(3, names), panel.state(3)[[4, 0, 9]])
+
+
+def test_lagged_matches_lagged_state(df_long):
+    panel = ProductionPanel.from_long(df_long)
+    width = history_length()
+    df, state = panel.lagged(width)
+    expected = df_long.sort_values(['country_id', 'year']).reset_index(drop=True)
+    np.testing.assert_array_equal(df['year'], expected['year'])
+    np.testing.assert_array_equal(df['production'], expected['production'])
+    np.testing.assert_array_equal(state, lagged_state(expected, width))
+
+
+def test_history(df_long):
+    panel = ProductionPanel.from_long(df_long)
+    name = panel.country_names[3]
+    expected = df_long[df_long['country_name'] == name]
+    history = panel.history(name)
+    np.testing.assert_array_equal(history['year'], expected['year'])
+    np.testing.assert_array_equal(history['production'], expected['production'])
+    assert panel.history('Atlantis').empty
+
+
+def test_empty_panel():
+    df = pd.DataFrame({'country_id': [], 'year': [], 'production': [], 'country_name': []})
+    panel = ProductionPanel.from_long(df)
+    assert len(panel) == 0
+    assert panel.last_years().shape == (0,)
+    assert panel.state(3).shape == (0, 3)
+
+
+def test_duplicate_rows_are_summed():
+    df = pd.DataFrame({'country_id': [1, 1, 1, 2], 'year': [2000, 2001, 2001, 2000],
+                       'production': [10.0, 20.0, 5.0, 7.0], 'country_name': ['A', 'A', 'A', 'B']})
+    panel = ProductionPanel.from_long(df)
+    np.testing.assert_array_equal(panel.values, [[10.0, 25.0], [7.0, np.nan]])
+
+
+def test_last_observed_skips_gaps():
+    matrix = np.array([[1.0, np.nan, 3.0, np.nan], [np.nan, np.nan, np.nan, 4.0]])
+    np.testing.assert_array_equal(last_observed(matrix, 3), [[np.nan, 1.0, 3.0], [np.nan, np.nan, 4.0]])
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from render_reports import MANIFEST_NAME, load_manifest, render_reports
+from reshape import wide_to_long
+from synthetic_data import make_countries, make_wide_table
+
+pytestmark = pytest.mark.filterwarnings('ignore')
+
+
+@pytest.fixture
+def df_long():
+    # Pocos países: cada gráfico cuesta un dibujo de matplotlib
+    return wide_to_long(make_wide_table(6, 15, missing_rate=0.1, seed=3), make_countries(6))
+
+
+@pytest.fixture
+def inputs(model_path, df_long, tmp_path):
+    df_long.to_csv(tmp_path / 'production_long.csv', index=False)
+    return model_path, tmp_path / 'production_long.csv'
+
+
+def render(model_path, prod_path, out_dir, force=False):
+    return render_reports(model_path, prod_path, out_dir, years_ahead=4, n_paths=50, workers=1, force=force)
+
+
+def images(out_dir):
+    return {path.name: path.read_bytes() for path in sorted(out_dir.glob('*.png'))}
+
+
+def test_unchanged_data_renders_nothing(inputs, tmp_path):
+    out_dir = tmp_path / 'reports'
+    rendered, skipped = render(*inputs, out_dir)
+    assert rendered == len(load_manifest(out_dir)) and skipped == 0
+    assert render(*inputs, out_dir) == (0, rendered)
+
+
+def test_partial_redraw_matches_full_redraw(inputs, df_long, tmp_path):
+    model_path, prod_path = inputs
+    out_dir = tmp_path / 'reports'
+    total, _ = render(model_path, prod_path, out_dir)
+
+    # Un año nuevo para un país: cambia su serie (y el conjunto común de residuos)
+    last = df_long[df_long['country_id'] == df_long['country_id'].max()].iloc[[-1]]
+    df_new = df_long.copy()
+    df_new.loc[last.index, 'production'] *= 1.5
+    df_new.to_csv(prod_path, index=False)
+    rendered, skipped = render(model_path, prod_path, out_dir)
+    assert 1 <= rendered < total and rendered + skipped == total
+
+    full_dir = tmp_path / 'full'
+    render(model_path, prod_path, full_dir, force=True)
+    assert images(out_dir) == images(full_dir)
+    assert (out_dir / MANIFEST_NAME).exists()
+
+
+def test_pooled_residuals_are_part_of_the_key(inputs, df_long, tmp_path):
+    model_path, prod_path = inputs
+    # Un país con dos años usa los residuos de todo el panel
+    short_id = df_long['country_id'].max() + 1
+    df_short = df_long[df_long['country_id'] == df_long['country_id'].min()].iloc[-2:].assign(
+        country_id=short_id, country_name='Short')
+    df_long = pd.concat([df_long, df_short], ignore_index=True)
+    df_long.to_csv(prod_path, index=False)
+    out_dir = tmp_path / 'reports'
+    render(model_path, prod_path, out_dir)
+    key = load_manifest(out_dir)[str(short_id)]['key']
+
+    other = df_long['country_id'] == df_long['country_id'].min()
+    df_long.loc[other, 'production'] *= np.linspace(0.5, 2.0, other.sum())
+    df_long.to_csv(prod_path, index=False)
+    render(model_path, prod_path, out_dir)
+    assert load_manifest(out_dir)[str(short_id)]['key'] != key
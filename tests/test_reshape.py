@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from reshape import parse_year_columns, wide_to_long
+from synthetic_data import make_countries, make_wide_table
+
+
+def iterrows_to_long(df_wide, df_countries):
+    """Despliegue fila × año con iterrows de la versión original de modelo.py."""
+    year_cols = [col for col in df_wide.columns if col not in ['id', 'country_id', 'coffee_type', 'total']]
+    data_long = []
+    for _, row in df_wide.iterrows():
+        for year_col in year_cols:
+            production = row[year_col]
+            if pd.notna(production):
+                data_long.append({'country_id': row['country_id'],
+                                  'year': int(year_col.split('/')[0]),
+                                  'production': production})
+    df_long = pd.DataFrame(data_long)
+    return df_long.merge(df_countries.rename(columns={'id': 'country_id', 'name': 'country_name'}),
+                         on='country_id', how='left')
+
+
+def test_matches_iterrows():
+    df_wide = make_wide_table(30, 12, missing_rate=0.2, seed=3)
+    df_countries = make_countries(30)
+    expected = iterrows_to_long(df_wide, df_countries)
+    got = wide_to_long(df_wide, df_countries)
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+
+
+def test_parse_year_columns():
+    year_cols, years = parse_year_columns(['id', 'country_id', 'coffee_type', '1990/91', '1991', 'total', 'notes'])
+    assert year_cols == ['1990/91', '1991']
+    np.testing.assert_array_equal(years, [1990, 1991])
+
+
+def test_text_and_empty_values_are_null():
+    df_wide = pd.DataFrame({'id': [1, 2], 'country_id': [2, 1],
+                            '2000/01': ['5', ''], '2001/02': [None, 'n/a'], '2002/03': [7.0, 8.0]})
+    df_long = wide_to_long(df_wide, value_name='exports', extra_cols=['id'])
+    assert df_long.columns.tolist() == ['country_id', 'year', 'exports', 'id']
+    assert df_long[['country_id', 'year', 'exports']].values.tolist() == [[1, 2002, 8.0], [2, 2000, 5.0], [2, 2002, 7.0]]
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from schema import compact_column, compact_dtypes, sql_rows, sql_type
+
+
+def test_integers_fit_int32_or_int64():
+    assert compact_column(pd.Series([1, 2, 3], dtype='int64')).dtype == 'int32'
+    assert compact_column(pd.Series([0, 2 ** 40])).dtype == 'int64'
+    # Flotantes sin decimales (p. ej. kg en una columna float64)
+    assert compact_column(pd.Series([60000.0, 120000.0])).dtype == 'int32'
+
+
+def test_nulls_are_preserved():
+    s = compact_column(pd.Series([1.0, np.nan, 3.0]))
+    assert s.dtype == 'Int32'
+    assert s.isna().tolist() == [False, True, False]
+    assert compact_column(pd.Series([np.nan, np.nan])).dtype == 'Int32'
+
+
+def test_floats():
+    assert compact_column(pd.Series([0.5, 0.25, np.nan])).dtype == np.float32
+    assert compact_column(pd.Series([0.1, 1.0])).dtype == np.float64
+    # Más allá de 2^53 un float64 no representa enteros exactos: se conserva como flotante
+    assert compact_column(pd.Series([2.0 ** 60 + 1024, 1.0])).dtype == np.float64
+
+
+def test_lossless_round_trip():
+    df = pd.DataFrame({'id': np.arange(5, dtype=np.int64),
+                       'value': [0.0, 60000.0, np.nan, 3e9, 1.5],
+                       'name': ['a', 'b', 'a', None, 'b']})
+    compact = compact_dtypes(df, categorical=['name'])
+    assert compact['name'].dtype == 'category'
+    pd.testing.assert_frame_equal(compact.astype({'id': 'int64', 'value': 'float64', 'name': 'object'}),
+                                  df.astype({'name': 'object'}))
+
+
+def test_sql_type():
+    df = compact_dtypes(pd.DataFrame({
+        'small': [1, 2], 'big': [0, 2 ** 40], 'nullable': [1.0, np.nan], 'half': [0.5, 1.5],
+        'precise': [0.1, 0.2], 'coffee_type': ['Arabica', "O'Robusta"], 'notes': ['x', 'y'],
+    }))
+    assert [sql_type(df[col]) for col in df.columns] == [
+        'INT', 'BIGINT', 'INT', 'FLOAT', 'DOUBLE', "ENUM('Arabica', 'O''Robusta')", 'VARCHAR(255)']
+    many = compact_dtypes(pd.DataFrame({'name': [f'c{i}' for i in range(40)]}))
+    assert sql_type(many['name']) == 'VARCHAR(255)'
+
+
+def test_sql_rows_use_native_types_and_none():
+    df = compact_dtypes(pd.DataFrame({'id': [1, 2], 'value': [5.0, np.nan], 'name': ['a', None]}))
+    rows = sql_rows(df)
+    assert rows == [(1, 5, 'a'), (2, None, None)]
+    assert all(type(value) in (int, str, type(None)) for row in rows for value in row)